@@ -0,0 +1,61 @@
+"""add KNOWLEDGE_CLOSURE table for knowledge point subtree queries
+
+Revision ID: 3f9a1c2d7e41
+Revises: b3d874edf9d3
+Create Date: 2026-10-18 09:12:40.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c2d7e41'
+down_revision: Union[str, Sequence[str], None] = 'b3d874edf9d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 与 KNOWLEDGE_POINT.id（BIGINT UNSIGNED）保持一致，否则 MySQL 外键无法创建
+ID_TYPE = sa.BigInteger().with_variant(mysql.BIGINT(unsigned=True), "mysql")
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    closure = op.create_table(
+        'KNOWLEDGE_CLOSURE',
+        sa.Column('ancestor_id', ID_TYPE, nullable=False),
+        sa.Column('descendant_id', ID_TYPE, nullable=False),
+        sa.Column('distance', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id'),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['KNOWLEDGE_POINT.id'], name='fk_kc_ancestor', ondelete='CASCADE', onupdate='CASCADE'),
+        sa.ForeignKeyConstraint(['descendant_id'], ['KNOWLEDGE_POINT.id'], name='fk_kc_descendant', ondelete='CASCADE', onupdate='CASCADE'),
+    )
+    op.create_index('idx_kc_descendant_ancestor', 'KNOWLEDGE_CLOSURE', ['descendant_id', 'ancestor_id'])
+
+    # 回填：按现有 parent_id 展开每个节点到所有祖先的路径
+    conn = op.get_bind()
+    parent_of = {
+        row.id: row.parent_id
+        for row in conn.execute(sa.text("SELECT id, parent_id FROM KNOWLEDGE_POINT"))
+    }
+    batch = []
+    for kid in parent_of:
+        cur, distance, seen = kid, 0, set()
+        while cur is not None and cur in parent_of and cur not in seen:  # 跳过悬空父节点，防御脏数据中的环
+            seen.add(cur)
+            batch.append({'ancestor_id': cur, 'descendant_id': kid, 'distance': distance})
+            cur, distance = parent_of[cur], distance + 1
+        if len(batch) >= BATCH_SIZE:
+            op.bulk_insert(closure, batch)
+            batch = []
+    if batch:
+        op.bulk_insert(closure, batch)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('KNOWLEDGE_CLOSURE')
@@ -0,0 +1,53 @@
+"""add progress counters to EXAM_ATTEMPT
+
+Revision ID: 7c2b5e9d4a10
+Revises: 3f9a1c2d7e41
+Create Date: 2026-10-18 11:02:17.540913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2b5e9d4a10'
+down_revision: Union[str, Sequence[str], None] = '3f9a1c2d7e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+# 按主键区间分批回填，避免一条 UPDATE 长时间锁住整张表
+BACKFILL_SQL = sa.text("""
+    UPDATE EXAM_ATTEMPT SET
+        question_count = (SELECT COUNT(*) FROM PAPER_QUESTION pq WHERE pq.paper_id = EXAM_ATTEMPT.paper_id),
+        answered_count = (SELECT COUNT(*) FROM USER_ANSWER ua WHERE ua.attempt_id = EXAM_ATTEMPT.id),
+        correct_count  = (SELECT COUNT(*) FROM USER_ANSWER ua WHERE ua.attempt_id = EXAM_ATTEMPT.id AND ua.is_correct = 1)
+    WHERE id >= :lo AND id < :hi
+""")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, comment in (
+        ('question_count', '试卷题目数'),
+        ('answered_count', '已作答题数（增量维护）'),
+        ('correct_count', '答对题数（增量维护）'),
+    ):
+        op.add_column('EXAM_ATTEMPT', sa.Column(name, sa.Integer(), nullable=False, server_default='0', comment=comment))
+
+    conn = op.get_bind()
+    lo, hi = conn.execute(sa.text("SELECT MIN(id), MAX(id) FROM EXAM_ATTEMPT")).one()
+    if lo is None:
+        return
+    for start in range(lo, hi + 1, BATCH_SIZE):
+        conn.execute(BACKFILL_SQL, {'lo': start, 'hi': start + BATCH_SIZE})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('EXAM_ATTEMPT', 'correct_count')
+    op.drop_column('EXAM_ATTEMPT', 'answered_count')
+    op.drop_column('EXAM_ATTEMPT', 'question_count')
@@ -0,0 +1,53 @@
+"""add IMPORT_JOB table for asynchronous question imports
+
+Revision ID: a8c3e5f1d274
+Revises: f2a6d8c3e519
+Create Date: 2026-10-18 22:41:15.318702
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c3e5f1d274'
+down_revision: Union[str, Sequence[str], None] = 'f2a6d8c3e519'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 与 USER.id（BIGINT UNSIGNED）保持一致，否则 MySQL 外键无法创建
+ID_TYPE = sa.BigInteger().with_variant(mysql.BIGINT(unsigned=True), "mysql")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'IMPORT_JOB',
+        sa.Column('id', ID_TYPE, primary_key=True, autoincrement=True),
+        sa.Column('user_id', ID_TYPE, nullable=False),
+        sa.Column('filename', sa.String(255), nullable=False),
+        sa.Column('file_path', sa.String(500), nullable=True),
+        sa.Column('status', sa.String(16), nullable=False, server_default='PENDING'),
+        sa.Column('cancel_requested', sa.Boolean(), nullable=False, server_default='0'),
+        sa.Column('estimated_rows', sa.Integer(), nullable=True),
+        sa.Column('processed_rows', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('success_rows', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('failed_rows', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('errors', sa.JSON(), nullable=True),
+        sa.Column('message', sa.String(500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['USER.id'], name='fk_import_job_user', ondelete='CASCADE', onupdate='CASCADE'),
+    )
+    op.create_index('idx_import_job_user', 'IMPORT_JOB', ['user_id', 'id'])
+    op.create_index('idx_import_job_status', 'IMPORT_JOB', ['status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('IMPORT_JOB')
@@ -0,0 +1,57 @@
+"""add full-text index on QUESTION_VERSION.stem (MySQL ngram FULLTEXT / SQLite FTS5)
+
+Revision ID: b9d2f4a6c815
+Revises: a8c3e5f1d274
+Create Date: 2026-10-18 23:52:40.126583
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d2f4a6c815'
+down_revision: Union[str, Sequence[str], None] = 'a8c3e5f1d274'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FTS_TABLE = 'QUESTION_VERSION_FTS'
+
+# 与 app/services/stem_search.py 的 SQLITE_DDL 一致（迁移不依赖应用代码）
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"stem, content='QUESTION_VERSION', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS qv_fts_ai AFTER INSERT ON QUESTION_VERSION BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, stem) VALUES (new.id, new.stem); END",
+    f"CREATE TRIGGER IF NOT EXISTS qv_fts_ad AFTER DELETE ON QUESTION_VERSION BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, stem) VALUES ('delete', old.id, old.stem); END",
+    f"CREATE TRIGGER IF NOT EXISTS qv_fts_au AFTER UPDATE OF stem ON QUESTION_VERSION BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, stem) VALUES ('delete', old.id, old.stem); "
+    f"INSERT INTO {FTS_TABLE}(rowid, stem) VALUES (new.id, new.stem); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect in ('mysql', 'mariadb'):
+        # ngram 解析器按字切分中文（MySQL 5.7.6+）；建索引会重建表，大表请在低峰期执行
+        op.execute("ALTER TABLE QUESTION_VERSION ADD FULLTEXT INDEX ft_qv_stem (stem) WITH PARSER ngram")
+    elif dialect == 'sqlite':
+        for stmt in SQLITE_DDL:
+            op.execute(stmt)
+    # 其它方言：不建索引，搜索退回 LIKE
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect in ('mysql', 'mariadb'):
+        op.drop_index('ft_qv_stem', table_name='QUESTION_VERSION')
+    elif dialect == 'sqlite':
+        for trigger in ('qv_fts_ai', 'qv_fts_ad', 'qv_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
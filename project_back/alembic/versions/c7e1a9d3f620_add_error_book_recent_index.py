@@ -0,0 +1,29 @@
+"""add (user_id, mastered, last_wrong_time) index to ERROR_BOOK for keyset pagination
+
+Revision ID: c7e1a9d3f620
+Revises: b9d2f4a6c815
+Create Date: 2026-10-19 01:26:08.473519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e1a9d3f620'
+down_revision: Union[str, Sequence[str], None] = 'b9d2f4a6c815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 错题本列表按 last_wrong_time 倒序分页（offset / 游标）时由索引提供顺序，免去 filesort
+    op.create_index('idx_error_book_recent', 'ERROR_BOOK', ['user_id', 'mastered', 'last_wrong_time'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_error_book_recent', table_name='ERROR_BOOK')
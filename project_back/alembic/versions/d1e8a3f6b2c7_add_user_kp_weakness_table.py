@@ -0,0 +1,97 @@
+"""add USER_KP_WEAKNESS table for incremental weak point profiles
+
+Revision ID: d1e8a3f6b2c7
+Revises: 7c2b5e9d4a10
+Create Date: 2026-10-18 14:26:08.193427
+
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1e8a3f6b2c7'
+down_revision: Union[str, Sequence[str], None] = '7c2b5e9d4a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 与 USER.id / KNOWLEDGE_POINT.id（BIGINT UNSIGNED）保持一致，否则 MySQL 外键无法创建
+ID_TYPE = sa.BigInteger().with_variant(mysql.BIGINT(unsigned=True), "mysql")
+USER_BATCH = 500
+INSERT_BATCH = 1000
+
+# 回填口径与 app/services/weakness_profile.py 一致（迁移不依赖应用代码）
+DECAY_RATE = 0.12
+PERIOD = timedelta(days=30)
+ANCHOR = datetime(2024, 1, 1)
+
+
+def _backfill(weakness) -> None:
+    conn = op.get_bind()
+    now = datetime.now(timezone(timedelta(hours=8))).replace(tzinfo=None)
+    start = ANCHOR + PERIOD * ((now - ANCHOR) // PERIOD)
+    user_ids = [r[0] for r in conn.execute(sa.text(
+        "SELECT DISTINCT user_id FROM ERROR_BOOK WHERE mastered = 0 ORDER BY user_id"
+    ))]
+    for i in range(0, len(user_ids), USER_BATCH):
+        batch_users = user_ids[i:i + USER_BATCH]
+        params = {"users": batch_users}
+        errors = conn.execute(sa.text("""
+            SELECT eb.user_id, eb.wrong_count, eb.last_wrong_time, qk.knowledge_id, eb.question_id
+            FROM ERROR_BOOK eb JOIN QUESTION_KNOWLEDGE qk ON qk.question_id = eb.question_id
+            WHERE eb.mastered = 0 AND eb.user_id IN :users
+        """).bindparams(sa.bindparam("users", expanding=True)), params).fetchall()
+        subjects = defaultdict(list)
+        for qid, tid in conn.execute(sa.text("""
+            SELECT DISTINCT qt.question_id, qt.tag_id
+            FROM ERROR_BOOK eb
+            JOIN QUESTION_TAG qt ON qt.question_id = eb.question_id
+            JOIN TAG t ON t.id = qt.tag_id AND t.type = 'SUBJECT'
+            WHERE eb.mastered = 0 AND eb.user_id IN :users
+        """).bindparams(sa.bindparam("users", expanding=True)), params):
+            subjects[qid].append(tid)
+
+        totals = defaultdict(lambda: [0, 0.0])
+        for user_id, wrong_count, last_wrong_time, kid, qid in errors:
+            wrong_count = wrong_count or 0
+            if isinstance(last_wrong_time, str):  # SQLite 返回字符串
+                last_wrong_time = datetime.fromisoformat(last_wrong_time)
+            days = (start - last_wrong_time).total_seconds() / 86400 if last_wrong_time else 0.0
+            for sid in (0, *subjects.get(qid, ())):
+                t = totals[(user_id, sid, kid)]
+                t[0] += wrong_count
+                t[1] += wrong_count * math.exp(-DECAY_RATE * days)
+        rows = [
+            {'user_id': uid, 'subject_id': sid, 'knowledge_id': kid, 'wrong_count': w, 'direct_weight': x, 'last_update': now}
+            for (uid, sid, kid), (w, x) in totals.items() if w
+        ]
+        for j in range(0, len(rows), INSERT_BATCH):
+            op.bulk_insert(weakness, rows[j:j + INSERT_BATCH])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    weakness = op.create_table(
+        'USER_KP_WEAKNESS',
+        sa.Column('user_id', ID_TYPE, nullable=False),
+        sa.Column('subject_id', ID_TYPE, nullable=False, server_default='0'),
+        sa.Column('knowledge_id', ID_TYPE, nullable=False),
+        sa.Column('wrong_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('direct_weight', sa.Double(), nullable=False, server_default='0'),
+        sa.Column('last_update', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'subject_id', 'knowledge_id'),
+        sa.ForeignKeyConstraint(['user_id'], ['USER.id'], name='fk_ukw_user', ondelete='CASCADE', onupdate='CASCADE'),
+        sa.ForeignKeyConstraint(['knowledge_id'], ['KNOWLEDGE_POINT.id'], name='fk_ukw_knowledge', ondelete='CASCADE', onupdate='CASCADE'),
+    )
+    _backfill(weakness)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('USER_KP_WEAKNESS')
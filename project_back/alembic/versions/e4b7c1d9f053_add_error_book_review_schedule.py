@@ -0,0 +1,57 @@
+"""add SM-2 review schedule columns and due index to ERROR_BOOK
+
+Revision ID: e4b7c1d9f053
+Revises: d1e8a3f6b2c7
+Create Date: 2026-10-18 16:12:44.318206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7c1d9f053'
+down_revision: Union[str, Sequence[str], None] = 'd1e8a3f6b2c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+# 未掌握但没有复习时间的旧记录视为已到期，否则 REVIEW 模式的范围扫描（next_review_time <= now）取不到
+BACKFILL_SQL = sa.text("""
+    UPDATE ERROR_BOOK SET next_review_time = COALESCE(last_wrong_time, created_at)
+    WHERE next_review_time IS NULL AND mastered = 0 AND id >= :lo AND id < :hi
+""")
+
+
+def _indexes() -> set:
+    return {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes('ERROR_BOOK')}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('ERROR_BOOK', sa.Column('ease_factor', sa.Double(), nullable=False, server_default='2.5', comment='SM-2 难易系数'))
+    op.add_column('ERROR_BOOK', sa.Column('review_interval', sa.Integer(), nullable=False, server_default='0', comment='当前复习间隔（天）'))
+    op.add_column('ERROR_BOOK', sa.Column('repetitions', sa.Integer(), nullable=False, server_default='0', comment='连续答对次数'))
+
+    conn = op.get_bind()
+    lo, hi = conn.execute(sa.text("SELECT MIN(id), MAX(id) FROM ERROR_BOOK")).one()
+    if lo is not None:
+        for start in range(lo, hi + 1, BATCH_SIZE):
+            conn.execute(BACKFILL_SQL, {'lo': start, 'hi': start + BATCH_SIZE})
+
+    # (user_id, mastered) 是新索引的前缀，一并替换
+    op.create_index('idx_error_book_due', 'ERROR_BOOK', ['user_id', 'mastered', 'next_review_time'])
+    if 'idx_error_book_user_mastered' in _indexes():
+        op.drop_index('idx_error_book_user_mastered', table_name='ERROR_BOOK')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('idx_error_book_user_mastered', 'ERROR_BOOK', ['user_id', 'mastered'])
+    op.drop_index('idx_error_book_due', table_name='ERROR_BOOK')
+    op.drop_column('ERROR_BOOK', 'repetitions')
+    op.drop_column('ERROR_BOOK', 'review_interval')
+    op.drop_column('ERROR_BOOK', 'ease_factor')
@@ -0,0 +1,54 @@
+"""add stem_hash to QUESTION_VERSION for indexed duplicate detection
+
+Revision ID: f2a6d8c3e519
+Revises: e4b7c1d9f053
+Create Date: 2026-10-18 21:08:37.604112
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a6d8c3e519'
+down_revision: Union[str, Sequence[str], None] = 'e4b7c1d9f053'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def _stem_hash(stem) -> str:
+    # 与 app/services/question_import.py 的 stem_hash 一致（迁移不依赖应用代码）
+    return hashlib.sha1(" ".join((stem or "").split()).encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('QUESTION_VERSION', sa.Column('stem_hash', sa.String(40), nullable=True, comment='空白折叠后题干的 SHA-1，用于查重'))
+
+    # 按主键区间分批回填：哈希需在 Python 中计算（空白折叠不依赖数据库的正则函数）
+    conn = op.get_bind()
+    lo, hi = conn.execute(sa.text("SELECT MIN(id), MAX(id) FROM QUESTION_VERSION")).one()
+    if lo is not None:
+        for start in range(lo, hi + 1, BATCH_SIZE):
+            rows = conn.execute(
+                sa.text("SELECT id, stem FROM QUESTION_VERSION WHERE id >= :lo AND id < :hi"),
+                {'lo': start, 'hi': start + BATCH_SIZE},
+            ).all()
+            if rows:
+                conn.execute(
+                    sa.text("UPDATE QUESTION_VERSION SET stem_hash = :h WHERE id = :id"),
+                    [{'id': r.id, 'h': _stem_hash(r.stem)} for r in rows],
+                )
+
+    op.create_index('idx_qv_creator_stem_hash', 'QUESTION_VERSION', ['created_by', 'stem_hash'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_qv_creator_stem_hash', table_name='QUESTION_VERSION')
+    op.drop_column('QUESTION_VERSION', 'stem_hash')
@@ -15,12 +15,15 @@ def list_my_error_book(
     size: int = Query(10, ge=1, le=100),
     only_due: bool = Query(False),
     include_mastered: bool = Query(False),
+    after: str | None = Query(None, description="游标：上一页返回的 next_cursor（传入时忽略 page）"),
+    with_total: bool = Query(True, description="是否统计总数"),
     db: Session = Depends(deps.get_db),
     me: User = Depends(deps.get_current_user),
 ):
     """获取当前用户的错题本（带题干）"""
-    total, rows = error_book_service.list_error_book(
-        db, me, page=page, size=size, only_due=only_due, include_mastered=include_mastered
+    total, rows, cursor = error_book_service.list_error_book(
+        db, me, page=page, size=size, only_due=only_due, include_mastered=include_mastered,
+        after=after, with_total=with_total,
     )
     
     # 🔥 批量查询题干（通过 current_version_id）
@@ -69,7 +72,7 @@ def list_my_error_book(
         for r in rows
     ]
     
-    return ErrorBookListResp(total=total, page=page, size=size, items=items)
+    return ErrorBookListResp(total=total, page=page, size=size, items=items, next_cursor=cursor)
 
 
 @router.post("/{question_id}/record")
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.db.session import get_db
 from app.core.timezone import now
+from app.services import answer_writer
 import os
 
 router = APIRouter()
@@ -97,7 +98,16 @@ def health(db: Session = Depends(get_db), response: Response = None):
         }
         overall_healthy = False
     
-    # 3. 构建响应
+    # 3. 作答记录异步写入队列（队列深度、刷新耗时；积压超过八成容量或有丢弃时告警，不影响整体状态）
+    writer = answer_writer.metrics()
+    if not writer["enabled"]:
+        checks["answer_writer"] = {"status": "disabled", "message": "作答记录同步写入", "details": writer}
+    elif writer["queue_depth"] >= writer["capacity"] * 0.8 or writer["dropped_rows"]:
+        checks["answer_writer"] = {"status": "warning", "message": "作答写入队列积压或有丢弃", "details": writer}
+    else:
+        checks["answer_writer"] = {"status": "healthy", "message": "作答写入队列正常", "details": writer}
+
+    # 4. 构建响应
     result = {
         "status": "healthy" if overall_healthy else "unhealthy",
         "timestamp": now().isoformat(),
@@ -7,6 +7,7 @@ from app.models.user import User
 from app.schemas.practice import (
     CreateSessionRequest, CreateSessionResponse,
     QuestionView, SubmitAnswerRequest, SubmitAnswerResponse,
+    SubmitAnswersBatchRequest, SubmitAnswersBatchResponse,
     FinishResponse, SubjectOut
 )
 from app.services import practice_service
@@ -36,6 +37,11 @@ def get_question(attempt_id: int, seq: int, db: Session = Depends(get_db), me: U
 def submit_answer(attempt_id: int, body: SubmitAnswerRequest, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
     return practice_service.submit_answer(db, me, attempt_id, body.seq, body.user_answer, body.time_spent_ms)
 
+# 🆕 批量提交答案：一次请求判分多题，作答记录与错题本在同一事务中批量写入
+@router.post("/sessions/{attempt_id:int}/answers:batch", response_model=SubmitAnswersBatchResponse)
+def submit_answers_batch(attempt_id: int, body: SubmitAnswersBatchRequest, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
+    return practice_service.submit_answers_batch(db, me, attempt_id, body.items)
+
 @router.post("/sessions/{attempt_id:int}/finish", response_model=FinishResponse)
 def finish(attempt_id: int, db: Session = Depends(get_db), me: User = Depends(get_current_user)):
     return practice_service.finish(db, me, attempt_id)
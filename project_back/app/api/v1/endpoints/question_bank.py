@@ -5,9 +5,10 @@ from sqlalchemy.orm import Session
 from app.api import deps
 from app.services import question_bank_service
 from app.services import knowledge_service  # 🆕 知识点绑定功能
-import tempfile
+from app.services import knowledge_tree
+from app.services import import_jobs, question_export, question_formats
 from pathlib import Path
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 import logging
 import os
 
@@ -22,6 +23,7 @@ from app.schemas.question_bank import (
     QuestionTagsOut,
     SetQuestionTagsIn,
     ImportQuestionsResult,
+    ImportJobOut,
     QuestionsPageResp,
     QuestionPageItem,
 )
@@ -30,7 +32,6 @@ from app.schemas.knowledge import QuestionKnowledgeItem  # 🆕 知识点绑定s
 from app.models.user import User
 from app.models.question import Question
 from app.models.question_version import QuestionVersion
-from app.models.knowledge_point import KnowledgePoint
 from app.models.question_knowledge import QuestionKnowledge
 
 # 主路由器 (带 /question-bank 前缀)
@@ -64,13 +65,17 @@ def my_questions(
     active_only: bool = False,
     subject_id: int | None = Query(None),
     level_id: int | None = Query(None),
+    relevance: bool = Query(False, description="有关键字时按相关度排序"),
+    after: str | None = Query(None, description="游标：上一页返回的 next_cursor（传入时忽略 page）"),
+    with_total: bool = Query(True, description="是否统计总数（游标翻页时可关闭以省去 count）"),
     db: Session = Depends(deps.get_db),
     me: User = Depends(deps.get_current_user),  # 🔒 添加用户认证
 ):
     # 🔒 只返回当前用户创建的题目
-    total, rows = question_bank_service.list_my_questions(
+    total, rows, cursor = question_bank_service.list_my_questions(
         db, me, page, size, keyword, qtype, difficulty, active_only,
-        subject_id=subject_id, level_id=level_id
+        subject_id=subject_id, level_id=level_id, relevance=relevance,
+        after=after, with_total=with_total,
     )
     items = [
         MyQuestionItem(
@@ -84,7 +89,7 @@ def my_questions(
             updated_at=r.updated_at,
         ) for r in rows
     ]
-    return {"total": total, "page": page, "size": size, "items": items}
+    return {"total": total, "page": page, "size": size, "items": items, "next_cursor": cursor}
 
 @router.get("/my-questions-alt", response_model=MyQuestionListResp)  # 🔧 重命名避免冲突
 def list_my_questions(
@@ -94,12 +99,16 @@ def list_my_questions(
     qtype: str | None = Query(None),
     difficulty: int | None = Query(None),
     active_only: bool = Query(False),
+    relevance: bool = Query(False, description="有关键字时按相关度排序"),
+    after: str | None = Query(None, description="游标：上一页返回的 next_cursor（传入时忽略 page）"),
+    with_total: bool = Query(True, description="是否统计总数"),
     db: Session = Depends(deps.get_db),
     me: User = Depends(deps.get_current_user),
 ):
-    total, rows = question_bank_service.list_my_questions(
+    total, rows, cursor = question_bank_service.list_my_questions(
         db, me, page=page, size=size, keyword=keyword,
-        qtype=qtype, difficulty=difficulty, active_only=active_only
+        qtype=qtype, difficulty=difficulty, active_only=active_only, relevance=relevance,
+        after=after, with_total=with_total,
     )
     items = [
         MyQuestionItem(
@@ -113,7 +122,7 @@ def list_my_questions(
             updated_at=r.updated_at,
         ) for r in rows
     ]
-    return {"total": total, "page": page, "size": size, "items": items}
+    return {"total": total, "page": page, "size": size, "items": items, "next_cursor": cursor}
 
 def _parse_options(val):
     # to List[{"key":str,"text":str}]
@@ -312,6 +321,9 @@ def list_questions(
     difficulty: int | None = Query(None, ge=1, le=5, description="难度: 1-5"),
     subject_id: int | None = Query(None, description="学科ID"),
     level_id: int | None = Query(None, description="学段ID"),
+    relevance: bool = Query(False, description="有关键字时按相关度排序"),
+    after: str | None = Query(None, description="游标：上一页返回的 next_cursor（传入时忽略 page）"),
+    with_total: bool = Query(True, description="是否统计总数"),
     db: Session = Depends(deps.get_db),
     me: User = Depends(deps.get_current_user),
 ):
@@ -325,14 +337,18 @@ def list_questions(
     - **difficulty**: 难度筛选 (1-5)
     - **subject_id**: 学科ID筛选
     - **level_id**: 学段ID筛选
+    - **relevance**: 有关键字时按相关度排序（否则按 ID 倒序）
+    - **after**: 游标翻页，传上一页返回的 next_cursor（不能与 relevance 同用）；next_cursor 为空表示没有下一页
+    - **with_total**: 为 false 时不统计总数（total 返回 null）
     
     返回完整题目信息，包括题干、选项、答案、解析、标签等
     """
     uid = getattr(me, "id", None)
     is_admin = bool(getattr(me, "is_admin", False))
     
-    total, rows, tags_data = question_bank_service.list_questions_page(
-        db, page, size, keyword, qtype, difficulty, subject_id, level_id, uid, is_admin
+    total, rows, tags_data, cursor = question_bank_service.list_questions_page(
+        db, page, size, keyword, qtype, difficulty, subject_id, level_id, uid, is_admin, relevance=relevance,
+        after=after, with_total=with_total,
     )
     
     items = []
@@ -351,7 +367,7 @@ def list_questions(
             created_at=r.created_at,
         ))
     
-    return {"total": total, "page": page, "size": size, "items": items}
+    return {"total": total, "page": page, "size": size, "items": items, "next_cursor": cursor}
 
 @router.post("/import-excel", response_model=ImportQuestionsResult)
 def import_excel(
@@ -361,12 +377,9 @@ def import_excel(
 ):
     if not file.filename.lower().endswith(".xlsx"):
         raise HTTPException(status_code=400, detail="仅支持 .xlsx 文件")
-    tmp_path = None
+    # 🚀 优化：按块落盘，不再把整个上传读进内存（大文件建议使用 /import-jobs 异步导入）
+    tmp_path = import_jobs.save_upload(file.file, ".xlsx")
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-            content = file.file.read()
-            tmp.write(content)
-            tmp_path = tmp.name
         return question_bank_service.import_questions_from_excel(db, tmp_path, current_user.id)
     finally:
         try:
@@ -375,6 +388,51 @@ def import_excel(
         except Exception:
             pass
 
+# ==== 🆕 题库导出：流式返回当前用户的题目（列同导入模板，另附知识点路径） ====
+
+@router.get("/export")
+def export_questions(
+    format: str = Query("xlsx", pattern="^(xlsx|csv|jsonl)$"),
+    active_only: bool = Query(True),
+    current_user=Depends(deps.get_current_user)
+):
+    # 生成器内自建会话，不使用请求的 get_db 会话（流式发送时请求依赖可能已清理）
+    return StreamingResponse(
+        question_export.iter_export(current_user.id, format, active_only),
+        media_type=question_export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="questions.{format}"'},
+    )
+
+# ==== 🆕 异步导入任务：上传落盘后立即返回任务，后台导入，客户端轮询进度 ====
+
+@router.post("/import-jobs", response_model=ImportJobOut, status_code=202)
+def create_import_job(
+    file: UploadFile = File(...),
+    db: Session = Depends(deps.get_db),
+    current_user=Depends(deps.get_current_user)
+):
+    question_formats.detect_format(file.filename)  # xlsx / csv / jsonl
+    job = import_jobs.create_job(db, current_user.id, file.filename, file.file)
+    return import_jobs.to_out(job)
+
+@router.get("/import-jobs/{job_id}", response_model=ImportJobOut)
+def get_import_job(
+    job_id: int = PathParam(..., ge=1),
+    db: Session = Depends(deps.get_db),
+    current_user=Depends(deps.get_current_user)
+):
+    job = import_jobs.get_job(db, job_id, current_user.id, bool(getattr(current_user, "is_admin", False)))
+    return import_jobs.to_out(job)
+
+@router.post("/import-jobs/{job_id}/cancel", response_model=ImportJobOut)
+def cancel_import_job(
+    job_id: int = PathParam(..., ge=1),
+    db: Session = Depends(deps.get_db),
+    current_user=Depends(deps.get_current_user)
+):
+    job = import_jobs.cancel_job(db, job_id, current_user.id, bool(getattr(current_user, "is_admin", False)))
+    return import_jobs.to_out(job)
+
 # ==== 🆕 题目知识点绑定功能 (从 knowledge.py 迁移) ====
 
 # 🔒 获取题目作者ID辅助函数
@@ -387,18 +445,9 @@ def _get_question_owner_id(q: Question, db: Session) -> Optional[int]:
                  .scalar()
     return None
 
-# 构造知识点路径
+# 构造知识点路径（🚀 走进程内知识点树索引，无需逐级查库）
 def _kp_path(db: Session, kid: int) -> str:
-    cur = db.query(KnowledgePoint).filter(KnowledgePoint.id == kid).first()
-    if not cur:
-        return f"#{kid}"
-    names = [cur.name]
-    while cur.parent_id:
-        cur = db.query(KnowledgePoint).filter(KnowledgePoint.id == cur.parent_id).first()
-        if not cur: break
-        names.append(cur.name)
-    names.reverse()
-    return "/".join(names)
+    return knowledge_tree.get_tree(db).path(kid) or f"#{kid}"
 
 @questions_router.get("/{qid}/knowledge")
 def get_question_knowledge(
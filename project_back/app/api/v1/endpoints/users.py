@@ -33,11 +33,15 @@ def list_users_simple(
     limit: int = 20,
     account: str | None = None,
     email: str | None = None,
+    after: str | None = None,  # 游标：上一页返回的 next_cursor（传入时忽略 skip）
+    with_total: bool = True,   # false 时不统计总数
     db: Session = Depends(get_db),
     admin: User = Depends(require_admin)  # 仅管理员可查看用户列表
 ):
     """查看用户列表 - 仅管理员可用"""
-    return user_service.list_users_simple(db, skip=skip, limit=limit, account=account, email=email)
+    return user_service.list_users_simple(
+        db, skip=skip, limit=limit, account=account, email=email, after=after, with_total=with_total
+    )
 
 
 @router.get("/{user_id:int}", response_model=UserOut)
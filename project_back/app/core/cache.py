@@ -0,0 +1,89 @@
+"""
+进程内 LRU + TTL 缓存
+
+用于缓存按用户/会话划分的只读数据（如抽题候选池），特点：
+- 条目数上限 maxsize，超出时淘汰最久未使用的条目
+- 可选总权重上限 max_weight（weigh(value) 计算单个条目的权重，如数组行数），控制总内存
+- 可选 ttl（秒），过期条目在访问时惰性删除；多进程部署下作为兜底刷新
+- 线程安全（单把锁，临界区只做字典操作）
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    def __init__(
+        self,
+        maxsize: int = 128,
+        ttl: Optional[float] = None,
+        max_weight: Optional[int] = None,
+        weigh: Optional[Callable[[Any], int]] = None,
+    ):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self._weigh = weigh or (lambda _value: 1)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, expires_at, weight)
+        self._weight = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at, weight = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._data[key]
+                self._weight -= weight
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> bool:
+        """写入条目；单个条目超过 max_weight 时不缓存并返回 False"""
+        weight = int(self._weigh(value))
+        if self.max_weight is not None and weight > self.max_weight:
+            self.pop(key)
+            return False
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._weight -= old[2]
+            self._data[key] = (value, expires_at, weight)
+            self._weight += weight
+            while len(self._data) > self.maxsize or (
+                self.max_weight is not None and self._weight > self.max_weight
+            ):
+                _, (_, _, w) = self._data.popitem(last=False)
+                self._weight -= w
+        return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return default
+            self._weight -= entry[2]
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._weight = 0
+
+    @property
+    def weight(self) -> int:
+        return self._weight
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+
+_MISSING = object()
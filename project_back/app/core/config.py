@@ -35,6 +35,38 @@ class Settings:
     JWT_SECRET = _get("JWT_SECRET", "change_me_please")
     JWT_ALG = "HS256"
     JWT_EXPIRE_MINUTES = int(_get("JWT_EXPIRE_MINUTES", "60"))
+    # 进程内缓存：知识点树索引的最长存活时间（多进程部署下的兜底刷新）
+    KNOWLEDGE_TREE_TTL_SECONDS = int(_get("KNOWLEDGE_TREE_TTL_SECONDS", "300"))
+    # 进程内缓存：按用户的抽题候选池（最多缓存用户数 / 存活时间 / 单用户题量上限 / 所有池的总题量上限）
+    QUESTION_POOL_CACHE_SIZE = int(_get("QUESTION_POOL_CACHE_SIZE", "256"))
+    QUESTION_POOL_TTL_SECONDS = int(_get("QUESTION_POOL_TTL_SECONDS", "600"))
+    QUESTION_POOL_MAX_QUESTIONS = int(_get("QUESTION_POOL_MAX_QUESTIONS", "200000"))
+    QUESTION_POOL_MAX_TOTAL = int(_get("QUESTION_POOL_MAX_TOTAL", "2000000"))
+    # 进程内缓存：练习会话快照（最多缓存会话数 / 存活时间）
+    ATTEMPT_SNAPSHOT_CACHE_SIZE = int(_get("ATTEMPT_SNAPSHOT_CACHE_SIZE", "2048"))
+    ATTEMPT_SNAPSHOT_TTL_SECONDS = int(_get("ATTEMPT_SNAPSHOT_TTL_SECONDS", "3600"))
+    # 判分：是否对答案做 NFKC 折叠（全角字母/数字/空格视同半角）；按题目版本缓存的匹配器数量
+    GRADING_NFKC_FOLD = _as_bool(_get("GRADING_NFKC_FOLD", "false"))
+    GRADING_MATCHER_CACHE_SIZE = int(_get("GRADING_MATCHER_CACHE_SIZE", "20000"))
+    # 作答记录异步批量写入（默认关闭）：队列容量 / 每批最多行数 / 刷新间隔 / 队列满时提交方最长等待
+    ANSWER_WRITE_BEHIND = _as_bool(_get("ANSWER_WRITE_BEHIND", "false"))
+    ANSWER_WRITE_BEHIND_QUEUE_SIZE = int(_get("ANSWER_WRITE_BEHIND_QUEUE_SIZE", "10000"))
+    ANSWER_WRITE_BEHIND_BATCH_ROWS = int(_get("ANSWER_WRITE_BEHIND_BATCH_ROWS", "500"))
+    ANSWER_WRITE_BEHIND_FLUSH_MS = int(_get("ANSWER_WRITE_BEHIND_FLUSH_MS", "200"))
+    ANSWER_WRITE_BEHIND_PUT_TIMEOUT_MS = int(_get("ANSWER_WRITE_BEHIND_PUT_TIMEOUT_MS", "2000"))
+    # 题目导入：并行校验的进程数（<=1 表示在当前进程校验）/ 每块行数 / 每批写库行数
+    IMPORT_VALIDATE_WORKERS = int(_get("IMPORT_VALIDATE_WORKERS", "0"))
+    IMPORT_VALIDATE_CHUNK_ROWS = int(_get("IMPORT_VALIDATE_CHUNK_ROWS", "2000"))
+    IMPORT_BATCH_ROWS = int(_get("IMPORT_BATCH_ROWS", "500"))
+    # 题目导入任务：上传落盘目录（默认系统临时目录下 question_import）/ 上传大小上限 / 后台线程数 /
+    # RUNNING 任务心跳超时（启动时据此判定为中断）/ 任务保存的错误明细条数上限
+    IMPORT_UPLOAD_DIR = _get("IMPORT_UPLOAD_DIR", "")
+    IMPORT_MAX_UPLOAD_MB = int(_get("IMPORT_MAX_UPLOAD_MB", "50"))
+    IMPORT_JOB_WORKERS = int(_get("IMPORT_JOB_WORKERS", "1"))
+    IMPORT_JOB_STALE_SECONDS = int(_get("IMPORT_JOB_STALE_SECONDS", "600"))
+    IMPORT_JOB_MAX_ERRORS = int(_get("IMPORT_JOB_MAX_ERRORS", "1000"))
+    # 题库导出：按 ID 分批读取时每批的行数（每批各查一次标签与知识点）
+    EXPORT_YIELD_PER = int(_get("EXPORT_YIELD_PER", "1000"))
 
 @lru_cache
 def get_settings() -> Settings:
@@ -0,0 +1,48 @@
+"""
+键集（游标）分页的游标编码
+
+OFFSET 分页越往后越慢（数据库要先扫过前面所有行），每页还要额外 count() 一次。
+游标分页按列表原有的排序键记下本页最后一行（如 [Question.id] 或 [last_wrong_time, id]），
+下一页用 WHERE (排序键) 在其之后 + LIMIT 直接从索引位置继续，代价与页码无关。
+
+游标对客户端不透明：排序键值的 JSON（datetime 转 ISO 字符串）经 base64url 编码。
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+from app.core.exceptions import AppException
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """按 types（int / datetime）解出游标中的排序键值（datetime 允许为 None）；格式不对时抛出 400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        out = []
+        for v, t in zip(values, types):
+            if t is datetime:
+                out.append(None if v is None else datetime.fromisoformat(v))
+            elif t is int and isinstance(v, int) and not isinstance(v, bool):
+                out.append(v)
+            else:
+                raise ValueError(cursor)
+        return out
+    except (ValueError, TypeError):
+        raise AppException("无效的分页游标", code=400, status_code=400)
+
+
+def next_cursor(rows: list, size: int, key) -> Optional[str]:
+    """rows 为按 size + 1 取回的行：多出一行说明还有下一页，截掉多余行并返回以本页最后一行为起点的游标"""
+    if len(rows) <= size:
+        return None
+    del rows[size:]
+    return encode_cursor(key(rows[-1]))
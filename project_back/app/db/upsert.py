@@ -0,0 +1,35 @@
+"""
+方言相关的 INSERT ... ON DUPLICATE KEY / ON CONFLICT 构造
+
+- MySQL / MariaDB: INSERT ... ON DUPLICATE KEY UPDATE（按唯一键冲突）
+- SQLite / PostgreSQL: INSERT ... ON CONFLICT (conflict_cols) DO UPDATE
+- 其它方言返回 None，由调用方回退为先查后写
+"""
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+_DIALECTS = {"mysql": mysql, "mariadb": mysql, "sqlite": sqlite, "postgresql": postgresql}
+
+
+def build_upsert(
+    db: Session,
+    model,
+    rows: List[dict],
+    conflict_cols: Sequence[str],
+    make_set: Callable[[object], List[Tuple[str, object]]],
+):
+    """构造多行 upsert 语句；当前方言不支持时返回 None
+
+    make_set(incoming) 返回有序的 [(列名, 表达式)]，incoming 为“本次插入的值”
+    （MySQL 的 VALUES()，其它方言的 excluded）。MySQL 按顺序求值 SET，
+    后续表达式看到的是已更新的值，因此被其它表达式引用的列应放在最后赋值。
+    """
+    dialect = _DIALECTS.get(db.get_bind().dialect.name)
+    if dialect is None:
+        return None
+    stmt = dialect.insert(model).values(rows)
+    if dialect is mysql:
+        return stmt.on_duplicate_key_update(make_set(stmt.inserted))
+    return stmt.on_conflict_do_update(index_elements=list(conflict_cols), set_=dict(make_set(stmt.excluded)))
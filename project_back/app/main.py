@@ -9,6 +9,7 @@ from app.core.error_handlers import register_exception_handlers
 import tracemalloc
 from app.db.session import SessionLocal
 from app.services.admin_init import init_admin_from_env
+from app.services import answer_writer, import_jobs
 
 # 开关：默认开启，设置为 0/false/off 可关闭
 if os.getenv("ENABLE_TRACEMALLOC", "1").lower() in ("1", "true", "yes", "on"):
@@ -60,6 +61,17 @@ def create_app() -> FastAPI:
                 db.close()
         except Exception as e:
             logging.getLogger(__name__).warning("admin init on startup failed: %s", e)
+        # 作答记录异步批量写入（ANSWER_WRITE_BEHIND 开启时）
+        answer_writer.start()
+        # 题目导入任务后台线程（重新排队未开始的任务）
+        import_jobs.start()
+
+    @app.on_event("shutdown")
+    def _shutdown():
+        # 关闭前排空作答写入队列
+        answer_writer.stop()
+        # 运行中的导入任务在当前批写完后停止
+        import_jobs.stop()
 
     return app
 
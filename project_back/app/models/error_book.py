@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, Integer, DateTime, Boolean, UniqueConstraint
+from sqlalchemy import Column, BigInteger, Integer, DateTime, Boolean, Double, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from app.db.base import Base
 
@@ -12,10 +12,18 @@ class ErrorBook(Base):
     last_wrong_time = Column(DateTime)
     wrong_count = Column(Integer, nullable=False, default=0)
     next_review_time = Column(DateTime)
+    # 🆕 SM-2 复习调度状态（见 app/services/spaced_repetition.py）
+    ease_factor = Column(Double, nullable=False, default=2.5, server_default="2.5")
+    review_interval = Column(Integer, nullable=False, default=0, server_default="0")  # 当前复习间隔（天）
+    repetitions = Column(Integer, nullable=False, default=0, server_default="0")      # 连续答对次数
     mastered = Column(Boolean, nullable=False, default=False)
     created_at = Column(DateTime, nullable=False, server_default=func.now())
     updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
 
     __table_args__ = (
         UniqueConstraint("user_id", "question_id", name="uk_error_book_user_question"),
+        # 复习队列：按 (user_id, mastered=0) 定位后沿 next_review_time 范围扫描
+        Index("idx_error_book_due", "user_id", "mastered", "next_review_time"),
+        # 错题本列表：按 (user_id, mastered=0) 定位后沿 last_wrong_time 倒序取（游标翻页同样走此索引，id 由主键隐含）
+        Index("idx_error_book_recent", "user_id", "mastered", "last_wrong_time"),
     )
@@ -14,4 +14,8 @@ class ExamAttempt(Base):
     calculated_accuracy = Column(Numeric(6,4))
     status = Column(String(32), default="IN_PROGRESS")
     duration_seconds = Column(Integer)
+    # 进度计数：组卷时写入题目数，提交答案时原子增量维护，避免 COUNT 查询
+    question_count = Column(Integer, nullable=False, default=0, server_default="0")
+    answered_count = Column(Integer, nullable=False, default=0, server_default="0")
+    correct_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, nullable=False, server_default=func.now())
\ No newline at end of file
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Boolean, JSON, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class ImportJob(Base):
+    """题目导入任务：上传文件落盘后由后台线程导入，客户端轮询进度
+
+    status: PENDING（排队） -> RUNNING -> SUCCEEDED / FAILED / CANCELLED
+    """
+    __tablename__ = "IMPORT_JOB"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(BigInteger, ForeignKey("USER.id", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
+    filename = Column(String(255), nullable=False)
+    file_path = Column(String(500), nullable=True)                 # 落盘文件，任务结束后删除并置空
+    status = Column(String(16), nullable=False, default="PENDING", server_default="PENDING")
+    cancel_requested = Column(Boolean, nullable=False, default=False, server_default="0")
+    estimated_rows = Column(Integer, nullable=True)                # 工作表声明的数据行数（含空行），用于估算进度
+    processed_rows = Column(Integer, nullable=False, default=0, server_default="0")
+    success_rows = Column(Integer, nullable=False, default=0, server_default="0")
+    failed_rows = Column(Integer, nullable=False, default=0, server_default="0")
+    errors = Column(JSON, nullable=True)                           # 结束时写入 [{row, reason}]，按行号排序
+    message = Column(String(500), nullable=True)                   # 任务级错误（表头不匹配、服务重启中断等）
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=True)                   # 进度心跳
+
+    __table_args__ = (
+        Index("idx_import_job_user", "user_id", "id"),
+        Index("idx_import_job_status", "status"),
+    )
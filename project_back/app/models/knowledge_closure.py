@@ -0,0 +1,15 @@
+from sqlalchemy import Column, BigInteger, Integer, ForeignKey, Index
+from app.db.base import Base
+
+class KnowledgeClosure(Base):
+    """知识点闭包表：每条记录表示 ancestor → descendant 的一条路径（含 distance=0 的自身记录）"""
+    __tablename__ = "KNOWLEDGE_CLOSURE"
+
+    ancestor_id = Column(BigInteger, ForeignKey("KNOWLEDGE_POINT.id", ondelete="CASCADE", onupdate="CASCADE"), primary_key=True)
+    descendant_id = Column(BigInteger, ForeignKey("KNOWLEDGE_POINT.id", ondelete="CASCADE", onupdate="CASCADE"), primary_key=True)
+    distance = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # 主键 (ancestor_id, descendant_id) 支撑子树查询；此索引支撑祖先查询
+        Index("idx_kc_descendant_ancestor", "descendant_id", "ancestor_id"),
+    )
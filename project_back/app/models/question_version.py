@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, ForeignKey, String, Text, JSON, Boolean, DateTime , text
+from sqlalchemy import Column, Integer, BigInteger, ForeignKey, String, Text, JSON, Boolean, DateTime , Index, UniqueConstraint, text
 from sqlalchemy.sql import func
 from app.db.base import Base
 
@@ -9,6 +9,8 @@ class QuestionVersion(Base):
     question_id = Column(Integer, ForeignKey("QUESTION.id"), nullable=False)
     version_no = Column(Integer, nullable=False, default=1, server_default=text("1"))
     stem = Column(Text, nullable=False)
+    # 🆕 题干查重：空白折叠后题干的 SHA-1（见 question_import.stem_hash），与 created_by 组成索引
+    stem_hash = Column(String(40), nullable=True)
     options = Column(JSON, nullable=True)
     correct_answer = Column(String(255), nullable=True)
     explanation = Column(Text, nullable=True)
@@ -17,5 +19,13 @@ class QuestionVersion(Base):
     is_active = Column(Boolean, nullable=False, default=True)
     created_at = Column(DateTime, nullable=False, server_default=func.now())
 
+    __table_args__ = (
+        # 与 sql/00_init.sql 一致：导入回填 current_version_id 等按 (question_id, version_no) 查找版本
+        UniqueConstraint("question_id", "version_no", name="uk_question_version"),
+        Index("idx_qv_creator_stem_hash", "created_by", "stem_hash"),
+        # 🆕 题干全文索引（仅 MySQL：ngram 分词；SQLite 使用 FTS5 表，见 stem_search）
+        Index("ft_qv_stem", "stem", mysql_prefix="FULLTEXT", mysql_with_parser="ngram").ddl_if(dialect="mysql"),
+    )
+
     # 如果你后来加了 updated_at，可再补：
     # updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
\ No newline at end of file
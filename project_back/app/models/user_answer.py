@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Boolean, Numeric
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Boolean, Numeric, UniqueConstraint
 from app.db.base import Base
 
 class UserAnswer(Base):
@@ -13,4 +13,9 @@ class UserAnswer(Base):
     score_obtained = Column(Numeric(10,2))
     time_spent_ms = Column(Integer)
     answer_time = Column(DateTime)
-    first_flag = Column(Boolean, default=False, nullable=False)
\ No newline at end of file
+    first_flag = Column(Boolean, default=False, nullable=False)
+
+    __table_args__ = (
+        # 与 sql/00_init.sql 一致：同一会话同一题只保留一条作答记录
+        UniqueConstraint("attempt_id", "question_id", name="uk_answer_attempt_question"),
+    )
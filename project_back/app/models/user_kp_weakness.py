@@ -0,0 +1,16 @@
+from sqlalchemy import Column, BigInteger, Integer, DateTime, Double, ForeignKey
+from app.db.base import Base
+
+class UserKpWeakness(Base):
+    """用户薄弱知识点画像：按错题本增量维护的知识点直接权重（时间衰减在读取时计算）
+
+    subject_id = 0 的行汇总全部错题；其余行只汇总属于该学科的错题，用于按学科筛选候选知识点。
+    """
+    __tablename__ = "USER_KP_WEAKNESS"
+
+    user_id = Column(BigInteger, ForeignKey("USER.id", ondelete="CASCADE", onupdate="CASCADE"), primary_key=True)
+    subject_id = Column(BigInteger, primary_key=True, default=0)
+    knowledge_id = Column(BigInteger, ForeignKey("KNOWLEDGE_POINT.id", ondelete="CASCADE", onupdate="CASCADE"), primary_key=True)
+    wrong_count = Column(Integer, nullable=False, default=0)       # 未掌握错题的错误次数之和
+    direct_weight = Column(Double, nullable=False, default=0)      # Σ 错误次数 × e^(-衰减率 × 天数)，按 last_update 所在周期起点计
+    last_update = Column(DateTime, nullable=False)
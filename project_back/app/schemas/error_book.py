@@ -16,7 +16,8 @@ class ErrorBookItem(BaseModel):
         from_attributes = True
 
 class ErrorBookListResp(BaseModel):
-    total: int
+    total: Optional[int] = None  # with_total=false 时为空
     page: int
     size: int
-    items: List[ErrorBookItem]
\ No newline at end of file
+    items: List[ErrorBookItem]
+    next_cursor: Optional[str] = None  # 🆕 游标翻页：下一次请求的 after，为空表示没有下一页
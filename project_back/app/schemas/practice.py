@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Literal
 
 class CreateSessionRequest(BaseModel):
@@ -7,7 +7,7 @@ class CreateSessionRequest(BaseModel):
     knowledge_id: Optional[int] = None  # 知识点ID,支持按知识点筛选题目
     include_children: Optional[bool] = True  # 是否包含子知识点
     question_types: Optional[List[str]] = None  # 题型列表,如["SC","MC","FILL"],None表示全部类型
-    practice_mode: Optional[Literal['RANDOM', 'SMART', 'WEAK_POINT']] = 'RANDOM'  # 🆕 练习模式
+    practice_mode: Optional[Literal['RANDOM', 'SMART', 'WEAK_POINT', 'REVIEW']] = 'RANDOM'  # 🆕 练习模式
 
 class CreateSessionResponse(BaseModel):
     attempt_id: int
@@ -35,6 +35,25 @@ class SubmitAnswerResponse(BaseModel):
     correct_answer: str
     total: int
 
+# 🆕 批量提交答案（弱网/离线场景一次提交多题）
+class BatchAnswerItem(BaseModel):
+    seq: int
+    user_answer: str
+    time_spent_ms: Optional[int] = None
+
+class SubmitAnswersBatchRequest(BaseModel):
+    items: List[BatchAnswerItem] = Field(..., min_length=1, max_length=200)
+
+class BatchAnswerResult(BaseModel):
+    seq: int
+    correct: Optional[bool] = None
+    correct_answer: Optional[str] = None
+    error: Optional[str] = None  # 该题提交失败的原因（如题目不存在），其余题目不受影响
+
+class SubmitAnswersBatchResponse(BaseModel):
+    total: int
+    results: List[BatchAnswerResult]
+
 class FinishResponse(BaseModel):
     total: int
     answered: int
@@ -15,10 +15,11 @@ class MyQuestionItem(BaseModel):
     updated_at: datetime
 
 class MyQuestionListResp(BaseModel):
-    total: int
+    total: Optional[int] = None  # with_total=false 时为空
     page: int
     size: int
     items: List[MyQuestionItem]
+    next_cursor: Optional[str] = None  # 🆕 游标翻页：下一次请求的 after，为空表示没有下一页
 
 class QuestionOption(BaseModel):
     key: Optional[str] = None
@@ -77,6 +78,24 @@ class ImportQuestionsResult(BaseModel):
     failed: int
     errors: List[ImportErrorItem] = []
 
+# 🆕 题目导入任务（异步导入的状态与进度）
+class ImportJobOut(BaseModel):
+    id: int
+    filename: str
+    status: str  # PENDING/RUNNING/SUCCEEDED/FAILED/CANCELLED
+    cancel_requested: bool = False
+    estimated_rows: Optional[int] = None  # 工作表声明的数据行数（含空行），未知时为 None
+    processed_rows: int = 0
+    success: int = 0
+    failed: int = 0
+    progress: Optional[float] = None  # 0~1，按 estimated_rows 估算
+    eta_seconds: Optional[int] = None
+    errors: List[ImportErrorItem] = []  # 任务结束后给出（最多 IMPORT_JOB_MAX_ERRORS 条）
+    message: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
 # 🆕 通用题目分页项
 class QuestionPageItem(BaseModel):
     id: int
@@ -92,7 +111,8 @@ class QuestionPageItem(BaseModel):
 
 # 🆕 通用题目分页响应
 class QuestionsPageResp(BaseModel):
-    total: int
+    total: Optional[int] = None  # with_total=false 时为空
     page: int
     size: int
-    items: List[QuestionPageItem]
\ No newline at end of file
+    items: List[QuestionPageItem]
+    next_cursor: Optional[str] = None  # 🆕 游标翻页：下一次请求的 after，为空表示没有下一页
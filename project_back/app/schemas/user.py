@@ -56,8 +56,9 @@ class UserSimple(BaseModel):
     role: Optional[str] = None  # 主角色名称，如“管理员/普通用户”
 
 class UsersSimplePage(BaseModel):
-    total: int
+    total: Optional[int] = None  # with_total=false 时为空
     items: List[UserSimple]
+    next_cursor: Optional[str] = None  # 🆕 游标翻页：下一次请求的 after，为空表示没有下一页
 
 # 个人中心所需模型
 class UserInfo(BaseModel):
@@ -86,4 +87,4 @@ class ChangePasswordRequest(BaseModel):
 class AdminUpdateUserRequest(BaseModel):
     nickname: Optional[str] = None
     email: Optional[str] = None      # 如需严格校验可改 EmailStr
-    status: Optional[str] = None     # ACTIVE / DISABLED / ...
\ No newline at end of file
+    status: Optional[str] = None     # ACTIVE / DISABLED / ...
@@ -0,0 +1,295 @@
+"""
+作答记录异步批量写入（write-behind）
+
+USER_ANSWER 的插入/改答（含 time_spent_ms）属于作答明细，原先在每次点击的请求中同步提交。
+开启 ANSWER_WRITE_BEHIND 后：
+- 判分、会话进度计数、错题本仍在请求中同步完成
+- 作答记录放入进程内有界队列，由后台线程按“每 N 毫秒或攒满 M 行”合并为多行 upsert 写入
+- 同一会话同一题在一批中多次作答时只写最后一次（单线程按入队顺序刷新，保证后写覆盖先写）
+- 队列满时提交方最多等待 ANSWER_WRITE_BEHIND_PUT_TIMEOUT_MS，仍无空位则返回 503（背压）
+- 应用关闭时排空队列；重建会话快照、结束会话前先排空，保证读到完整的作答记录
+- 写入失败按退避重试，多次失败后丢弃该批并记录日志与指标
+
+注意：已入队但未刷新的作答在进程崩溃时会丢失；多进程部署下各进程各自排空，
+其它进程重建快照时可能看不到尚未刷新的作答，建议配合会话粘滞使用。
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert
+
+from app.core.config import settings
+from app.core.exceptions import AppException
+from app.db.upsert import build_upsert
+from app.models.user_answer import UserAnswer
+
+log = logging.getLogger("answer_writer")
+
+_MAX_RETRIES = 3
+
+
+def enabled() -> bool:
+    return settings.ANSWER_WRITE_BEHIND
+
+
+def write_answers(db, rows: List[dict]) -> int:
+    """把作答行写入 USER_ANSWER（新作答插入，已有记录改答），返回合并后的行数；不提交事务
+
+    rows 需包含 attempt_id / user_id / question_id / paper_id / user_answer / is_correct / time_spent_ms / answer_time，
+    同一 (attempt_id, question_id) 以最后一行为准。
+    """
+    latest: Dict[Tuple[int, int], dict] = {}
+    for row in rows:
+        latest[(row["attempt_id"], row["question_id"])] = dict(row, first_flag=True)
+    rows = list(latest.values())
+    if not rows:
+        return 0
+
+    def make_set(incoming):
+        return [
+            ("user_answer", incoming.user_answer),
+            ("is_correct", incoming.is_correct),
+            ("time_spent_ms", incoming.time_spent_ms),
+            ("answer_time", incoming.answer_time),
+        ]
+
+    stmt = build_upsert(db, UserAnswer, rows, ("attempt_id", "question_id"), make_set)
+    if stmt is not None:
+        db.execute(stmt)
+        return len(rows)
+
+    # 不支持 upsert 的方言：按会话查出已有题目，再拆成批量 UPDATE / INSERT
+    existing = set()
+    for attempt_id in {r["attempt_id"] for r in rows}:
+        qids = [r["question_id"] for r in rows if r["attempt_id"] == attempt_id]
+        existing.update(
+            (attempt_id, qid) for (qid,) in db.query(UserAnswer.question_id).filter(
+                UserAnswer.attempt_id == attempt_id, UserAnswer.question_id.in_(qids)
+            ).all()
+        )
+    updates = [
+        dict(r, b_attempt=r["attempt_id"], b_qid=r["question_id"])
+        for r in rows if (r["attempt_id"], r["question_id"]) in existing
+    ]
+    inserts = [r for r in rows if (r["attempt_id"], r["question_id"]) not in existing]
+    if updates:
+        t = UserAnswer.__table__
+        db.execute(
+            t.update().where(
+                t.c.attempt_id == bindparam("b_attempt"), t.c.question_id == bindparam("b_qid")
+            ).values(
+                user_answer=bindparam("user_answer"), is_correct=bindparam("is_correct"),
+                time_spent_ms=bindparam("time_spent_ms"), answer_time=bindparam("answer_time"),
+            ),
+            updates,
+        )
+    if inserts:
+        db.execute(insert(UserAnswer), inserts)
+    return len(rows)
+
+
+class AnswerWriter:
+    def __init__(
+        self,
+        session_factory=None,
+        capacity: int = settings.ANSWER_WRITE_BEHIND_QUEUE_SIZE,
+        batch_rows: int = settings.ANSWER_WRITE_BEHIND_BATCH_ROWS,
+        flush_ms: int = settings.ANSWER_WRITE_BEHIND_FLUSH_MS,
+        put_timeout_ms: int = settings.ANSWER_WRITE_BEHIND_PUT_TIMEOUT_MS,
+    ):
+        self._session_factory = session_factory
+        self.capacity = max(1, capacity)
+        self.batch_rows = max(1, batch_rows)
+        self.flush_interval = max(1, flush_ms) / 1000
+        self.put_timeout = max(0, put_timeout_ms) / 1000
+
+        self._buf: deque = deque()
+        self._inflight = 0
+        self._flush_now = False
+        self._stopping = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+        self._stats = {
+            "enqueued_rows": 0, "flushed_rows": 0, "flushes": 0, "failed_flushes": 0,
+            "dropped_rows": 0, "rejected_rows": 0, "max_depth": 0,
+            "last_flush_ms": 0.0, "max_flush_ms": 0.0, "total_flush_ms": 0.0,
+        }
+
+    # ---------- 生命周期 ----------
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="answer-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 30) -> None:
+        """排空队列后停止后台线程"""
+        with self._cond:
+            if self._thread is None:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            log.error("answer writer did not stop within %ss, %d rows pending", timeout, len(self._buf))
+        self._thread = None
+
+    # ---------- 生产者 ----------
+
+    def submit(self, rows: List[dict]) -> None:
+        """入队一批作答行；队列满时等待，超时抛出 503"""
+        if not rows:
+            return
+        if self._thread is None:
+            self.start()
+        deadline = time.monotonic() + self.put_timeout
+        with self._cond:
+            while len(self._buf) + len(rows) > self.capacity and len(self._buf) > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["rejected_rows"] += len(rows)
+                    raise AppException("系统繁忙，请稍后重试", code=503, status_code=503)
+                self._flush_now = True
+                self._cond.notify_all()
+                self._cond.wait(remaining)
+            self._buf.extend(rows)
+            self._stats["enqueued_rows"] += len(rows)
+            self._stats["max_depth"] = max(self._stats["max_depth"], len(self._buf))
+            if len(self._buf) >= self.batch_rows:
+                self._cond.notify_all()
+
+    def drain(self, timeout: float = 10) -> bool:
+        """等待队列中已有的作答全部写入；后台线程未运行时在当前线程直接写入"""
+        if self._thread is None or not self._thread.is_alive():
+            while True:
+                with self._cond:
+                    batch = self._take()
+                if not batch:
+                    return True
+                self._flush_batch(batch)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._buf or self._inflight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    log.warning("answer writer drain timed out, %d rows pending", len(self._buf) + self._inflight)
+                    return False
+                self._flush_now = True
+                self._cond.notify_all()
+                self._cond.wait(remaining)
+        return True
+
+    # ---------- 后台线程 ----------
+
+    def _take(self) -> List[dict]:
+        n = min(self.batch_rows, len(self._buf))
+        return [self._buf.popleft() for _ in range(n)]
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._stopping and not self._flush_now and len(self._buf) < self.batch_rows:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if not self._buf:
+                    self._flush_now = False
+                    self._cond.notify_all()
+                    if self._stopping:
+                        return
+                    continue
+                batch = self._take()
+                self._inflight = len(batch)
+                if not self._buf:
+                    self._flush_now = False
+            try:
+                self._flush_batch(batch)
+            finally:
+                with self._cond:
+                    self._inflight = 0
+                    self._cond.notify_all()
+
+    def _flush_batch(self, batch: List[dict]) -> None:
+        if self._session_factory is None:
+            from app.db.session import SessionLocal
+            self._session_factory = SessionLocal
+        for attempt in range(1, _MAX_RETRIES + 1):
+            t0 = time.perf_counter()
+            db = self._session_factory()
+            try:
+                write_answers(db, batch)
+                db.commit()
+            except Exception:
+                db.rollback()
+                with self._cond:
+                    self._stats["failed_flushes"] += 1
+                log.exception("answer writer flush failed (attempt %d/%d, %d rows)", attempt, _MAX_RETRIES, len(batch))
+                if attempt < _MAX_RETRIES:
+                    time.sleep(0.2 * 2 ** attempt)
+                    continue
+                with self._cond:
+                    self._stats["dropped_rows"] += len(batch)
+                return
+            finally:
+                db.close()
+            ms = (time.perf_counter() - t0) * 1000
+            # 计数与 submit / metrics 一样在锁内更新（drain 可能与后台线程同时刷写）
+            with self._cond:
+                self._stats["flushes"] += 1
+                self._stats["flushed_rows"] += len(batch)
+                self._stats["last_flush_ms"] = round(ms, 3)
+                self._stats["max_flush_ms"] = round(max(self._stats["max_flush_ms"], ms), 3)
+                self._stats["total_flush_ms"] += ms
+            return
+
+    # ---------- 指标 ----------
+
+    def metrics(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            depth = len(self._buf)
+            inflight = self._inflight
+        flushes = stats.pop("flushes")
+        total_ms = stats.pop("total_flush_ms")
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "queue_depth": depth,
+            "inflight_rows": inflight,
+            "capacity": self.capacity,
+            "flushes": flushes,
+            "avg_flush_ms": round(total_ms / flushes, 3) if flushes else 0.0,
+            **stats,
+        }
+
+
+_writer = AnswerWriter()
+
+
+def start() -> None:
+    if enabled():
+        _writer.start()
+
+
+def stop() -> None:
+    _writer.stop()
+
+
+def submit(rows: List[dict]) -> None:
+    _writer.submit(rows)
+
+
+def drain(timeout: float = 10) -> bool:
+    return _writer.drain(timeout)
+
+
+def metrics() -> dict:
+    return dict(_writer.metrics(), enabled=enabled())
@@ -0,0 +1,87 @@
+"""
+练习会话快照缓存
+
+取题/交卷接口原先每次点击都要重新查询 ExamAttempt、PaperQuestion、Question、QuestionVersion，
+并重新解析选项 JSON，每次 4~6 条 SQL。会话创建后试卷内容不再变化，因此在首次访问时
+把整张试卷载入为快照（按 attempt_id 缓存）：
+- 按 seq 排好的题目列表：题干、已解析的选项、题型、难度、解析、可用状态
+- 编译好的答案匹配器（grading.get_matcher，判分时无需再规范化标准答案）
+- 已作答题目及其对错（提交答案时直接决定 INSERT 或 UPDATE、修正答对计数，无需先查 USER_ANSWER）
+- 题目绑定的知识点与学科（答错时增量更新薄弱知识点画像，无需再查）
+- 在错题本中未掌握的题目（答对时才需要更新复习间隔，其它题目答对不再查错题本）
+
+快照放在 LRU + TTL 缓存中，finish 时删除。快照内容以会话开始时的题目为准，
+会话进行中编辑题目不会影响本次练习。多进程部署下各进程各自缓存，TTL 兜底。
+快照不缓存会话状态：提交答案时由进度计数的 UPDATE（带 status 条件）校验会话仍在进行中，
+会话已在其它进程结束时拒绝作答并清除本进程的快照（见 practice_service._bump_progress）。
+"""
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+
+
+class SnapshotItem:
+    __slots__ = (
+        "seq", "question_id", "type", "difficulty", "stem", "options", "explanation",
+        "version_id", "correct_answer", "matcher", "question_active", "version_active", "has_version",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    def view(self) -> Dict[str, Any]:
+        """取题接口返回结构（QuestionView）"""
+        return {
+            "seq": self.seq,
+            "question_id": self.question_id,
+            "type": self.type,
+            "difficulty": self.difficulty,
+            "stem": self.stem,
+            "options": list(self.options),
+            "explanation": self.explanation,
+        }
+
+
+class AttemptSnapshot:
+    def __init__(self, attempt_id: int, user_id: int, paper_id: int, items: List[SnapshotItem], answered: Dict[int, bool],
+                 links: Optional[Dict[int, tuple]] = None, review_ids: Optional[Set[int]] = None):
+        self.attempt_id = attempt_id
+        self.user_id = user_id
+        self.paper_id = paper_id
+        self.items = items
+        self.by_seq = {it.seq: it for it in items}
+        self.answered = answered  # 已有作答记录的 question_id -> 是否答对
+        self.links = links or {}  # question_id -> (知识点 ID, 学科标签 ID)
+        self.review_ids = review_ids if review_ids is not None else set()  # 错题本中未掌握的 question_id
+
+    @property
+    def total(self) -> int:
+        return len(self.items)
+
+    def item(self, seq: int) -> Optional[SnapshotItem]:
+        return self.by_seq.get(seq)
+
+
+_cache = LRUCache(
+    maxsize=settings.ATTEMPT_SNAPSHOT_CACHE_SIZE,
+    ttl=settings.ATTEMPT_SNAPSHOT_TTL_SECONDS,
+)
+
+
+def get(attempt_id: int) -> Optional[AttemptSnapshot]:
+    return _cache.get(attempt_id)
+
+
+def put(snapshot: AttemptSnapshot) -> None:
+    _cache.set(snapshot.attempt_id, snapshot)
+
+
+def drop(attempt_id: int) -> None:
+    """会话结束时调用"""
+    _cache.pop(attempt_id)
+
+
+def clear() -> None:
+    _cache.clear()
@@ -1,8 +1,148 @@
 from datetime import datetime
+from typing import Dict, Iterable
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, insert, or_, update
+from app.core.timezone import now as get_now
+from app.db.pagination import decode_cursor, next_cursor
+from app.db.upsert import build_upsert
 from app.models.error_book import ErrorBook
 from app.models.user import User
+from app.services import spaced_repetition as sr
+from app.services import weakness_profile
+
+
+def upsert_wrong(
+    db: Session,
+    user_id: int,
+    wrong_counts: Dict[int, int],
+    now: datetime,
+    immediate_review: bool = False,
+    reset_mastered: bool = False,
+    links=None,
+):
+    """错题本批量累加：wrong_counts 为 {question_id: 本次答错次数}
+
+    - MySQL: INSERT ... ON DUPLICATE KEY UPDATE
+    - SQLite / PostgreSQL: INSERT ... ON CONFLICT (user_id, question_id) DO UPDATE
+    - 其它方言：先查已有记录，再批量 UPDATE / INSERT
+
+    wrong_count 在数据库中原子累加；last_wrong_time 置为 now；
+    复习调度按 SM-2 答错处理：连续答对次数清零、难易系数下调，next_review_time 为 now + 1 天
+    （immediate_review=True 时为 now，立即复习）。
+    reset_mastered=True 时同时标记为未掌握。不提交事务。
+    同时增量更新薄弱知识点画像（links 为题目的知识点/学科，缺省时现查）。
+    """
+    if not wrong_counts:
+        return
+    # 先锁定并读取已存在记录的旧状态（不存在的记录不加锁，避免间隙锁死锁），画像按 新贡献 - 旧贡献 累加
+    old_states = weakness_profile.load_states(db, user_id, wrong_counts, lock=True)
+    first = sr.first_wrong_state(now)
+    rows = [
+        {
+            "user_id": user_id, "question_id": qid, "first_wrong_time": now, "last_wrong_time": now,
+            "wrong_count": n, "mastered": False,
+            "ease_factor": first.ease_factor, "repetitions": first.repetitions,
+            "review_interval": first.review_interval,
+            "next_review_time": now if immediate_review else first.next_review_time,
+        }
+        for qid, n in wrong_counts.items()
+    ]
+
+    def make_set(incoming):
+        wrong = sr.wrong_update_values(ErrorBook.ease_factor)
+        set_ = [
+            ("ease_factor", wrong["ease_factor"]),
+            ("repetitions", wrong["repetitions"]),
+            ("review_interval", wrong["review_interval"]),
+            ("next_review_time", incoming.next_review_time),
+            ("last_wrong_time", incoming.last_wrong_time),
+            ("updated_at", func.now()),
+        ]
+        if reset_mastered:
+            set_.append(("mastered", False))
+        set_.append(("wrong_count", ErrorBook.wrong_count + incoming.wrong_count))
+        return set_
+
+    # 🚀 优化：原子 upsert，单条语句完成“累加或插入”，并发答错同一题不再触发 uk_error_book_user_question 冲突
+    stmt = build_upsert(db, ErrorBook, rows, ("user_id", "question_id"), make_set)
+    if stmt is None:
+        _upsert_wrong_fallback(db, user_id, rows, immediate_review, reset_mastered)
+    else:
+        db.execute(stmt)
+
+    # 读取时还不存在的记录可能已被并发事务抢先插入（本次 upsert 变成了累加）；
+    # upsert 已持有这些行的锁，读回次数：多于本次答错次数说明存在旧记录，按刚插入的状态（未掌握）补上旧状态
+    fresh = [qid for qid in wrong_counts if qid not in old_states]
+    if fresh:
+        for qid, count in db.query(ErrorBook.question_id, ErrorBook.wrong_count).filter(
+            ErrorBook.user_id == user_id, ErrorBook.question_id.in_(fresh)
+        ).with_for_update():
+            if (count or 0) > wrong_counts[qid]:
+                old_states[qid] = weakness_profile.ErrorState(count - wrong_counts[qid], now, False)
+
+    changes = {}
+    for qid, n in wrong_counts.items():
+        old = old_states.get(qid)
+        mastered = old.mastered if old and not reset_mastered else False
+        changes[qid] = (old, weakness_profile.ErrorState((old.wrong_count if old else 0) + n, now, mastered))
+    weakness_profile.apply_changes(db, user_id, changes, now, links)
+
+
+def _upsert_wrong_fallback(db: Session, user_id: int, rows, immediate_review: bool, reset_mastered: bool):
+    existing = {
+        r.question_id: r for r in db.query(
+            ErrorBook.id, ErrorBook.question_id, ErrorBook.wrong_count, ErrorBook.ease_factor
+        ).filter(
+            ErrorBook.user_id == user_id,
+            ErrorBook.question_id.in_([row["question_id"] for row in rows])
+        ).all()
+    }
+    updates, inserts = [], []
+    for row in rows:
+        r = existing.get(row["question_id"])
+        if not r:
+            inserts.append(row)
+            continue
+        now = row["last_wrong_time"]
+        state = sr.schedule(r.ease_factor, 0, 0, False, now)
+        values = {
+            "id": r.id, "wrong_count": (r.wrong_count or 0) + row["wrong_count"], "last_wrong_time": now,
+            "ease_factor": state.ease_factor, "repetitions": state.repetitions,
+            "review_interval": state.review_interval,
+            "next_review_time": now if immediate_review else state.next_review_time,
+        }
+        if reset_mastered:
+            values["mastered"] = False
+        updates.append(values)
+    if updates:
+        db.execute(update(ErrorBook), updates)
+    if inserts:
+        db.execute(insert(ErrorBook), inserts)
+
+
+def record_correct(db: Session, user_id: int, question_ids: Iterable[int], now: datetime) -> int:
+    """练习中答对了错题本里的未掌握题目：按 SM-2 延长复习间隔，返回更新的记录数；不提交事务
+
+    新间隔依赖旧的间隔与难易系数，先加锁读取再批量按主键更新（同一用户的并发答题在行锁上排队）。
+    """
+    qids = list(question_ids)
+    if not qids:
+        return 0
+    records = db.query(
+        ErrorBook.id, ErrorBook.ease_factor, ErrorBook.repetitions, ErrorBook.review_interval
+    ).filter(
+        ErrorBook.user_id == user_id,
+        ErrorBook.question_id.in_(qids),
+        ErrorBook.mastered == False,
+    ).with_for_update().all()
+    updates = []
+    for r in records:
+        state = sr.schedule(r.ease_factor, r.repetitions, r.review_interval, True, now)
+        updates.append({"id": r.id, **state._asdict()})
+    if updates:
+        db.execute(update(ErrorBook), updates)
+    return len(updates)
+
 
 def list_error_book(
     db: Session,
@@ -11,34 +151,44 @@ def list_error_book(
     size: int = 10,
     only_due: bool = False,          # 仅到期复习
     include_mastered: bool = False,  # 是否包含已掌握
+    after: str | None = None,        # 🆕 游标：上一页返回的 next_cursor（传入时忽略 page）
+    with_total: bool = True,         # 🆕 为 False 时不做 count()，total 为 None
 ):
+    """返回 (total, rows, next_cursor)，按 last_wrong_time 倒序、id 倒序（last_wrong_time 为空的排最后）"""
     page = max(1, int(page or 1))
     size = max(1, min(int(size or 10), 100))
-    now = datetime.utcnow()
+    now = get_now()
 
     q = db.query(ErrorBook).filter(ErrorBook.user_id == user.id)
     if not include_mastered:
         q = q.filter(ErrorBook.mastered == False)
     if only_due:
-        q = q.filter(
-            (ErrorBook.next_review_time == None) | (ErrorBook.next_review_time <= now)
-        )
+        # 🚀 优化：单一范围条件，可走 idx_error_book_due；未掌握的记录都有复习时间（见迁移 e4b7c1d9f053）
+        q = q.filter(ErrorBook.next_review_time <= now)
 
-    total = q.count()
+    total = q.count() if with_total else None
 
-    # 关键：替换 NULLS LAST 排序，兼容 MySQL
-    rows = (
-        q.order_by(
-            func.isnull(ErrorBook.last_wrong_time).asc(),  # 非空在前，NULL 在后
-            ErrorBook.last_wrong_time.desc(),
-            ErrorBook.id.desc(),
-        )
-        .offset((page - 1) * size)
-        .limit(size)
-        .all()
-    )
+    # MySQL / SQLite 中 NULL 按最小值排序，倒序时自然排在最后；
+    # 原先的 isnull(last_wrong_time) 排序表达式会让索引无法提供顺序（SQLite 也没有 isnull 函数）
+    q = q.order_by(ErrorBook.last_wrong_time.desc(), ErrorBook.id.desc())
 
-    return total, rows
+    # 🚀 优化：游标分页从上一页最后一行 (last_wrong_time, id) 之后继续，配合 idx_error_book_recent 免去 OFFSET 扫描
+    if not after:
+        rows = q.offset((page - 1) * size).limit(size + 1).all()
+    else:
+        last_time, last_id = decode_cursor(after, (datetime, int))
+        if last_time is None:
+            rows = q.filter(ErrorBook.last_wrong_time.is_(None), ErrorBook.id < last_id).limit(size + 1).all()
+        else:
+            # 写成 last_wrong_time 上的单一范围（把 IS NULL 并进 OR 会退化成整段扫描），
+            # 本页不够时再从排在最后的 last_wrong_time 为空的记录中补齐
+            rows = q.filter(
+                ErrorBook.last_wrong_time <= last_time,
+                or_(ErrorBook.last_wrong_time < last_time, ErrorBook.id < last_id),
+            ).limit(size + 1).all()
+            if len(rows) <= size:
+                rows += q.filter(ErrorBook.last_wrong_time.is_(None)).limit(size + 1 - len(rows)).all()
+    return total, rows, next_cursor(rows, size, lambda r: [r.last_wrong_time, r.id])
 
 
 def record_wrong(db: Session, user: User, question_id: int):
@@ -49,38 +199,16 @@ def record_wrong(db: Session, user: User, question_id: int):
         user: 当前用户
         question_id: 题目ID
     """
-    now = datetime.utcnow()
-    
-    # 查找是否已存在该错题记录
-    record = db.query(ErrorBook).filter(
+    now = get_now()
+
+    # 重新答错：累加次数、标记为未掌握、设置为立即复习
+    upsert_wrong(db, user.id, {question_id: 1}, now, immediate_review=True, reset_mastered=True)
+    db.commit()
+
+    return db.query(ErrorBook).filter(
         ErrorBook.user_id == user.id,
         ErrorBook.question_id == question_id
     ).first()
-    
-    if record:
-        # 已存在,更新记录
-        record.wrong_count = (record.wrong_count or 0) + 1
-        record.last_wrong_time = now
-        record.mastered = False  # 重新答错,标记为未掌握
-        # 更新下次复习时间(例如:根据错误次数延长复习间隔)
-        # 这里简单设置为立即复习
-        record.next_review_time = now
-    else:
-        # 不存在,创建新记录
-        record = ErrorBook(
-            user_id=user.id,
-            question_id=question_id,
-            first_wrong_time=now,
-            last_wrong_time=now,
-            wrong_count=1,
-            next_review_time=now,
-            mastered=False
-        )
-        db.add(record)
-    
-    db.commit()
-    db.refresh(record)
-    return record
 
 
 def toggle_mastered(db: Session, user: User, question_id: int, mastered: bool):
@@ -104,15 +232,19 @@ def toggle_mastered(db: Session, user: User, question_id: int, mastered: bool):
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="错题记录不存在")
     
-    # 更新掌握状态
+    # 更新掌握状态（同步薄弱知识点画像）
+    old_state = weakness_profile.ErrorState(record.wrong_count or 0, record.last_wrong_time, bool(record.mastered))
     record.mastered = mastered
+    weakness_profile.apply_changes(db, user.id, {question_id: (old_state, old_state._replace(mastered=mastered))})
     
     # 如果标记为已掌握,可以清空下次复习时间
     if mastered:
         record.next_review_time = None
     else:
-        # 如果标记为未掌握,设置下次复习时间为当前时间
-        record.next_review_time = datetime.utcnow()
+        # 如果标记为未掌握,设置下次复习时间为当前时间，复习进度从头开始
+        record.next_review_time = get_now()
+        record.repetitions = 0
+        record.review_interval = 0
     
     db.commit()
     db.refresh(record)
@@ -137,6 +269,8 @@ def delete_record(db: Session, user: User, question_id: int):
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="错题记录不存在")
     
+    old_state = weakness_profile.ErrorState(record.wrong_count or 0, record.last_wrong_time, bool(record.mastered))
+    weakness_profile.apply_changes(db, user.id, {question_id: (old_state, None)})
     db.delete(record)
     db.commit()
     return True
\ No newline at end of file
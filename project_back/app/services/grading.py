@@ -0,0 +1,155 @@
+"""
+判分引擎
+
+原实现每次提交答案都要重新规范化标准答案（多选排序去重、填空按分号拆分再转小写）。
+这里把每个题目版本的标准答案一次性编译为不可变的匹配器，并按版本 ID 缓存：
+- 单选 SC   ：规范化后的字符串，直接比较
+- 多选 MC   ：A~Z 选项位掩码，用户答案逐字符置位后比较一个整数；
+              含非字母字符（如 "A,B"）时回退为字符集合比较，结果与原 _norm_mc 一致
+- 填空 FILL ：备选答案的 frozenset，用户答案规范化后做一次哈希查找
+
+可选 NFKC 折叠（GRADING_NFKC_FOLD）：全角字母/数字/空格折叠为半角后再比较，如 "ＡＢ" 与 "AB" 视为相同。
+题目在原版本上修改标准答案或题型时，缓存按内容比对自动重新编译。
+"""
+import unicodedata
+from abc import ABC, abstractmethod
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+
+_FOLD = settings.GRADING_NFKC_FOLD
+
+
+def _fold(ans: Optional[str]) -> str:
+    ans = ans or ""
+    return unicodedata.normalize("NFKC", ans) if _FOLD else ans
+
+
+def norm_sc(ans: Optional[str]) -> str:
+    """标准化单选答案：去空格，转大写"""
+    return _fold(ans).strip().upper()
+
+
+def norm_mc(ans: Optional[str]) -> str:
+    """标准化多选答案：去空格，转大写，字母排序，去重
+    例如: 'BCA' -> 'ABC', 'AAB' -> 'AB'
+    """
+    return "".join(sorted(set(_fold(ans).strip().upper())))
+
+
+def norm_fill(ans: Optional[str]) -> str:
+    """标准化填空答案：去除首尾空格，转小写
+    例如: "北京" -> "北京", " BEIJING " -> "beijing"
+    """
+    return _fold(ans).strip().lower()
+
+
+_A = ord("A")
+
+
+def _letter_mask(s: str) -> Optional[int]:
+    """大写字符串 → A~Z 位掩码；含其它字符返回 None"""
+    mask = 0
+    for ch in s:
+        bit = ord(ch) - _A
+        if bit < 0 or bit >= 26:
+            return None
+        mask |= 1 << bit
+    return mask
+
+
+class AnswerMatcher(ABC):
+    """匹配器基类；子类必须实现 match，未实现时在编译（实例化）时即报错，而不是判分时"""
+    __slots__ = ("qtype", "source")
+
+    def __init__(self, qtype: str, source: Optional[str]):
+        self.qtype = qtype
+        self.source = source  # 编译时的标准答案原文，用于检测原版本被修改
+
+    @abstractmethod
+    def match(self, user_answer: Optional[str]) -> bool:
+        """用户答案是否正确"""
+
+
+class SingleChoiceMatcher(AnswerMatcher):
+    __slots__ = ("key",)
+
+    def __init__(self, qtype, source):
+        super().__init__(qtype, source)
+        self.key = norm_sc(source)
+
+    def match(self, user_answer):
+        return norm_sc(user_answer) == self.key
+
+
+class MultiChoiceMatcher(AnswerMatcher):
+    __slots__ = ("mask", "chars")
+
+    def __init__(self, qtype, source):
+        super().__init__(qtype, source)
+        s = _fold(source).strip().upper()
+        self.chars: FrozenSet[str] = frozenset(s)
+        self.mask = _letter_mask(s)
+
+    def match(self, user_answer):
+        s = _fold(user_answer).strip().upper()
+        if self.mask is not None:
+            user_mask = _letter_mask(s)
+            if user_mask is not None:
+                return user_mask == self.mask
+        return frozenset(s) == self.chars
+
+
+class FillMatcher(AnswerMatcher):
+    __slots__ = ("accepted",)
+
+    def __init__(self, qtype, source):
+        super().__init__(qtype, source)
+        # 支持多答案(分号分隔),任一匹配即正确
+        self.accepted: FrozenSet[str] = frozenset(norm_fill(a) for a in (source or "").split(";"))
+
+    def match(self, user_answer):
+        return norm_fill(user_answer) in self.accepted
+
+
+_MATCHERS = {"MC": MultiChoiceMatcher, "FILL": FillMatcher}
+
+
+def compile_matcher(qtype: str, correct_answer: Optional[str]) -> AnswerMatcher:
+    """编译标准答案；未知题型按单选处理（与原判分逻辑一致）"""
+    return _MATCHERS.get(qtype, SingleChoiceMatcher)(qtype, correct_answer)
+
+
+_cache = LRUCache(maxsize=settings.GRADING_MATCHER_CACHE_SIZE)
+
+
+def get_matcher(version_id: Optional[int], qtype: str, correct_answer: Optional[str]) -> AnswerMatcher:
+    """按题目版本 ID 取缓存的匹配器；题型或标准答案与缓存不一致时重新编译"""
+    if version_id is None:
+        return compile_matcher(qtype, correct_answer)
+    matcher = _cache.get(version_id)
+    if matcher is None or matcher.qtype != qtype or matcher.source != correct_answer:
+        matcher = compile_matcher(qtype, correct_answer)
+        _cache.set(version_id, matcher)
+    return matcher
+
+
+def grade(qtype: str, correct_answer: Optional[str], user_answer: Optional[str], version_id: Optional[int] = None) -> bool:
+    return get_matcher(version_id, qtype, correct_answer).match(user_answer)
+
+
+GradeRow = Tuple[Optional[int], str, Optional[str], Optional[str]]
+
+
+def regrade(rows: Iterable[GradeRow]) -> List[bool]:
+    """批量重新判分：rows 为 (version_id, qtype, correct_answer, user_answer)，同一版本只取一次匹配器"""
+    local = {}
+    out = []
+    for vid, qtype, correct, ans in rows:
+        key = (vid, qtype, correct)
+        matcher = local.get(key)
+        if matcher is None:
+            matcher = local[key] = get_matcher(vid, qtype, correct)
+        out.append(matcher.match(ans))
+    return out
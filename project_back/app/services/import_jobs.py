@@ -0,0 +1,321 @@
+"""
+题目导入任务（异步）
+
+原先 POST /question-bank/import-excel 用 file.file.read() 把整个上传读进内存，写临时文件后在请求线程里
+同步解析并导入，大文件会占住一个 worker 数分钟，并可能触发代理超时。导入任务改为：
+- 支持 xlsx / csv / jsonl（按文件扩展名，见 question_formats）
+- save_upload：按块把上传流式写入 IMPORT_UPLOAD_DIR（内存占用与文件大小无关），超过 IMPORT_MAX_UPLOAD_MB 返回 413
+- create_job：落盘后写入一行 IMPORT_JOB（PENDING）并交给后台线程，请求在毫秒级返回任务 ID
+- 后台线程（IMPORT_JOB_WORKERS 个）以条件 UPDATE 认领任务，流式读取 + 校验 + 批量写库
+  （question_import.import_records），每写完一批更新进度计数与心跳，并检查取消标记
+- 客户端轮询 GET /question-bank/import-jobs/{id} 获取进度（已处理/成功/失败行数、ETA），
+  POST /question-bank/import-jobs/{id}/cancel 取消：排队中的任务直接取消；运行中的任务在当前批写完后停止，
+  已写入的题目保留
+
+应用启动时重新排队 PENDING 任务；心跳超过 IMPORT_JOB_STALE_SECONDS 的 RUNNING 任务（进程崩溃遗留）标记为 FAILED。
+应用关闭时运行中的任务在当前批写完后停止并标记为 FAILED。多进程部署下各进程各自运行后台线程，条件 UPDATE 保证一个任务只被认领一次。
+"""
+import logging
+import os
+import queue
+import tempfile
+import threading
+from datetime import timedelta
+from typing import BinaryIO, List, Optional
+from uuid import uuid4
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.exceptions import AppException, ConflictException, ForbiddenException, NotFoundException
+from app.core.timezone import now as get_now
+from app.models.import_job import ImportJob
+from app.schemas.question_bank import ImportErrorItem, ImportJobOut, ImportQuestionsResult
+from app.services import question_formats, question_import
+
+log = logging.getLogger("import_jobs")
+
+PENDING, RUNNING, SUCCEEDED, FAILED, CANCELLED = "PENDING", "RUNNING", "SUCCEEDED", "FAILED", "CANCELLED"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+_UPLOAD_CHUNK = 1024 * 1024
+
+
+def upload_dir() -> str:
+    return settings.IMPORT_UPLOAD_DIR or os.path.join(tempfile.gettempdir(), "question_import")
+
+
+def save_upload(src: BinaryIO, suffix: str = ".xlsx") -> str:
+    """把上传内容按块写入上传目录，返回文件路径；超过 IMPORT_MAX_UPLOAD_MB 时删除已写部分并抛出 413"""
+    os.makedirs(upload_dir(), exist_ok=True)
+    path = os.path.join(upload_dir(), f"{uuid4().hex}{suffix}")
+    limit = settings.IMPORT_MAX_UPLOAD_MB * 1024 * 1024
+    written = 0
+    try:
+        with open(path, "wb") as dst:
+            while True:
+                chunk = src.read(_UPLOAD_CHUNK)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > limit:
+                    raise AppException(f"文件过大（最大 {settings.IMPORT_MAX_UPLOAD_MB}MB）", code=413, status_code=413)
+                dst.write(chunk)
+    except BaseException:
+        _remove(path)
+        raise
+    return path
+
+
+def _remove(path: Optional[str]) -> None:
+    try:
+        if path and os.path.exists(path):
+            os.remove(path)
+    except OSError:
+        log.warning("failed to remove import file %s", path, exc_info=True)
+
+
+# ---------- 请求侧 ----------
+
+def create_job(db: Session, user_id: int, filename: str, src: BinaryIO) -> ImportJob:
+    """上传落盘并创建导入任务，交给后台线程处理"""
+    suffix = os.path.splitext(filename)[1].lower() or ".xlsx"
+    path = save_upload(src, suffix)
+    try:
+        job = ImportJob(user_id=user_id, filename=filename[:255], file_path=path, status=PENDING, created_at=get_now())
+        db.add(job)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        _remove(path)
+        raise
+    _runner.submit(job.id)
+    return job
+
+
+def get_job(db: Session, job_id: int, user_id: int, is_admin: bool = False) -> ImportJob:
+    job = db.get(ImportJob, job_id)
+    if job is None:
+        raise NotFoundException("导入任务不存在")
+    if not is_admin and job.user_id != user_id:
+        raise ForbiddenException("无权限")
+    return job
+
+
+def cancel_job(db: Session, job_id: int, user_id: int, is_admin: bool = False) -> ImportJob:
+    """取消导入任务：排队中的任务立即取消；运行中的任务置取消标记，由后台线程在当前批写完后停止"""
+    job = get_job(db, job_id, user_id, is_admin)
+    if job.status in FINISHED:
+        raise ConflictException("导入任务已结束，无法取消")
+    now, path = get_now(), job.file_path
+    # 条件 UPDATE：与后台线程的认领互斥，只有仍在排队的任务会被直接取消
+    cancelled = db.execute(
+        update(ImportJob).where(ImportJob.id == job_id, ImportJob.status == PENDING).values(
+            status=CANCELLED, cancel_requested=True, finished_at=now, updated_at=now, file_path=None,
+        )
+    ).rowcount
+    if not cancelled:
+        db.execute(update(ImportJob).where(ImportJob.id == job_id).values(cancel_requested=True))
+    db.commit()
+    if cancelled:
+        _remove(path)
+    db.refresh(job)
+    return job
+
+
+def to_out(job: ImportJob) -> ImportJobOut:
+    """任务状态 + 进度：progress 按工作表声明的行数估算（运行中最多 0.99），eta_seconds 按已用时间线性外推"""
+    progress = eta = None
+    if job.status == SUCCEEDED:
+        progress = 1.0
+    elif job.status == RUNNING and job.estimated_rows:
+        progress = min(job.processed_rows / job.estimated_rows, 0.99)
+        if job.processed_rows and job.started_at and job.updated_at:
+            elapsed = (job.updated_at - job.started_at).total_seconds()
+            remaining = max(job.estimated_rows - job.processed_rows, 0)
+            eta = int(elapsed / job.processed_rows * remaining)
+    return ImportJobOut(
+        id=job.id,
+        filename=job.filename,
+        status=job.status,
+        cancel_requested=bool(job.cancel_requested),
+        estimated_rows=job.estimated_rows,
+        processed_rows=job.processed_rows or 0,
+        success=job.success_rows or 0,
+        failed=job.failed_rows or 0,
+        progress=progress,
+        eta_seconds=eta,
+        errors=[ImportErrorItem(**e) for e in job.errors or []],
+        message=job.message,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+
+# ---------- 后台线程 ----------
+
+def run_job(db: Session, job_id: int, should_stop=lambda: False) -> bool:
+    """认领并执行一个 PENDING 任务（后台线程调用，也可在当前线程直接执行）；未能认领时返回 False"""
+    now = get_now()
+    claimed = db.execute(
+        update(ImportJob).where(ImportJob.id == job_id, ImportJob.status == PENDING).values(
+            status=RUNNING, started_at=now, updated_at=now,
+        )
+    ).rowcount
+    db.commit()
+    if not claimed:
+        return False
+
+    job = db.get(ImportJob, job_id)
+    path = job.file_path
+    stopped: List[str] = []
+
+    def progress(result: ImportQuestionsResult) -> bool:
+        db.execute(update(ImportJob).where(ImportJob.id == job_id).values(
+            processed_rows=result.total_rows, success_rows=result.success, failed_rows=result.failed,
+            updated_at=get_now(),
+        ))
+        cancel = db.scalar(select(ImportJob.cancel_requested).where(ImportJob.id == job_id))
+        db.commit()
+        if cancel:
+            stopped.append(CANCELLED)
+        elif should_stop():
+            stopped.append(FAILED)
+        return not stopped
+
+    status, message, result = SUCCEEDED, None, None
+    try:
+        rows, estimated = question_formats.open_rows(path, question_formats.detect_format(job.filename))
+        db.execute(update(ImportJob).where(ImportJob.id == job_id).values(estimated_rows=estimated))
+        db.commit()
+        validated = question_import.iter_validated(rows)
+        try:
+            result = question_import.import_records(db, validated, job.user_id, progress=progress)
+        finally:
+            # 取消时生成器未读完：显式关闭以释放工作簿文件句柄（及校验进程池），再删除文件
+            validated.close()
+            rows.close()
+        if stopped:
+            status = stopped[0]
+            if status == FAILED:
+                message = f"服务关闭，导入中断（已处理 {result.total_rows} 行）"
+    except HTTPException as e:
+        db.rollback()
+        status, message = FAILED, str(e.detail)
+    except Exception as e:
+        db.rollback()
+        log.exception("import job %s failed", job_id)
+        status, message = FAILED, f"导入失败：{e}"[:500]
+    finally:
+        _remove(path)
+
+    values = dict(status=status, message=message, file_path=None, finished_at=get_now(), updated_at=get_now())
+    if result is not None:
+        values.update(
+            processed_rows=result.total_rows, success_rows=result.success, failed_rows=result.failed,
+            errors=[e.model_dump() for e in result.errors[:settings.IMPORT_JOB_MAX_ERRORS]],
+        )
+    db.execute(update(ImportJob).where(ImportJob.id == job_id).values(**values))
+    db.commit()
+    return True
+
+
+def recover(db: Session) -> List[int]:
+    """启动时：心跳过期的 RUNNING 任务标记为 FAILED 并删除其上传文件，返回需要重新排队的 PENDING 任务"""
+    now = get_now()
+    stale = (
+        ImportJob.status == RUNNING,
+        ImportJob.updated_at < now - timedelta(seconds=settings.IMPORT_JOB_STALE_SECONDS),
+    )
+    for job_id, path in db.execute(select(ImportJob.id, ImportJob.file_path).where(*stale)).all():
+        # 条件更新：期间被其它进程续上心跳的任务不动，也不删它的文件
+        marked = db.execute(
+            update(ImportJob).where(ImportJob.id == job_id, *stale).values(
+                status=FAILED, message="服务重启，导入中断", file_path=None, finished_at=now, updated_at=now,
+            )
+        ).rowcount
+        db.commit()
+        if marked:
+            _remove(path)
+    return list(db.scalars(select(ImportJob.id).where(ImportJob.status == PENDING).order_by(ImportJob.id)))
+
+
+class ImportJobRunner:
+    def __init__(self, session_factory=None, workers: int = settings.IMPORT_JOB_WORKERS):
+        self._session_factory = session_factory
+        self.workers = max(1, workers)
+        self._queue: "queue.Queue[Optional[int]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._lock = threading.Lock()
+
+    def _session(self) -> Session:
+        if self._session_factory is None:
+            from app.db.session import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def start(self) -> None:
+        with self._lock:
+            if any(t.is_alive() for t in self._threads):
+                return
+            self._stopping = False
+            self._threads = [
+                threading.Thread(target=self._run, name=f"import-job-{i}", daemon=True) for i in range(self.workers)
+            ]
+            for t in self._threads:
+                t.start()
+        db = self._session()
+        try:
+            for job_id in recover(db):
+                self._queue.put(job_id)
+        except Exception:
+            log.exception("import job recovery failed")
+        finally:
+            db.close()
+
+    def stop(self, timeout: float = 30) -> None:
+        """通知运行中的任务在当前批写完后停止，并等待后台线程退出"""
+        with self._lock:
+            if not self._threads:
+                return
+            self._stopping = True
+            for _ in self._threads:
+                self._queue.put(None)
+            threads, self._threads = self._threads, []
+        for t in threads:
+            t.join(timeout)
+            if t.is_alive():
+                log.error("import job worker %s did not stop within %ss", t.name, timeout)
+
+    def submit(self, job_id: int) -> None:
+        if not self._threads:
+            self.start()
+        self._queue.put(job_id)
+
+    def _run(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            if job_id is None or self._stopping:
+                return
+            db = self._session()
+            try:
+                run_job(db, job_id, should_stop=lambda: self._stopping)
+            except Exception:
+                log.exception("import job %s crashed", job_id)
+            finally:
+                db.close()
+
+
+_runner = ImportJobRunner()
+
+
+def start() -> None:
+    _runner.start()
+
+
+def stop() -> None:
+    _runner.stop()
@@ -0,0 +1,140 @@
+"""
+知识点子树 → 题目 ID 索引
+
+按知识点练习时需要"某知识点（含全部子孙）下绑定的题目"。原做法是递归展开子孙知识点，
+再拼一个上千元素的 IN 列表查 QUESTION_KNOWLEDGE。这里改为：
+
+1. 对知识点树做一次先序遍历（Euler tour），每个节点得到区间 [tin, tout)，
+   其子树恰好是先序编号落在该区间内的节点
+2. 把 QUESTION_KNOWLEDGE 的 (知识点, 题目) 关联按知识点的 tin 排序存成两个数组
+
+子树题目 = 排序数组上两次二分得到的一个连续切片，与子树大小、层级无关。
+题目绑定知识点变化时由 knowledge_service.bind_question_knowledge 调用 rebind() 原地增量更新；
+增删改知识点时 knowledge_service 与 knowledge_tree 一并调用 invalidate()，下次访问整体重建
+（知识点树因 TTL 过期等原因重新载入时，get_index 发现树对象已变同样会重建）。
+"""
+import threading
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.question_knowledge import QuestionKnowledge
+from app.services import knowledge_tree
+from app.services.knowledge_tree import KnowledgeTree
+
+
+def _euler_tour(tree: KnowledgeTree):
+    """先序编号：返回 (tin, tout)，节点 i 的子树为 tin ∈ [tin[i], tout[i])"""
+    n = len(tree)
+    tin = np.full(n, -1, dtype=np.int64)
+    tout = np.full(n, -1, dtype=np.int64)
+    counter = 0
+    roots = [int(i) for i in np.flatnonzero(tree.parent < 0)]
+    for root in roots:
+        stack = [(root, False)]
+        while stack:
+            i, done = stack.pop()
+            if done:
+                tout[i] = counter
+                continue
+            tin[i] = counter
+            counter += 1
+            stack.append((i, True))
+            children = tree.child_idx[tree.child_ptr[i]:tree.child_ptr[i + 1]]
+            stack.extend((int(c), False) for c in children[::-1])
+    # 异常数据中成环、从根不可达的节点：各自作为单节点区间
+    for i in np.flatnonzero(tin < 0):
+        tin[i], tout[i] = counter, counter + 1
+        counter += 1
+    return tin, tout
+
+
+class KnowledgeQuestionIndex:
+    def __init__(self, tree: KnowledgeTree, kp_ids: np.ndarray, question_ids: np.ndarray):
+        self.tree = tree
+        self.tin, self.tout = _euler_tour(tree)
+        pos = tree.indices_of(kp_ids)
+        keep = pos >= 0
+        keys = self.tin[pos[keep]]
+        qids = np.asarray(question_ids, dtype=np.int64)[keep]
+        order = np.lexsort((qids, keys))
+        self._links = (keys[order], qids[order])  # 整体替换，读者无需加锁
+
+    @classmethod
+    def load(cls, db: Session, tree: KnowledgeTree) -> "KnowledgeQuestionIndex":
+        rows = db.query(QuestionKnowledge.knowledge_id, QuestionKnowledge.question_id).all()
+        n = len(rows)
+        kp_ids = np.fromiter((r.knowledge_id for r in rows), dtype=np.int64, count=n)
+        qids = np.fromiter((r.question_id for r in rows), dtype=np.int64, count=n)
+        return cls(tree, kp_ids, qids)
+
+    def question_ids(self, kid: int, include_children: bool = True) -> np.ndarray:
+        """该知识点（include_children=True 时含全部子孙）绑定的题目 ID，升序去重"""
+        i = self.tree.index_of(kid)
+        if i < 0:
+            return np.zeros(0, dtype=np.int64)
+        keys, qids = self._links
+        lo = np.searchsorted(keys, self.tin[i], side="left")
+        hi = np.searchsorted(keys, self.tout[i] if include_children else self.tin[i] + 1, side="left")
+        return np.unique(qids[lo:hi])
+
+    def rebind(self, question_id: int, old_kids: Iterable[int], new_kids: Iterable[int]) -> None:
+        """题目的知识点绑定由 old_kids 变为 new_kids 时增量更新"""
+        keys, qids = self._links
+        old_pos = self.tree.indices_of(list(old_kids))
+        drop = np.isin(keys, self.tin[old_pos[old_pos >= 0]]) & (qids == question_id)
+        keys, qids = keys[~drop], qids[~drop]
+
+        new_pos = self.tree.indices_of(list(new_kids))
+        add_keys = np.unique(self.tin[new_pos[new_pos >= 0]])
+        if len(add_keys):
+            keys = np.concatenate((keys, add_keys))
+            qids = np.concatenate((qids, np.full(len(add_keys), question_id, dtype=np.int64)))
+            order = np.lexsort((qids, keys))
+            keys, qids = keys[order], qids[order]
+        self._links = (keys, qids)
+
+
+_lock = threading.Lock()
+_index: Optional[KnowledgeQuestionIndex] = None
+_built_at = 0.0
+_generation = 0  # 每次失效/增量更新递增，避免旧数据的重建覆盖掉新结果
+
+
+def get_index(db: Session) -> KnowledgeQuestionIndex:
+    """获取缓存的子树题目索引；知识点树重建、过期或被失效时重新载入"""
+    global _index, _built_at
+    tree = knowledge_tree.get_tree(db)
+    index = _index
+    if (
+        index is not None
+        and index.tree is tree
+        and time.monotonic() - _built_at < settings.KNOWLEDGE_TREE_TTL_SECONDS
+    ):
+        return index
+    generation = _generation
+    index = KnowledgeQuestionIndex.load(db, tree)
+    with _lock:
+        if generation == _generation:
+            _index, _built_at = index, time.monotonic()
+    return index
+
+
+def rebind(question_id: int, old_kids: Iterable[int], new_kids: Iterable[int]) -> None:
+    """bind_question_knowledge 提交后调用；索引未载入时只需让正在进行的重建作废"""
+    global _generation
+    with _lock:
+        _generation += 1
+        if _index is not None:
+            _index.rebind(question_id, old_kids, new_kids)
+
+
+def invalidate() -> None:
+    """知识点树结构变化后调用：丢弃索引，并让正在进行的重建作废"""
+    global _index, _generation
+    with _lock:
+        _index = None
+        _generation += 1
@@ -1,10 +1,13 @@
 from typing import Dict, List, Optional, Iterable
+from sqlalchemy import select, insert, update as sa_update, literal
 from sqlalchemy.orm import Session
 from app.core.exceptions import AppException
 from app.models.knowledge_point import KnowledgePoint
+from app.models.knowledge_closure import KnowledgeClosure
 from app.models.question_knowledge import QuestionKnowledge
 from app.models.question import Question
 from app.models.user import User
+from app.services import knowledge_tree, knowledge_index, question_pool, weakness_profile
 
 def list_tree(db: Session, user: Optional[User] = None) -> List[Dict]:
     """
@@ -84,7 +87,11 @@ def create(db: Session, name: str, parent_id: Optional[int], description: Option
         depth=calculated_level,
         created_by=user_id  # 🔒 记录创建者
     )
-    db.add(node); db.commit(); db.refresh(node)
+    db.add(node); db.flush()
+    _closure_attach(db, node.id, parent_id)  # 🌳 与节点同一事务写入闭包表
+    db.commit(); db.refresh(node)
+    knowledge_tree.invalidate()
+    knowledge_index.invalidate()  # 🌳 子树题目索引依赖树结构，随树一起失效
     return node
 
 def update(db: Session, kid: int, name: Optional[str], parent_id: Optional[int], description: Optional[str], depth: Optional[int], user: Optional[User] = None):
@@ -106,8 +113,8 @@ def update(db: Session, kid: int, name: Optional[str], parent_id: Optional[int],
     if parent_id == kid:
         raise AppException("父级不能是自身", code=400, status_code=400)
     if parent_id:
-        # 防循环
-        if kid in descendants_ids(db, parent_id):
+        # 防循环（闭包表单次索引查找，不依赖进程内缓存）
+        if is_descendant(db, parent_id, kid):
             raise AppException("不能将父级设置为自己的子孙节点", code=400, status_code=400)
         
         # 🔒 权限检查: 新父节点必须是自己创建的
@@ -123,7 +130,7 @@ def update(db: Session, kid: int, name: Optional[str], parent_id: Optional[int],
     if name is not None: node.name = name
     if description is not None: node.description = description
     
-    # 🔥 如果修改了 parent_id，需要重新计算 depth
+    # 🔥 如果修改了 parent_id，需要重新计算 depth 并移动闭包表中的子树
     if parent_id is not None and parent_id != node.parent_id:
         node.parent_id = parent_id
         if parent_id is None:
@@ -137,28 +144,98 @@ def update(db: Session, kid: int, name: Optional[str], parent_id: Optional[int],
             else:
                 raise AppException("父级知识点不存在", code=400, status_code=400)
         
-        # 🔥 递归更新所有子孙节点的 depth
+        # 🌳 闭包表：子树挂到新父节点下；再按距离批量更新子孙 depth（同一事务）
+        _closure_move(db, kid, parent_id)
         _update_descendants_level(db, kid)
     
     db.commit(); db.refresh(node)
+    knowledge_tree.invalidate()
+    knowledge_index.invalidate()  # 🌳 子树题目索引依赖树结构，随树一起失效
     return node
 
 def _update_descendants_level(db: Session, parent_id: int):
-    """递归更新所有子孙节点的 depth"""
+    """按闭包表批量重算所有子孙节点的 depth（子孙 depth = 该节点 depth + 距离），不单独提交"""
     parent = db.query(KnowledgePoint).filter(KnowledgePoint.id == parent_id).first()
     if not parent:
         return
     
     parent_level = parent.depth or 0
-    children = db.query(KnowledgePoint).filter(KnowledgePoint.parent_id == parent_id).all()
-    
-    for child in children:
-        child.depth = parent_level + 1
-        db.add(child)
-        # 递归更新子节点的子节点
-        _update_descendants_level(db, child.id)
-    
-    db.commit()
+    rows = db.query(KnowledgeClosure.descendant_id, KnowledgeClosure.distance).filter(
+        KnowledgeClosure.ancestor_id == parent_id,
+        KnowledgeClosure.distance > 0
+    ).all()
+    if rows:
+        db.execute(
+            sa_update(KnowledgePoint),
+            [{"id": d, "depth": parent_level + dist} for d, dist in rows],
+        )
+
+# ========== 🌳 闭包表维护 ==========
+
+def _closure_attach(db: Session, kid: int, parent_id: Optional[int]):
+    """新节点：写入自身记录 + 父节点所有祖先到该节点的路径"""
+    db.execute(insert(KnowledgeClosure).values(ancestor_id=kid, descendant_id=kid, distance=0))
+    if parent_id:
+        db.execute(
+            insert(KnowledgeClosure).from_select(
+                ["ancestor_id", "descendant_id", "distance"],
+                select(KnowledgeClosure.ancestor_id, literal(kid), KnowledgeClosure.distance + 1)
+                .where(KnowledgeClosure.descendant_id == parent_id),
+            )
+        )
+
+def _closure_move(db: Session, kid: int, new_parent_id: Optional[int]):
+    """子树整体移动到新父节点下：删除子树与旧祖先之间的路径，再连接到新父节点的所有祖先"""
+    subtree = db.query(KnowledgeClosure.descendant_id, KnowledgeClosure.distance).filter(
+        KnowledgeClosure.ancestor_id == kid
+    ).all()
+    subtree_ids = [d for d, _ in subtree]
+    if subtree_ids:
+        db.query(KnowledgeClosure).filter(
+            KnowledgeClosure.descendant_id.in_(subtree_ids),
+            KnowledgeClosure.ancestor_id.notin_(subtree_ids),
+        ).delete(synchronize_session=False)
+    if new_parent_id:
+        supertree = db.query(KnowledgeClosure.ancestor_id, KnowledgeClosure.distance).filter(
+            KnowledgeClosure.descendant_id == new_parent_id
+        ).all()
+        rows = [
+            {"ancestor_id": a, "descendant_id": d, "distance": da + dd + 1}
+            for a, da in supertree
+            for d, dd in subtree
+        ]
+        if rows:
+            db.execute(insert(KnowledgeClosure), rows)
+
+def is_descendant(db: Session, kid: int, ancestor_id: int) -> bool:
+    """kid 是否位于 ancestor_id 的子树中（含自身）"""
+    return db.query(KnowledgeClosure.distance).filter(
+        KnowledgeClosure.ancestor_id == ancestor_id,
+        KnowledgeClosure.descendant_id == kid,
+    ).first() is not None
+
+def subtree_ids_select(kid: int, include_self: bool = True):
+    """子树知识点 ID 子查询（闭包表主键范围扫描）"""
+    q = select(KnowledgeClosure.descendant_id).where(KnowledgeClosure.ancestor_id == kid)
+    if not include_self:
+        q = q.where(KnowledgeClosure.distance > 0)
+    return q
+
+def ancestor_ids_select(kid: int, include_self: bool = False):
+    """祖先知识点 ID 子查询（闭包表 descendant 索引）"""
+    q = select(KnowledgeClosure.ancestor_id).where(KnowledgeClosure.descendant_id == kid)
+    if not include_self:
+        q = q.where(KnowledgeClosure.distance > 0)
+    return q
+
+def subtree_question_ids_select(kid: int, include_children: bool = True):
+    """绑定在该知识点（及其子孙）下的题目 ID 子查询：QUESTION_KNOWLEDGE ⋈ KNOWLEDGE_CLOSURE 单次索引连接"""
+    q = select(QuestionKnowledge.question_id).join(
+        KnowledgeClosure, KnowledgeClosure.descendant_id == QuestionKnowledge.knowledge_id
+    ).where(KnowledgeClosure.ancestor_id == kid)
+    if not include_children:
+        q = q.where(KnowledgeClosure.distance == 0)
+    return q.distinct()
 
 def delete(db: Session, kid: int, user: Optional[User] = None):
     """
@@ -182,21 +259,15 @@ def delete(db: Session, kid: int, user: Optional[User] = None):
     # 被题目引用禁止删
     if db.query(QuestionKnowledge.id).filter(QuestionKnowledge.knowledge_id == kid).first():
         raise AppException("有题目绑定该知识点，无法删除", code=400, status_code=400)
+    # 叶子节点只剩指向自身的祖先路径；显式删除，不依赖数据库的级联外键
+    db.query(KnowledgeClosure).filter(KnowledgeClosure.descendant_id == kid).delete(synchronize_session=False)
     db.delete(node); db.commit()
+    knowledge_tree.invalidate()
+    knowledge_index.invalidate()  # 🌳 子树题目索引依赖树结构，随树一起失效
 
 def descendants_ids(db: Session, root_id: int) -> List[int]:
-    rows = db.query(KnowledgePoint.id, KnowledgePoint.parent_id).all()
-    by_parent: Dict[Optional[int], List[int]] = {}
-    for i, p in rows:
-        by_parent.setdefault(p, []).append(i)
-    res: List[int] = []
-    stack = [root_id]
-    while stack:
-        cur = stack.pop()
-        childs = by_parent.get(cur, [])
-        res.extend(childs)
-        stack.extend(childs)
-    return res
+    # 🚀 优化：走进程内知识点树索引，O(子树大小)，无需全表加载
+    return knowledge_tree.get_tree(db).descendants(root_id)
 
 def bind_question_knowledge(db: Session, question_id: int, items: Iterable[dict], user: Optional[User] = None):
     """
@@ -223,10 +294,16 @@ def bind_question_knowledge(db: Session, question_id: int, items: Iterable[dict]
                 raise AppException(f"无权限使用知识点: {kp.name}(ID:{kid})", code=403, status_code=403)
     
     # 覆盖式更新（幂等）
+    old_kids = [kid for (kid,) in db.query(QuestionKnowledge.knowledge_id).filter(QuestionKnowledge.question_id == question_id).all()]
     db.query(QuestionKnowledge).filter(QuestionKnowledge.question_id == question_id).delete()
     
+    new_kids = []
     for it in items:
         kid = int(it["knowledge_id"])
         db.add(QuestionKnowledge(question_id=question_id, knowledge_id=kid, weight=it.get("weight")))
+        new_kids.append(kid)
     
-    db.commit()
\ No newline at end of file
+    db.commit()
+    knowledge_index.rebind(question_id, old_kids, new_kids)  # 🌳 增量更新子树题目索引
+    question_pool.invalidate_question(db, question_id)
+    weakness_profile.refresh_question(db, question_id)  # 知识点绑定变化，重建相关用户的薄弱知识点画像
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+进程内知识点树索引
+
+将 KNOWLEDGE_POINT 表以紧凑数组形式缓存在内存中：
+- ids      升序的知识点 ID
+- parent   父节点下标（-1 表示根节点或父节点不存在）
+- depth    树形深度（NaN 表示未设置）
+- child_ptr / child_idx  CSR 形式的子节点列表
+- names    知识点名称（用于拼接路径）
+
+祖先/路径查询 O(depth)，子孙查询 O(subtree)，均无需访问数据库。
+knowledge_service 在增删改后调用 invalidate()；多进程部署下依赖 TTL 兜底刷新。
+"""
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.knowledge_point import KnowledgePoint
+
+
+class KnowledgeTree:
+    def __init__(self, ids: np.ndarray, parent_ids: np.ndarray, depth: np.ndarray, names: List[str]):
+        n = len(ids)
+        self.ids = ids
+        self.depth = depth
+        self.names = names
+
+        # 父节点 ID → 下标（父节点不存在时视为根）
+        parent = np.full(n, -1, dtype=np.int64)
+        if n:
+            pos = np.clip(np.searchsorted(ids, parent_ids), 0, n - 1)
+            parent = np.where((parent_ids > 0) & (ids[pos] == parent_ids), pos, -1)
+        self.parent = parent
+
+        # CSR 子节点表：child_idx[child_ptr[i]:child_ptr[i+1]] 为节点 i 的子节点（按 ID 升序）
+        has_parent = parent >= 0
+        counts = np.bincount(parent[has_parent], minlength=n) if n else np.zeros(0, dtype=np.int64)
+        self.child_ptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        children = np.nonzero(has_parent)[0]
+        self.child_idx = children[np.argsort(parent[children], kind="stable")]
+
+    @classmethod
+    def load(cls, db: Session) -> "KnowledgeTree":
+        rows = db.query(
+            KnowledgePoint.id, KnowledgePoint.parent_id, KnowledgePoint.depth, KnowledgePoint.name
+        ).order_by(KnowledgePoint.id.asc()).all()
+        n = len(rows)
+        ids = np.fromiter((r.id for r in rows), dtype=np.int64, count=n)
+        parent_ids = np.fromiter((r.parent_id or 0 for r in rows), dtype=np.int64, count=n)
+        depth = np.array([np.nan if r.depth is None else r.depth for r in rows], dtype=np.float64)
+        return cls(ids, parent_ids, depth, [r.name for r in rows])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def index_of(self, kid: int) -> int:
+        """知识点 ID → 数组下标，不存在返回 -1"""
+        n = len(self.ids)
+        if not n:
+            return -1
+        i = int(np.searchsorted(self.ids, kid))
+        return i if i < n and self.ids[i] == kid else -1
+
+    def indices_of(self, kids) -> np.ndarray:
+        """批量 ID → 下标，不存在的为 -1"""
+        kids = np.asarray(kids, dtype=np.int64)
+        if not len(self.ids):
+            return np.full(len(kids), -1, dtype=np.int64)
+        pos = np.clip(np.searchsorted(self.ids, kids), 0, len(self.ids) - 1)
+        return np.where(self.ids[pos] == kids, pos, -1)
+
+    def contains(self, kid: int) -> bool:
+        return self.index_of(kid) >= 0
+
+    def ancestors(self, kid: int, max_distance: Optional[int] = None) -> List[int]:
+        """祖先 ID 列表，按距离由近到远"""
+        i = self.index_of(kid)
+        limit = len(self.ids) if max_distance is None else min(max_distance, len(self.ids))
+        res: List[int] = []
+        while i >= 0 and len(res) < limit:
+            i = int(self.parent[i])
+            if i < 0:
+                break
+            res.append(int(self.ids[i]))
+        return res
+
+    def descendants(self, kid: int, include_self: bool = False) -> List[int]:
+        """子孙 ID 列表（深度优先）"""
+        i = self.index_of(kid)
+        res: List[int] = [int(kid)] if include_self and i >= 0 else []
+        if i < 0:
+            return res
+        stack = [i]
+        while stack and len(res) <= len(self.ids):  # 防御异常数据中的环
+            cur = stack.pop()
+            cs = self.child_idx[self.child_ptr[cur]:self.child_ptr[cur + 1]]
+            res.extend(int(c) for c in self.ids[cs])
+            stack.extend(int(c) for c in cs)
+        return res
+
+    def depth_of(self, kid: int) -> Optional[int]:
+        i = self.index_of(kid)
+        if i < 0 or np.isnan(self.depth[i]):
+            return None
+        return int(self.depth[i])
+
+    def path(self, kid: int, sep: str = "/") -> Optional[str]:
+        """根到该节点的名称路径，如 数学/代数/方程；不存在返回 None"""
+        i = self.index_of(kid)
+        if i < 0:
+            return None
+        names = [self.names[i]]
+        for _ in range(len(self.ids)):
+            i = int(self.parent[i])
+            if i < 0:
+                break
+            names.append(self.names[i])
+        names.reverse()
+        return sep.join(names)
+
+
+_lock = threading.Lock()
+_tree: Optional[KnowledgeTree] = None
+_built_at = 0.0
+_generation = 0  # 每次失效递增，避免失效前开始的重建覆盖掉失效结果
+
+
+def get_tree(db: Session, fresh: bool = False) -> KnowledgeTree:
+    """获取缓存的知识点树；过期、被失效或 fresh=True 时从数据库重建"""
+    global _tree, _built_at
+    tree = _tree
+    if not fresh and tree is not None and time.monotonic() - _built_at < settings.KNOWLEDGE_TREE_TTL_SECONDS:
+        return tree
+    generation = _generation
+    tree = KnowledgeTree.load(db)
+    with _lock:
+        if generation == _generation:
+            _tree, _built_at = tree, time.monotonic()
+    return tree
+
+
+def invalidate() -> None:
+    """知识点增删改后调用，下次访问时重建"""
+    global _tree, _generation
+    with _lock:
+        _tree = None
+        _generation += 1
@@ -1,14 +1,14 @@
 import logging
 from uuid import uuid4
-from datetime import datetime, timedelta
+from datetime import datetime
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import Optional, List
-from sqlalchemy import func
+from sqlalchemy import and_, bindparam, case, func, insert, select, update
 from app.core.exceptions import AppException
 from app.core.timezone import now as get_now
-from app.models.knowledge_point import KnowledgePoint
 from app.models.question_knowledge import QuestionKnowledge
+from app.models.knowledge_point import KnowledgePoint
 from app.models.user import User
 from app.models.question import Question
 from app.models.question_version import QuestionVersion
@@ -18,26 +18,10 @@ from app.models.tag import Tag, QuestionTag
 from app.models.paper import Paper
 from app.models.paper_question import PaperQuestion
 from app.models.exam_attempt import ExamAttempt
+from app.services import knowledge_tree, attempt_snapshot, grading, error_book_service, answer_writer
 
 log = logging.getLogger("practice_service")
 
-def _norm_sc(ans: str) -> str:
-    """标准化单选答案：去空格，转大写"""
-    return (ans or "").strip().upper()
-
-def _norm_mc(ans: str) -> str:
-    """标准化多选答案：去空格，转大写，字母排序，去重
-    例如: 'BCA' -> 'ABC', 'AAB' -> 'AB'
-    """
-    return ''.join(sorted(set((ans or "").strip().upper())))
-
-def _norm_fill(ans: str) -> str:
-    """标准化填空答案：去除首尾空格，转小写
-    支持多个答案用分号分隔，任意一个匹配即正确
-    例如: "北京" -> "北京", " BEIJING " -> "beijing"
-    """
-    return (ans or "").strip().lower()
-
 def _new_title() -> str:
     return f"练习-{get_now():%Y%m%d%H%M%S}"
 
@@ -79,46 +63,25 @@ def _opt_to_list(val) -> list[str]:
     return [str(val)]
 
 def _kp_descendants(db, root_id: int) -> List[int]:
-    # 🚀 优化：只查询ID字段，减少内存占用
-    rows = db.query(KnowledgePoint.id, KnowledgePoint.parent_id).all()
-    by_parent = {}
-    for i, p in rows:
-        by_parent.setdefault(p, []).append(i)
-    res, st = [], [root_id]
-    while st:
-        cur = st.pop()
-        cs = by_parent.get(cur, [])
-        res.extend(cs); st.extend(cs)
-    return res
+    # 🚀 优化：走进程内知识点树索引，不再全表加载
+    return knowledge_tree.get_tree(db).descendants(root_id)
 
 # ========== 🆕 智能推荐算法（方案2：完整版） ==========
 
-import math
 import random
+from app.services import weak_point_scoring, weakness_profile, sampling, question_pool, knowledge_index, knowledge_service
 
 def calculate_time_decay_smooth(last_wrong_time: datetime) -> float:
     """
     平滑的时间衰减系数（基于艾宾浩斯遗忘曲线）
     
     公式: y = 0.6 + 2.0 × e^(-0.12 × days)
+    批量计算见 weak_point_scoring.time_decay，参数统一在该模块中调整
     
     Returns:
         float: 衰减系数，范围 0.6 ~ 2.6
     """
-    if not last_wrong_time:
-        return 1.0
-    
-    now = get_now()  # 已经是 naive datetime
-    hours = (now - last_wrong_time).total_seconds() / 3600
-    
-    # 特殊处理：1小时内权重最高
-    if hours < 1:
-        return 2.6
-    
-    days = (now - last_wrong_time).days
-    
-    # 指数衰减曲线
-    return 0.6 + 2.0 * math.exp(-0.12 * days)
+    return float(weak_point_scoring.time_decay([last_wrong_time])[0])
 
 def calculate_depth_coefficient(level: int) -> float:
     """
@@ -131,116 +94,32 @@ def calculate_depth_coefficient(level: int) -> float:
     Returns:
         float: 深度系数，每深一层增加0.3
     """
-    return 1.0 + (level * 0.3)
+    return 1.0 + (level * weak_point_scoring.DEPTH_STEP)
 
-def get_direct_error_weight(db: Session, user_id: int, knowledge_id: int) -> float:
-    """
-    获取知识点的直接错误权重（不含继承）
-    
-    公式: Σ(错误次数 × 时间衰减系数)
-    """
-    errors = db.query(
-        ErrorBook.wrong_count,
-        ErrorBook.last_wrong_time
-    ).join(
-        QuestionKnowledge, QuestionKnowledge.question_id == ErrorBook.question_id
-    ).filter(
-        ErrorBook.user_id == user_id,
-        QuestionKnowledge.knowledge_id == knowledge_id,
-        ErrorBook.mastered == False
-    ).all()
-    
-    if not errors:
-        return 0.0
-    
-    total_weight = 0.0
-    for wrong_count, last_wrong in errors:
-        time_coeff = calculate_time_decay_smooth(last_wrong)
-        total_weight += wrong_count * time_coeff
-    
-    return total_weight
+def _knowledge_scope_ids(db: Session, knowledge_id: Optional[int], include_children: bool):
+    """知识点范围内的题目 ID（子树题目索引一次查找）；未指定知识点返回 None"""
+    if knowledge_id is None:
+        return None
+    return knowledge_index.get_index(db).question_ids(knowledge_id, include_children)
 
-def get_ancestor_ids(db: Session, kp_id: int) -> List[int]:
-    """获取知识点的所有祖先ID（向上遍历）"""
-    ancestors = []
-    current_id = kp_id
-    max_depth = 10  # 防止死循环
-    
-    for _ in range(max_depth):
-        kp = db.query(KnowledgePoint).filter(KnowledgePoint.id == current_id).first()
-        if not kp or not kp.parent_id:
-            break
-        ancestors.append(kp.parent_id)
-        current_id = kp.parent_id
-    
-    return ancestors
+def _filter_knowledge_scope(q, knowledge_id: Optional[int], include_children: bool):
+    """数据库回退路径：按知识点子树过滤（闭包表 ⋈ 题目-知识点，一条子查询）"""
+    if knowledge_id is None:
+        return q
+    return q.filter(Question.id.in_(knowledge_service.subtree_question_ids_select(knowledge_id, include_children)))
 
-def calculate_inherited_weight(
-    db: Session, 
-    user_id: int, 
-    knowledge_id: int,
-    cache: dict
-) -> float:
-    """
-    计算知识点的继承权重（包含祖先节点影响）
-    
-    公式: 直接权重 + Σ(祖先权重 × 0.6^距离)
-    
-    Args:
-        cache: 缓存字典，避免重复计算
-    """
-    # 缓存检查
-    cache_key = f"inherited_{user_id}_{knowledge_id}"
-    if cache_key in cache:
-        return cache[cache_key]
-    
-    kp = db.query(KnowledgePoint).filter(KnowledgePoint.id == knowledge_id).first()
-    if not kp:
-        return 0.0
-    
-    # 1. 直接权重
-    direct_weight = get_direct_error_weight(db, user_id, knowledge_id)
-    
-    # 2. 继承权重（遍历祖先）
-    inherited_weight = 0.0
-    current_parent_id = kp.parent_id
-    distance = 1
-    decay_base = 0.6  # 继承衰减基数
-    
-    while current_parent_id:
-        parent = db.query(KnowledgePoint).filter(
-            KnowledgePoint.id == current_parent_id
-        ).first()
-        
-        if not parent:
-            break
-        
-        # 父节点的直接权重
-        parent_weight = get_direct_error_weight(db, user_id, current_parent_id)
-        
-        # 应用距离衰减
-        decay_factor = decay_base ** distance
-        inherited_weight += parent_weight * decay_factor
-        
-        # 继续向上
-        current_parent_id = parent.parent_id
-        distance += 1
-        
-        if distance > 10:  # 防止无限循环
-            break
-    
-    total_weight = direct_weight + inherited_weight
-    
-    # 缓存结果
-    cache[cache_key] = total_weight
-    return total_weight
+def get_ancestor_ids(db: Session, kp_id: int) -> List[int]:
+    """获取知识点的所有祖先ID（向上遍历，最多10层，由近到远）"""
+    return knowledge_tree.get_tree(db).ancestors(kp_id, max_distance=10)
 
 def get_weak_point_questions_smart(
     db: Session, 
     user_id: int, 
     size: int,
     subject_id: Optional[int] = None,
-    question_types: Optional[List[str]] = None  # 🆕 添加题型参数
+    question_types: Optional[List[str]] = None,  # 🆕 添加题型参数
+    knowledge_id: Optional[int] = None,  # 🆕 限定知识点范围
+    include_children: bool = True
 ) -> List[int]:
     """
     智能推荐抽题（方案2：完整版）
@@ -249,87 +128,42 @@ def get_weak_point_questions_smart(
     
     Args:
         question_types: 题型列表，如 ['SC', 'MC', 'FILL']，None 表示全部类型
+        knowledge_id: 只在该知识点（include_children 时含子孙）绑定的题目中抽取
     
     Returns:
         List[int]: 题目ID列表
     """
-    cache = {}  # 本次请求的临时缓存
-    
-    # 1. 获取用户错题关联的知识点
-    error_kps_query = db.query(QuestionKnowledge.knowledge_id).join(
-        ErrorBook, ErrorBook.question_id == QuestionKnowledge.question_id
-    ).filter(
-        ErrorBook.user_id == user_id,
-        ErrorBook.mastered == False
-    )
-    
-    # 如果指定学科，过滤学科
-    if subject_id:
-        error_kps_query = error_kps_query.join(
-            Question, Question.id == QuestionKnowledge.question_id
-        ).join(
-            QuestionTag, QuestionTag.question_id == Question.id
-        ).filter(QuestionTag.tag_id == subject_id)
-    
-    error_kps = error_kps_query.distinct().all()
-    
-    if not error_kps:
-        return []  # 无错题，返回空
-    
-    kp_ids = [kp.knowledge_id for kp in error_kps]
-    
-    # 2. 扩展到祖先节点（考虑层级影响）
-    all_kps = set(kp_ids)
-    for kp_id in kp_ids:
-        ancestors = get_ancestor_ids(db, kp_id)
-        all_kps.update(ancestors)
-    
-    # 3. 计算每个知识点的综合权重
-    # 🚀 优化：批量查询所有知识点，减少数据库查询次数
-    kp_list = db.query(
-        KnowledgePoint.id, 
-        KnowledgePoint.depth
-    ).filter(KnowledgePoint.id.in_(all_kps)).all()
-    kp_depth_map = {kp.id: kp.depth for kp in kp_list}
-    
-    kp_weights = []
-    for kp_id in all_kps:
-        depth = kp_depth_map.get(kp_id)
-        if depth is None:
-            continue
-        
-        # 继承权重（含祖先影响）
-        inherited = calculate_inherited_weight(db, user_id, kp_id, cache)
-        
-        # 深度系数（越深越重要）
-        depth_coeff = calculate_depth_coefficient(depth or 0)
-        
-        # 最终权重
-        final_weight = inherited * depth_coeff
-        
-        if final_weight > 0:
-            kp_weights.append({
-                'kp_id': kp_id,
-                'weight': final_weight,
-                'level': depth or 0
-            })
-    
-    if not kp_weights:
+    # 1~4. 向量化计算知识点综合权重（时间衰减 + 父子继承 + 深度系数），取前10个薄弱知识点
+    # 🚀 优化：固定两次查询，不再按知识点/祖先逐个查库
+    top_kps = weak_point_scoring.rank_weak_points(db, user_id, subject_id)
+    if not top_kps:
         return []
     
-    # 4. 按权重排序，取top知识点
-    kp_weights.sort(key=lambda x: x['weight'], reverse=True)
-    top_kps = kp_weights[:10]  # 取前10个薄弱知识点
-    
     # 5. 从薄弱知识点中加权抽题
     question_ids = []
     total_weight = sum(kp['weight'] for kp in top_kps)
     
+    # 🚀 优化：优先在用户候选池（内存）中按掩码抽题，题库过大时回退到数据库流式抽样
+    pool = question_pool.get_pool(db, user_id)
+    if pool is not None:
+        mastered = [qid for (qid,) in db.query(ErrorBook.question_id).filter(
+            ErrorBook.user_id == user_id,
+            ErrorBook.mastered == True
+        ).all()]
+        base_mask = pool.mask(
+            subject_id, question_types, exclude_ids=mastered,
+            include_ids=_knowledge_scope_ids(db, knowledge_id, include_children),
+        )
+    
     for kp_info in top_kps:
         # 按权重分配题目数量
         ratio = kp_info['weight'] / total_weight
         limit = max(1, int(size * ratio * 1.5))  # 多抽一些备用
         
+        if pool is not None:
+            question_ids.extend(pool.sample(base_mask & pool.knowledge_mask([kp_info['kp_id']]), limit))
+            continue
+        
         # 🔒 从该知识点抽题（只抽用户自己创建的题目）
         q = db.query(Question.id).join(
             QuestionVersion, QuestionVersion.question_id == Question.id
@@ -356,9 +190,10 @@ def get_weak_point_questions_smart(
         # 🆕 如果指定题型，过滤题型
         if question_types:
             q = q.filter(Question.type.in_(question_types))
+        q = _filter_knowledge_scope(q, knowledge_id, include_children)
         
-        questions = q.order_by(func.rand()).limit(limit).all()
-        question_ids.extend([q.id for q in questions])
+        # 🚀 优化：流式读取候选 ID + 蓄水池抽样，替代 ORDER BY RAND() 全量排序
+        question_ids.extend(sampling.sample_ids(q.distinct(), limit))
     
     # 6. 去重、打乱、截取
     question_ids = list(set(question_ids))
@@ -370,14 +205,23 @@ def get_hard_questions(
     user_id: int,  # 🔒 添加用户ID参数
     size: int, 
     subject_id: Optional[int] = None,
-    question_types: Optional[List[str]] = None  # 🆕 添加题型参数
+    question_types: Optional[List[str]] = None,  # 🆕 添加题型参数
+    knowledge_id: Optional[int] = None,  # 🆕 限定知识点范围
+    include_children: bool = True
 ) -> List[int]:
     """
     获取用户的难题（基于difficulty字段）
     
     Args:
         question_types: 题型列表，如 ['SC', 'MC', 'FILL']，None 表示全部类型
+        knowledge_id: 只在该知识点（include_children 时含子孙）绑定的题目中抽取
     """
+    # 🚀 优化：优先在用户候选池（内存）中抽题
+    pool = question_pool.get_pool(db, user_id)
+    if pool is not None:
+        scope = _knowledge_scope_ids(db, knowledge_id, include_children)
+        return pool.sample(pool.mask(subject_id, question_types, min_difficulty=4, include_ids=scope), size)
+    
     # 🔒 只查询用户自己创建的难题
     q = db.query(Question.id).join(
         QuestionVersion, QuestionVersion.question_id == Question.id
@@ -393,22 +237,33 @@ def get_hard_questions(
     # 🆕 如果指定题型，过滤题型
     if question_types:
         q = q.filter(Question.type.in_(question_types))
+    q = _filter_knowledge_scope(q, knowledge_id, include_children)
     
-    questions = q.order_by(func.rand()).limit(size).all()
-    return [q.id for q in questions]
+    # 🚀 优化：流式读取候选 ID + 蓄水池抽样，替代 ORDER BY RAND() 全量排序
+    return sampling.sample_ids(q.distinct(), size)
 
 def get_random_questions(
     db: Session, 
     user_id: int,  # 🔒 添加用户ID参数
     size: int, 
     subject_id: Optional[int] = None,
-    question_types: Optional[List[str]] = None
+    question_types: Optional[List[str]] = None,
+    knowledge_id: Optional[int] = None,  # 🆕 限定知识点范围
+    include_children: bool = True
 ) -> List[int]:
     """
     随机抽题（只抽用户自己的题目）
     """
     log.info(f"[get_random_questions] 用户{user_id}, 请求size={size}, 学科={subject_id}, 题型={question_types}")
     
+    # 🚀 优化：优先在用户候选池（内存）中抽题
+    pool = question_pool.get_pool(db, user_id)
+    if pool is not None:
+        scope = _knowledge_scope_ids(db, knowledge_id, include_children)
+        question_ids = pool.sample(pool.mask(subject_id, question_types, include_ids=scope), size)
+        log.info(f"[get_random_questions] 候选池抽取{len(question_ids)}题")
+        return question_ids
+    
     # 🔒 只查询用户自己创建的题目
     q = db.query(Question.id).join(
         QuestionVersion, QuestionVersion.question_id == Question.id
@@ -422,10 +277,162 @@ def get_random_questions(
     
     if question_types:
         q = q.filter(Question.type.in_(question_types))
+    q = _filter_knowledge_scope(q, knowledge_id, include_children)
     
-    questions = q.order_by(func.rand()).limit(size).all()
-    log.info(f"[get_random_questions] 实际查询到{len(questions)}题")
-    return [q.id for q in questions]
+    # 🚀 优化：流式读取候选 ID + 蓄水池抽样，替代 ORDER BY RAND() 全量排序
+    question_ids = sampling.sample_ids(q.distinct(), size)
+    log.info(f"[get_random_questions] 实际查询到{len(question_ids)}题")
+    return question_ids
+
+# 🤖 SMART 模式配比：60% 薄弱知识点 + 30% 难题 + 其余随机
+SMART_WEAK_RATIO = 0.6
+SMART_HARD_RATIO = 0.3
+HARD_MIN_DIFFICULTY = 4
+
+def _weak_kp_limits(top_kps: List[dict], weak_size: int) -> dict:
+    """按薄弱知识点权重分配抽题数量（多抽一些备用）：{kp_id: limit}"""
+    total_weight = sum(kp['weight'] for kp in top_kps)
+    return {kp['kp_id']: max(1, int(weak_size * kp['weight'] / total_weight * 1.5)) for kp in top_kps}
+
+def draw_smart_questions(
+    db: Session,
+    user_id: int,
+    size: int,
+    subject_id: Optional[int] = None,
+    question_types: Optional[List[str]] = None,
+    knowledge_id: Optional[int] = None,
+    include_children: bool = True
+) -> List[int]:
+    """
+    SMART 模式一次完成抽题：薄弱知识点 → 难题 → 随机，后一个来源排除已选题目，
+    随机题补齐前两个来源的不足部分，结果无重复、已打乱。
+
+    🚀 优化：原实现依次调用三个抽题函数，再最多三轮随机补题，每轮都重新筛选候选集
+    （回退路径下每个薄弱知识点各一条查询）。现在候选池路径只在内存中做掩码运算；
+    题库过大时回退为一条流式查询，按桶维护蓄水池，同样一次读完。
+    """
+    weak_size = int(size * SMART_WEAK_RATIO)
+    hard_size = int(size * SMART_HARD_RATIO)
+    top_kps = weak_point_scoring.rank_weak_points(db, user_id, subject_id) if weak_size else []
+    limits = _weak_kp_limits(top_kps, weak_size) if top_kps else {}
+
+    pool = question_pool.get_pool(db, user_id)
+    if pool is not None:
+        question_ids = _draw_smart_pool(
+            db, pool, user_id, size, weak_size, hard_size, limits, subject_id, question_types,
+            _knowledge_scope_ids(db, knowledge_id, include_children),
+        )
+    else:
+        question_ids = _draw_smart_stream(
+            db, user_id, size, weak_size, hard_size, limits, subject_id, question_types, knowledge_id, include_children,
+        )
+    random.shuffle(question_ids)
+    return question_ids[:size]
+
+def _draw_smart_pool(db: Session, pool, user_id: int, size: int, weak_size: int, hard_size: int, limits: dict,
+                     subject_id, question_types, scope) -> List[int]:
+    base = pool.mask(subject_id, question_types, include_ids=scope)
+    picked = []
+    if limits:
+        mastered = [qid for (qid,) in db.query(ErrorBook.question_id).filter(
+            ErrorBook.user_id == user_id,
+            ErrorBook.mastered == True
+        ).all()]
+        weak_base = base & pool.mask(exclude_ids=mastered)
+        weak = []
+        for kp_id, limit in limits.items():
+            weak.extend(pool.sample(weak_base & pool.knowledge_mask([kp_id]), limit))
+        weak = list(dict.fromkeys(weak))
+        random.shuffle(weak)
+        picked = weak[:weak_size]
+
+    available = base & pool.mask(exclude_ids=picked)
+    hard = pool.sample(available & (pool.difficulty >= HARD_MIN_DIFFICULTY), hard_size)
+    available &= pool.mask(exclude_ids=hard)
+    return picked + hard + pool.sample(available, size - len(picked) - len(hard))
+
+def _draw_smart_stream(db: Session, user_id: int, size: int, weak_size: int, hard_size: int, limits: dict,
+                       subject_id, question_types, knowledge_id, include_children) -> List[int]:
+    """回退路径：一条查询按题目 ID 顺序流式读取候选（左连接薄弱知识点绑定与已掌握标记），
+    同时维护各薄弱知识点、难题、随机三类蓄水池。
+    难题/随机桶多留出可能与前面来源重复的名额，排除已选后仍能抽够。
+    """
+    q = db.query(
+        Question.id, Question.difficulty, QuestionKnowledge.knowledge_id, ErrorBook.id.label("mastered_id")
+    ).select_from(Question).outerjoin(
+        QuestionKnowledge, and_(
+            QuestionKnowledge.question_id == Question.id,
+            QuestionKnowledge.knowledge_id.in_(list(limits)),
+        )
+    ).outerjoin(
+        ErrorBook, and_(
+            ErrorBook.user_id == user_id,
+            ErrorBook.question_id == Question.id,
+            ErrorBook.mastered == True,
+        )
+    ).filter(
+        Question.id.in_(question_pool.owned_question_ids_select(user_id))  # 🔒 只抽用户自己的题目
+    )
+    if subject_id:
+        q = q.filter(Question.id.in_(select(QuestionTag.question_id).where(QuestionTag.tag_id == subject_id)))
+    if question_types:
+        q = q.filter(Question.type.in_(question_types))
+    q = _filter_knowledge_scope(q, knowledge_id, include_children)
+
+    weak_buckets = {kp_id: sampling.Reservoir(limit) for kp_id, limit in limits.items()}
+    hard_bucket = sampling.Reservoir(hard_size + weak_size)
+    rand_bucket = sampling.Reservoir(size * 2)
+    prev = None
+    for qid, difficulty, kp_id, mastered_id in q.order_by(Question.id).yield_per(sampling.STREAM_CHUNK):
+        if kp_id is not None and mastered_id is None:
+            weak_buckets[kp_id].offer(qid)
+        if qid == prev:  # 同一题绑定多个薄弱知识点时连续出现多行
+            continue
+        prev = qid
+        if (difficulty or 0) >= HARD_MIN_DIFFICULTY:
+            hard_bucket.offer(qid)
+        rand_bucket.offer(qid)
+
+    weak = list(dict.fromkeys(qid for bucket in weak_buckets.values() for qid in bucket.sample()))
+    random.shuffle(weak)
+    picked = weak[:weak_size]
+    taken = set(picked)
+    hard = [qid for qid in hard_bucket.sample() if qid not in taken][:hard_size]
+    taken.update(hard)
+    rest = [qid for qid in rand_bucket.sample() if qid not in taken][:size - len(picked) - len(hard)]
+    return picked + hard + rest
+
+def draw_review_questions(
+    db: Session,
+    user_id: int,
+    size: int,
+    subject_id: Optional[int] = None,
+    question_types: Optional[List[str]] = None,
+    knowledge_id: Optional[int] = None,
+    include_children: bool = True,
+    now: Optional[datetime] = None,
+) -> List[int]:
+    """REVIEW 模式：取已到期、未掌握的错题，最久逾期的在前
+
+    沿 idx_error_book_due (user_id, mastered, next_review_time) 做一次范围扫描，
+    按 next_review_time 顺序读到 size 条即停止；学科/题型/知识点范围为附加过滤条件。
+    """
+    now = now or get_now()
+    q = db.query(ErrorBook.question_id).join(
+        Question, Question.id == ErrorBook.question_id
+    ).filter(
+        ErrorBook.user_id == user_id,
+        ErrorBook.mastered == False,
+        ErrorBook.next_review_time <= now,
+        Question.is_active == True,
+    )
+    if subject_id:
+        q = q.filter(Question.id.in_(select(QuestionTag.question_id).where(QuestionTag.tag_id == subject_id)))
+    if question_types:
+        q = q.filter(Question.type.in_(question_types))
+    q = _filter_knowledge_scope(q, knowledge_id, include_children)
+    rows = q.order_by(ErrorBook.next_review_time.asc(), ErrorBook.id.asc()).limit(size).all()
+    return [qid for (qid,) in rows]
 
 # ========== 智能推荐算法结束 ==========
 
@@ -439,7 +446,7 @@ def create_session(
     question_types: Optional[List[str]] = None,
     practice_mode: str = 'RANDOM'  # 🆕 练习模式
 ) -> tuple[int, int, int, int]:
-    """创建练习会话；支持三种练习模式。异常通过 AppException 抛出，交给统一异常处理器。
+    """创建练习会话；支持四种练习模式。异常通过 AppException 抛出，交给统一异常处理器。
     Args:
         db (Session): 数据库会话
         user (User): 用户对象
@@ -448,7 +455,7 @@ def create_session(
         knowledge_id (Optional[int], optional): 知识点 ID. Defaults to None.
         include_children (bool, optional): 是否包含子知识点. Defaults to False.
         question_types (Optional[List[str]], optional): 题型列表 ['SC', 'MC', 'FILL']. Defaults to None (全部题型).
-        practice_mode (str, optional): 练习模式 'RANDOM'|'SMART'|'WEAK_POINT'. Defaults to 'RANDOM'.
+        practice_mode (str, optional): 练习模式 'RANDOM'|'SMART'|'WEAK_POINT'|'REVIEW'. Defaults to 'RANDOM'.
     Raises:
         AppException: 自定义异常
     Returns:
@@ -477,76 +484,29 @@ def create_session(
         if not tag:
             raise AppException("学科不存在", code=400, status_code=400)
 
+    # 🆕 按知识点练习：所有抽题来源都限定在该知识点（默认含子孙）绑定的题目内
+    if knowledge_id is not None:
+        knowledge_id = int(knowledge_id)
+        include_children = True if include_children is None else bool(include_children)
+        if not knowledge_tree.get_tree(db).contains(knowledge_id) and not db.query(KnowledgePoint.id).filter(KnowledgePoint.id == knowledge_id).first():
+            raise AppException("知识点不存在", code=400, status_code=400)
+        log.info(f"[知识点范围] 知识点={knowledge_id}, 包含子知识点={include_children}")
+
     # 🆕 根据练习模式选择抽题策略
     question_ids = []
     
     if practice_mode == 'SMART':
-        # 🤖 智能推荐：60% 错题知识点 + 30% 全局难题 + 10% 随机题
+        # 🤖 智能推荐：60% 错题知识点 + 30% 全局难题 + 10% 随机题，三个来源去重后由随机题补足
         log.info(f"[SMART模式] 用户{user.id}开始智能推荐抽题")
-        
-        weak_size = int(size * 0.6)
-        hard_size = int(size * 0.3)
-        rand_size = size - weak_size - hard_size  # 剩余部分
-        
-        # 🔒 从错题知识点抽题（只抽用户自己的题目）
-        weak_ids = get_weak_point_questions_smart(db, user.id, weak_size, subject_id, question_types)
-        log.info(f"[SMART模式] 从薄弱知识点抽取 {len(weak_ids)} 题")
-        
-        # 🔒 从全局难题抽题（只抽用户自己的题目）
-        hard_ids = get_hard_questions(db, user.id, hard_size, subject_id, question_types)
-        log.info(f"[SMART模式] 从全局难题抽取 {len(hard_ids)} 题")
-        
-        # 🔒 随机题补充（只抽用户自己的题目）
-        rand_ids = get_random_questions(db, user.id, rand_size, subject_id, question_types)
-        log.info(f"[SMART模式] 随机抽取 {len(rand_ids)} 题")
-        
-        question_ids = weak_ids + hard_ids + rand_ids
-        
-        # 🔥 去重：防止三个来源有重复题目
-        question_ids = list(dict.fromkeys(question_ids))
-        log.info(f"[SMART模式] 去重后共 {len(question_ids)} 题")
-        
-        # 如果题目不足，用随机题补充
-        if len(question_ids) < size:
-            log.warning(f"[SMART模式] 题目不足，补充随机题")
-            need_count = size - len(question_ids)
-            existing_ids = set(question_ids)
-            
-            # 🔥 改进：多次尝试补充，确保数量充足
-            max_attempts = 3
-            for attempt in range(max_attempts):
-                if len(question_ids) >= size:
-                    break
-                    
-                # 每次多取一些，逐步增加倍数
-                fetch_count = need_count * (2 + attempt)
-                extra = get_random_questions(db, user.id, fetch_count, subject_id, question_types)
-                
-                # 过滤已有题目
-                new_questions = [qid for qid in extra if qid not in existing_ids]
-                
-                # 添加新题目
-                add_count = min(len(new_questions), size - len(question_ids))
-                question_ids.extend(new_questions[:add_count])
-                existing_ids.update(new_questions[:add_count])
-                
-                log.info(f"[SMART模式] 第{attempt+1}次补充 {add_count} 题，总计 {len(question_ids)} 题")
-                
-                if add_count == 0:
-                    # 没有更多可用题目了
-                    log.warning(f"[SMART模式] 题库不足，无法补充更多题目")
-                    break
-        
-        # 打乱顺序
-        random.shuffle(question_ids)
-        question_ids = question_ids[:size]
+        question_ids = draw_smart_questions(db, user.id, size, subject_id, question_types, knowledge_id, include_children)
+        log.info(f"[SMART模式] 共抽取 {len(question_ids)} 题")
     
     elif practice_mode == 'WEAK_POINT':
         # 🎯 薄弱专项：100% 错题知识点
         log.info(f"[WEAK_POINT模式] 用户{user.id}开始薄弱专项抽题")
         
         # 🔒 只抽用户自己的题目
-        question_ids = get_weak_point_questions_smart(db, user.id, size, subject_id, question_types)
+        question_ids = get_weak_point_questions_smart(db, user.id, size, subject_id, question_types, knowledge_id, include_children)
         log.info(f"[WEAK_POINT模式] 从薄弱知识点抽取 {len(question_ids)} 题")
         
         # 如果错题不足，降级为随机模式
@@ -563,7 +523,7 @@ def create_session(
                     
                 # 每次多取一些，逐步增加倍数
                 fetch_count = need_count * (2 + attempt)
-                extra = get_random_questions(db, user.id, fetch_count, subject_id, question_types)
+                extra = get_random_questions(db, user.id, fetch_count, subject_id, question_types, knowledge_id, include_children)
                 
                 # 过滤已有题目
                 new_questions = [qid for qid in extra if qid not in existing_ids]
@@ -580,11 +540,19 @@ def create_session(
                     log.warning(f"[WEAK_POINT模式] 题库不足，无法补充更多题目")
                     break
     
+    elif practice_mode == 'REVIEW':
+        # 🔁 错题复习：按 SM-2 排期到期的错题，最久逾期的优先，不足 size 时不补题
+        log.info(f"[REVIEW模式] 用户{user.id}开始抽取到期错题")
+        question_ids = draw_review_questions(db, user.id, size, subject_id, question_types, knowledge_id, include_children)
+        log.info(f"[REVIEW模式] 到期错题 {len(question_ids)} 题")
+        if not question_ids:
+            raise AppException("暂无到期需要复习的错题", code=404, status_code=404)
+
     else:  # RANDOM
         # 🎲 随机练习（原有逻辑）
         log.info(f"[RANDOM模式] 用户{user.id}开始随机抽题, 请求题目数={size}")
         # 🔒 只抽用户自己的题目
-        question_ids = get_random_questions(db, user.id, size, subject_id, question_types)
+        question_ids = get_random_questions(db, user.id, size, subject_id, question_types, knowledge_id, include_children)
         log.info(f"[RANDOM模式] 实际抽取题目数={len(question_ids)}")
     
     # 🔥 最终去重保护：确保没有重复题目
@@ -598,131 +566,324 @@ def create_session(
 
     # 组卷 + 创建会话（失败要回滚并抛出 AppException）
     try:
-        paper = Paper(
+        attempt_id, paper_id = assemble_paper(db, user.id, question_ids)
+        return attempt_id, paper_id, len(question_ids), 1
+    except Exception as e:
+        db.rollback()
+        raise
+
+def assemble_paper(db: Session, user_id: int, question_ids: List[int]) -> tuple[int, int]:
+    """批量组卷：试卷、全部试题（多行 INSERT）、练习会话在同一事务中写入并提交
+
+    🚀 优化：不再逐题 db.add(PaperQuestion) 经工作单元逐行刷新，
+    固定 3 条 INSERT + 1 次提交，与题目数量无关。
+
+    Returns:
+        tuple[int, int]: 会话 ID, 试卷 ID
+    """
+    paper_id = db.execute(
+        insert(Paper).values(
             title=_new_title(),
             is_public=False,
             status="PRACTICE",
-            created_by=user.id,
+            created_by=user_id,
         )
-        db.add(paper); db.flush()
-        for i, qid in enumerate(question_ids, start=1):
-            db.add(PaperQuestion(paper_id=paper.id, question_id=qid, seq=i))
-        db.flush()
-        attempt = ExamAttempt(user_id=user.id, paper_id=paper.id, status="IN_PROGRESS", start_time=get_now())
-        db.add(attempt); db.commit()
-        return attempt.id, paper.id, len(question_ids), 1
-    except Exception as e:
-        db.rollback()
-        raise
+    ).inserted_primary_key[0]
+    db.execute(
+        insert(PaperQuestion),
+        [{"paper_id": paper_id, "question_id": qid, "seq": i} for i, qid in enumerate(question_ids, start=1)],
+    )
+    attempt_id = db.execute(
+        insert(ExamAttempt).values(
+            user_id=user_id, paper_id=paper_id, status="IN_PROGRESS", start_time=get_now(),
+            question_count=len(question_ids),
+        )
+    ).inserted_primary_key[0]
+    db.commit()
+    return attempt_id, paper_id
+
+def _load_snapshot(db: Session, user: User, attempt_id: int) -> attempt_snapshot.AttemptSnapshot:
+    """取会话快照；未缓存时用 6 条查询载入整张试卷（会话不存在或已结束抛出 404）"""
+    snap = attempt_snapshot.get(attempt_id)
+    if snap is not None:
+        if snap.user_id != user.id:
+            raise AppException("会话不存在或已结束", code=404, status_code=404)
+        return snap
 
-def get_question(db: Session, user: User, attempt_id: int, seq: int):
     attempt = db.query(ExamAttempt).filter(ExamAttempt.id == attempt_id, ExamAttempt.user_id == user.id).first()
     if not attempt or attempt.status != "IN_PROGRESS":
         raise AppException("会话不存在或已结束", code=404, status_code=404)
 
-    pq = db.query(PaperQuestion).filter(PaperQuestion.paper_id == attempt.paper_id, PaperQuestion.seq == seq).first()
-    if not pq:
-        raise AppException("题目不存在", code=404, status_code=404)
+    rows = db.query(
+        PaperQuestion.seq, Question.id, Question.type, Question.difficulty, Question.is_active,
+        QuestionVersion.id.label("version_id"), QuestionVersion.stem, QuestionVersion.options,
+        QuestionVersion.explanation, QuestionVersion.correct_answer,
+        QuestionVersion.is_active.label("version_active"),
+    ).join(
+        Question, Question.id == PaperQuestion.question_id
+    ).outerjoin(
+        QuestionVersion, QuestionVersion.id == Question.current_version_id
+    ).filter(
+        PaperQuestion.paper_id == attempt.paper_id
+    ).order_by(PaperQuestion.seq.asc()).all()
+
+    items = []
+    for r in rows:
+        has_version = r.version_id is not None
+        items.append(attempt_snapshot.SnapshotItem(
+            seq=r.seq,
+            question_id=r.id,
+            type=r.type,
+            difficulty=r.difficulty,
+            stem=r.stem,
+            options=_opt_to_list(r.options) if has_version else [],  # 关键：强转为 List[str]
+            explanation=r.explanation or None,
+            correct_answer=r.correct_answer or "",
+            version_id=r.version_id,
+            matcher=grading.get_matcher(r.version_id, r.type, r.correct_answer) if has_version else None,
+            question_active=bool(r.is_active),
+            version_active=has_version and bool(r.version_active),
+            has_version=has_version,
+        ))
+    answered = _answered_state(db, attempt.id)
+    qids = [it.question_id for it in items]
+    links = weakness_profile.load_links(db, qids)
+    review_ids = {
+        qid for (qid,) in db.query(ErrorBook.question_id).filter(
+            ErrorBook.user_id == user.id, ErrorBook.mastered == False, ErrorBook.question_id.in_(qids)
+        ).all()
+    } if qids else set()
+
+    snap = attempt_snapshot.AttemptSnapshot(attempt.id, user.id, attempt.paper_id, items, answered, links, review_ids)
+    attempt_snapshot.put(snap)
+    return snap
+
+def get_question(db: Session, user: User, attempt_id: int, seq: int):
+    # 🚀 优化：命中会话快照时不访问数据库
+    snap = _load_snapshot(db, user, attempt_id)
 
-    q = db.query(Question).filter(Question.id == pq.question_id, Question.is_active == True).first()
-    if not q:
+    item = snap.item(seq)
+    if not item:
+        raise AppException("题目不存在", code=404, status_code=404)
+    if not item.question_active:
         raise AppException("题目不可用", code=404, status_code=404)
-    qv = db.query(QuestionVersion).filter(QuestionVersion.id == q.current_version_id, QuestionVersion.is_active == 1).first()
-    if not qv:
+    if not item.version_active:
         raise AppException("题目版本不存在", code=404, status_code=404)
 
-    return {
-        "seq": seq,
-        "question_id": q.id,
-        "type": q.type,
-        "difficulty": q.difficulty,
-        "stem": qv.stem,
-        "options": _opt_to_list(getattr(qv, "options", None) or getattr(qv, "choices", None)),  # 关键：强转为 List[str]
-        "explanation": getattr(qv, "explanation", None) or None,
-    }
+    return item.view()
 
 def submit_answer(db: Session, user: User, attempt_id: int, seq: int, user_answer: str, time_spent_ms: int | None = None):
-    attempt = db.query(ExamAttempt).filter(ExamAttempt.id == attempt_id, ExamAttempt.user_id == user.id).first()
-    if not attempt or attempt.status != "IN_PROGRESS":
-        raise AppException("会话不存在或已结束", code=404, status_code=404)
+    # 🚀 优化：试卷、题目、标准答案、已作答状态均来自会话快照，作答记录直接写入
+    snap = _load_snapshot(db, user, attempt_id)
 
-    pq = db.query(PaperQuestion).filter(PaperQuestion.paper_id == attempt.paper_id, PaperQuestion.seq == seq).first()
-    if not pq:
+    item = snap.item(seq)
+    if not item:
         raise AppException("题目不存在", code=404, status_code=404)
+    if not item.has_version:
+        raise AppException("题目版本不存在", code=404, status_code=404)
 
-    q = db.query(Question).filter(Question.id == pq.question_id).first()
-    qv = db.query(QuestionVersion).filter(QuestionVersion.id == q.current_version_id).first()
-
-    # 🔥 根据题型选择不同的验证方式
-    if q.type == "MC":
-        # 多选题：比较排序后的字母集合
-        correct = _norm_mc(user_answer) == _norm_mc(qv.correct_answer)
-    elif q.type == "FILL":
-        # 🆕 填空题：支持多答案(分号分隔),任一匹配即正确
-        correct_answers = [_norm_fill(a) for a in qv.correct_answer.split(';')]
-        user_ans = _norm_fill(user_answer)
-        correct = user_ans in correct_answers
-    else:
-        # 单选题：比较单个字母
-        correct = _norm_sc(user_answer) == _norm_sc(qv.correct_answer)
-
-    ua = db.query(UserAnswer).filter(
-        UserAnswer.attempt_id == attempt.id, UserAnswer.question_id == q.id
-    ).first()
+    correct = item.matcher.match(user_answer)
     now = get_now()
-    if ua:
-        ua.user_answer = user_answer
-        ua.is_correct = correct
-        ua.time_spent_ms = time_spent_ms
-        ua.answer_time = now
+    async_write = answer_writer.enabled()
+    if async_write:
+        # 🚀 作答记录异步批量写入：新作答/改答以快照为准（会话状态校验通过后再入队）
+        prev = snap.answered.get(item.question_id)
     else:
-        ua = UserAnswer(
-            attempt_id=attempt.id, user_id=user.id, question_id=q.id, paper_id=attempt.paper_id,
-            user_answer=user_answer, is_correct=correct, time_spent_ms=time_spent_ms,
-            answer_time=now, first_flag=True
-        )
-        db.add(ua)
-
-    # 新增：答错则写入/更新错题本
+        prev = _write_answer(db, snap, item, user.id, user_answer, correct, time_spent_ms, now)
+    # 🚀 优化：原子增量维护会话进度计数（改答时按对错变化修正），替代 COUNT 查询；同一条 UPDATE 校验会话仍在进行中
+    _bump_progress(db, snap.attempt_id, 1 if prev is None else 0, int(correct) - int(bool(prev)))
+    if async_write:
+        answer_writer.submit([_answer_row(snap, user.id, item.question_id, {
+            "user_answer": user_answer, "is_correct": correct, "time_spent_ms": time_spent_ms, "answer_time": now,
+        })])
+
+    # 新增：答错则写入/更新错题本；答对错题本中的题目则按 SM-2 推迟下次复习
     if not correct:
-        eb = db.query(ErrorBook).filter(
-            ErrorBook.user_id == user.id,          # 按用户维度
-            ErrorBook.question_id == q.id
-        ).first()
-        if eb:
-            eb.wrong_count = (eb.wrong_count or 0) + 1
-            eb.last_wrong_time = now
-            eb.next_review_time = now + timedelta(days=min(7, max(1, eb.wrong_count)))
-        else:
-            eb = ErrorBook(
-                user_id=user.id,                   # 写入 user_id
-                question_id=q.id,
-                first_wrong_time=now,
-                last_wrong_time=now,
-                wrong_count=1,
-                next_review_time=now + timedelta(days=1),
-                mastered=False,
-            )
-            db.add(eb)
+        error_book_service.upsert_wrong(db, user.id, {item.question_id: 1}, now, links=snap.links)
+    elif item.question_id in snap.review_ids:
+        error_book_service.record_correct(db, user.id, [item.question_id], now)
 
     db.commit()
+    snap.answered[item.question_id] = correct
+    if not correct:
+        snap.review_ids.add(item.question_id)
 
-    total = db.query(PaperQuestion).filter(PaperQuestion.paper_id == attempt.paper_id).count()
     return {
         "seq": seq,
         "correct": bool(correct),
-        "correct_answer": qv.correct_answer or "",
-        "total": int(total),
+        "correct_answer": item.correct_answer,
+        "total": snap.total,
     }
 
+def submit_answers_batch(db: Session, user: User, attempt_id: int, items):
+    """批量提交答案：统一判分，作答记录与错题本批量写入并一次提交
+
+    同一题在本批中多次出现时以最后一次作答为准，每次答错都计入错题次数（与逐题提交一致）。
+    题号不存在等单题错误记录在该题结果的 error 中，不影响其它题目。
+    """
+    snap = _load_snapshot(db, user, attempt_id)
+    now = get_now()
+
+    results = []
+    latest = {}       # question_id -> 写入 USER_ANSWER 的值（最后一次作答）
+    wrong_counts = {} # question_id -> 本批答错次数
+    for it in items:
+        item = snap.item(it.seq)
+        if not item:
+            results.append({"seq": it.seq, "error": "题目不存在"})
+            continue
+        if not item.has_version:
+            results.append({"seq": it.seq, "error": "题目版本不存在"})
+            continue
+        correct = item.matcher.match(it.user_answer)
+        latest[item.question_id] = {
+            "user_answer": it.user_answer, "is_correct": correct,
+            "time_spent_ms": it.time_spent_ms, "answer_time": now,
+        }
+        if not correct:
+            wrong_counts[item.question_id] = wrong_counts.get(item.question_id, 0) + 1
+        results.append({"seq": it.seq, "correct": correct, "correct_answer": item.correct_answer})
+
+    if latest:
+        async_write = answer_writer.enabled()
+        if async_write:
+            answered_delta, correct_delta = _answer_deltas(snap, latest)
+        else:
+            try:
+                answered_delta, correct_delta = _write_answers_bulk(db, snap, user.id, latest)
+            except IntegrityError:
+                # uk_answer_attempt_question：其它进程已写入部分题目；回滚后按数据库中的实际状态重写
+                db.rollback()
+                snap.answered = _answered_state(db, snap.attempt_id)
+                answered_delta, correct_delta = _write_answers_bulk(db, snap, user.id, latest)
+        _bump_progress(db, snap.attempt_id, answered_delta, correct_delta)
+        if async_write:
+            answer_writer.submit([_answer_row(snap, user.id, qid, v) for qid, v in latest.items()])
+        if wrong_counts:
+            error_book_service.upsert_wrong(db, user.id, wrong_counts, now, links=snap.links)
+        review_correct = [qid for qid, v in latest.items() if v["is_correct"] and (qid in snap.review_ids or qid in wrong_counts)]
+        if review_correct:
+            error_book_service.record_correct(db, user.id, review_correct, now)
+        db.commit()
+        snap.answered.update((qid, v["is_correct"]) for qid, v in latest.items())
+        snap.review_ids.update(wrong_counts)
+
+    return {"total": snap.total, "results": results}
+
+def _write_answers_bulk(db: Session, snap, user_id: int, latest: dict):
+    """按快照的已作答状态拆成一条多行 INSERT + 一条 executemany UPDATE
+
+    Returns:
+        (新增作答数, 答对数变化)
+    """
+    t = UserAnswer.__table__
+    updates = [dict(v, b_qid=qid) for qid, v in latest.items() if qid in snap.answered]
+    inserts = [
+        dict(v, attempt_id=snap.attempt_id, user_id=user_id, question_id=qid, paper_id=snap.paper_id, first_flag=True)
+        for qid, v in latest.items() if qid not in snap.answered
+    ]
+    if updates:
+        db.execute(
+            t.update().where(
+                t.c.attempt_id == snap.attempt_id, t.c.question_id == bindparam("b_qid")
+            ).values(
+                user_answer=bindparam("user_answer"), is_correct=bindparam("is_correct"),
+                time_spent_ms=bindparam("time_spent_ms"), answer_time=bindparam("answer_time"),
+            ),
+            updates,
+        )
+    if inserts:
+        db.execute(t.insert(), inserts)
+    return _answer_deltas(snap, latest)
+
+def _answer_deltas(snap, latest: dict):
+    """按快照的已作答状态计算 (新增作答数, 答对数变化)"""
+    answered_delta = sum(1 for qid in latest if qid not in snap.answered)
+    correct_delta = sum(int(v["is_correct"]) for v in latest.values()) - sum(
+        int(bool(snap.answered[qid])) for qid in latest if qid in snap.answered
+    )
+    return answered_delta, correct_delta
+
+def _answer_row(snap, user_id: int, question_id: int, values: dict) -> dict:
+    """异步写入队列中的一条作答记录"""
+    return dict(values, attempt_id=snap.attempt_id, user_id=user_id, question_id=question_id, paper_id=snap.paper_id)
+
+def _answered_state(db: Session, attempt_id: int) -> dict:
+    """会话已作答题目及其对错：{question_id: is_correct}"""
+    if answer_writer.enabled():
+        answer_writer.drain()  # 先写入队列中尚未刷新的作答
+    return {
+        qid: bool(is_correct) for qid, is_correct in db.query(UserAnswer.question_id, UserAnswer.is_correct).filter(
+            UserAnswer.attempt_id == attempt_id
+        ).all()
+    }
+
+def _bump_progress(db: Session, attempt_id: int, answered_delta: int, correct_delta: int):
+    """原子增量更新会话进度计数（UPDATE ... SET x = x + n），并发提交不会丢失计数
+
+    条件带上 status = 'IN_PROGRESS'：快照缓存不含会话状态，会话已在其它进程结束时
+    （本进程快照仍在缓存中）匹配不到行，回滚本次写入、清除快照并按会话已结束处理。
+    计数不变（改答对错未变）时同样执行，以便每次提交都校验状态。
+    """
+    result = db.execute(update(ExamAttempt).where(
+        ExamAttempt.id == attempt_id, ExamAttempt.status == "IN_PROGRESS"
+    ).values(
+        answered_count=ExamAttempt.answered_count + answered_delta,
+        correct_count=ExamAttempt.correct_count + correct_delta,
+    ))
+    if not result.rowcount:
+        db.rollback()
+        attempt_snapshot.drop(attempt_id)
+        raise AppException("会话不存在或已结束", code=404, status_code=404)
+
+def _write_answer(db: Session, snap, item, user_id: int, user_answer: str, correct: bool, time_spent_ms, now):
+    """写入作答记录：快照记录已作答则 UPDATE，否则 INSERT（其它进程已写入时回退为 UPDATE）
+    需作为事务中的第一条写入调用
+
+    Returns:
+        改答时返回原作答的对错，新作答返回 None
+    """
+    values = {"user_answer": user_answer, "is_correct": correct, "time_spent_ms": time_spent_ms, "answer_time": now}
+    stmt = update(UserAnswer).where(
+        UserAnswer.attempt_id == snap.attempt_id, UserAnswer.question_id == item.question_id
+    ).values(**values)
+    if item.question_id in snap.answered and db.execute(stmt).rowcount:
+        return snap.answered[item.question_id]
+    try:
+        db.execute(insert(UserAnswer).values(
+            attempt_id=snap.attempt_id, user_id=user_id, question_id=item.question_id,
+            paper_id=snap.paper_id, first_flag=True, **values
+        ))
+    except IntegrityError:
+        # uk_answer_attempt_question：其它进程已写入该题作答；这是本事务的第一条写入，回滚后改为 UPDATE
+        db.rollback()
+        prev = db.query(UserAnswer.is_correct).filter(
+            UserAnswer.attempt_id == snap.attempt_id, UserAnswer.question_id == item.question_id
+        ).scalar()
+        db.execute(stmt)
+        return bool(prev)
+    return None
+
 def finish(db: Session, user: User, attempt_id: int):
     attempt = db.query(ExamAttempt).filter(ExamAttempt.id == attempt_id, ExamAttempt.user_id == user.id).first()
     if not attempt:
         raise AppException("会话不存在", code=404, status_code=404)
 
-    total = db.query(PaperQuestion).filter(PaperQuestion.paper_id == attempt.paper_id).count()
-    answered = db.query(UserAnswer).filter(UserAnswer.attempt_id == attempt.id).count()
-    correct_count = db.query(UserAnswer).filter(UserAnswer.attempt_id == attempt.id, UserAnswer.is_correct == True).count()
+    async_write = answer_writer.enabled()
+    if async_write:
+        answer_writer.drain()  # 结束会话前确保作答记录已全部写入
+
+    # 🚀 优化：直接读取增量维护的进度计数，不再执行三次 COUNT
+    total = attempt.question_count or 0
+    answered = attempt.answered_count or 0
+    correct_count = attempt.correct_count or 0
+    if async_write and attempt.status != "FINISHED":
+        # 异步写入时计数增量按本进程快照判断新作答/改答（并发提交同一题、其它进程已作答时会多计），
+        # 结束时按写入后的 USER_ANSWER 重新统计一次并回写
+        answered, correct_count = db.query(
+            func.count(UserAnswer.id), func.coalesce(func.sum(case((UserAnswer.is_correct == True, 1), else_=0)), 0)
+        ).filter(UserAnswer.attempt_id == attempt.id).one()
+        attempt.answered_count, attempt.correct_count = answered, correct_count
 
     if attempt.status != "FINISHED":
         attempt.status = "FINISHED"
@@ -730,6 +891,7 @@ def finish(db: Session, user: User, attempt_id: int):
         attempt.duration_seconds = int((attempt.submit_time - attempt.start_time).total_seconds()) if attempt.start_time else 0
         attempt.calculated_accuracy = (correct_count / total) if total else 0
         db.add(attempt); db.commit()
+    attempt_snapshot.drop(attempt.id)
 
     return {
         "total": int(total),
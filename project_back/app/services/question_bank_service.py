@@ -1,207 +1,28 @@
-from openpyxl import load_workbook
 from fastapi import HTTPException
 from app.models.question import Question
 from app.models.question_version import QuestionVersion
 from app.models.tag import Tag, QuestionTag
 from sqlalchemy.orm import Session
-from app.schemas.question_bank import ImportQuestionsResult, ImportErrorItem
+from app.schemas.question_bank import ImportQuestionsResult
 from typing import Dict
 from sqlalchemy import select, exists
 import json
 from app.models.user import User  # 修复未定义 User
-
-HEADER_EXPECT = ["题干","选项A","选项B","选项C","选项D","题型(单选/多选/填空)","正确答案（单选多选请填入ABCD,填空直接填入答案，不同方式用;隔开如:BEIJNG;beijng）","解析","学科（数学，英语，化学，物理，语文）","学段（小学，初中，高中，大学）"]
-ANSWER_KEYS = ["A","B","C","D"]
-QUESTION_TYPES = {"单选": "SC", "多选": "MC", "填空": "FILL"}  # 🆕 添加填空题型
-
-def _get_or_none(tag_map: Dict[str, Tag], name: str):
-    if not name:
-        return None
-    return tag_map.get(name.strip())
+from app.core.exceptions import AppException
+from app.db.pagination import decode_cursor, next_cursor
+from app.services import question_pool, weakness_profile
+from app.services import question_import, question_formats, stem_search
+from app.services.question_import import HEADER_EXPECT, ANSWER_KEYS, QUESTION_TYPES  # noqa: F401  兼容旧引用
 
 def import_questions_from_excel(db: Session, file_path: str, user_id: int) -> ImportQuestionsResult:
-    try:
-        # 🚀 优化：使用只读模式和data_only模式，大幅减少内存占用
-        wb = load_workbook(file_path, read_only=True, data_only=True)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"无法读取Excel: {e}")
-    ws = wb.active
-    header = [ (ws.cell(row=1,column=i+1).value or "").strip() for i in range(len(HEADER_EXPECT)) ]
-    if header != HEADER_EXPECT:
-        raise HTTPException(status_code=400, detail="模板表头不匹配，请下载最新模板")
-
-    tags = db.execute(select(Tag).where(Tag.type.in_(["SUBJECT","LEVEL"]))).scalars().all()
-    tag_map = {t.name.strip(): t for t in tags}
-
-    result = ImportQuestionsResult(total_rows=0, success=0, failed=0, errors=[])
-
-    def cell_str(row:int, col:int) -> str:
-        return str(ws.cell(row=row, column=col).value or "").strip()
-
-    for r in range(2, ws.max_row+1):
-        # 跳过纯空行
-        if all((cell_str(r, c) == "") for c in range(1, 6)):
-            continue
-        result.total_rows += 1
-        try:
-            # ========================================
-            # 第一阶段：读取所有数据
-            # ========================================
-            stem = cell_str(r, 1)
-            A = cell_str(r, 2)
-            B = cell_str(r, 3)
-            C = cell_str(r, 4)
-            D = cell_str(r, 5)
-            qtype_str = cell_str(r, 6)  # 题型列（单选/多选/填空）
-            correct = cell_str(r, 7).upper()  # 正确答案
-            analysis = cell_str(r, 8)  # 解析
-            subject_name = cell_str(r, 9)  # 学科
-            level_name = cell_str(r, 10)  # 学段
-            
-            # ========================================
-            # 第二阶段：完成所有验证（在分配ID之前）
-            # ========================================
-            
-            # 验证1：题干不能为空
-            if not stem:
-                raise ValueError("题干为空")
-            
-            # 验证2：检查题干是否重复（仅当前用户、仅激活题目）
-            existing = db.query(QuestionVersion).join(
-                Question, 
-                QuestionVersion.question_id == Question.id
-            ).filter(
-                QuestionVersion.stem == stem,
-                QuestionVersion.created_by == user_id,
-                Question.is_active == True,
-                QuestionVersion.is_active == 1
-            ).first()
-            
-            if existing:
-                raise ValueError(f"题目重复：您已创建过相同题干的题目（题目ID: {existing.question_id}）")
-            
-            # 验证3：题型必须有效
-            if qtype_str not in QUESTION_TYPES:
-                raise ValueError(f"题型必须是'单选'、'多选'或'填空'，当前值：{qtype_str}")
-            
-            qtype = QUESTION_TYPES[qtype_str]  # SC 或 MC 或 FILL
-            
-            # 验证4：根据题型验证选项和答案
-            if qtype == "SC":
-                if not all([A, B, C, D]):
-                    raise ValueError("单选题必须填写所有选项A/B/C/D")
-                if correct not in ANSWER_KEYS:
-                    raise ValueError("单选题正确选项必须是 A/B/C/D 之一")
-            elif qtype == "MC":
-                if not all([A, B, C, D]):
-                    raise ValueError("多选题必须填写所有选项A/B/C/D")
-                if not correct or len(correct) < 2:
-                    raise ValueError("多选题至少要有2个正确答案")
-                if not all(c in ANSWER_KEYS for c in correct):
-                    raise ValueError(f"多选题正确选项必须是 A/B/C/D 的组合，如 ABC，当前值：{correct}")
-                # 标准化多选答案：去重并排序（例如 "BCA" -> "ABC"）
-                correct = "".join(sorted(set(correct)))
-            elif qtype == "FILL":
-                if not correct:
-                    raise ValueError("填空题答案不能为空，请在'正确答案'列填写文本答案（支持用分号分隔多个答案，如：北京;beijing）")
-                if any([A, B, C, D]):
-                    raise ValueError("填空题不需要填写选项A/B/C/D，请将这些列留空")
-            
-            # 验证5：验证标签是否有效（可选，但提前验证避免后续失败）
-            subj_tag = _get_or_none(tag_map, subject_name)
-            level_tag = _get_or_none(tag_map, level_name)
-            # 如果需要严格验证标签存在，可以在这里添加检查
-            # if subject_name and not subj_tag:
-            #     raise ValueError(f"学科'{subject_name}'不存在")
-            # if level_name and not level_tag:
-            #     raise ValueError(f"学段'{level_name}'不存在")
-
-            # ========================================
-            # 第三阶段：准备数据（所有验证通过后）
-            # ========================================
-            
-            # 根据题型设置选项
-            if qtype == "FILL":
-                # 填空题不需要选项
-                options = None
-            else:
-                # 单选题和多选题需要选项
-                options = [
-                    {"key":"A","text":A},
-                    {"key":"B","text":B},
-                    {"key":"C","text":C},
-                    {"key":"D","text":D},
-                ]
-
-            # ========================================
-            # 第四阶段：创建数据库记录（只有在所有验证通过后才执行）
-            # ========================================
-            
-            # 创建 Question（此时才分配ID）
-            q = Question(type=qtype, is_active=True)
-            if hasattr(q, "created_by"):
-                setattr(q, "created_by", user_id)
-            db.add(q)
-            db.flush()  # 拿到 q.id
-
-            # 创建 QuestionVersion
-            qv = QuestionVersion(question_id=q.id, version_no=1, is_active=1)
-            setattr(qv, "stem", stem)
-            
-            # 根据题型设置 options
-            if qtype == "FILL":
-                # 填空题不设置 options
-                if hasattr(qv, "options"):
-                    qv.options = None
-            else:
-                # 单选题和多选题设置 options
-                if hasattr(qv, "options"):
-                    qv.options = options
-                elif hasattr(qv, "choices"):
-                    qv.choices = json.dumps([o["text"] for o in options], ensure_ascii=False)
-
-            # 设置解析
-            if hasattr(qv, "analysis"):
-                qv.analysis = analysis
-            elif hasattr(qv, "explanation"):
-                qv.explanation = analysis
-
-            # 设置答案
-            if hasattr(qv, "correct_answer"):
-                qv.correct_answer = correct
-            elif hasattr(qv, "answer"):
-                qv.answer = correct
-
-            # 设置创建者
-            if hasattr(qv, "created_by"):
-                qv.created_by = user_id
-
-            db.add(qv)
-            db.flush()  # 拿到 qv.id
+    # 🚀 优化：iter_rows 流式读取 + 逐行校验（可选进程池并行），替代只读模式下逐格随机访问；
+    # 按批 stem_hash 查重，校验通过的行按批多行写入（见 question_import.ImportWriter）
+    return import_questions_from_file(db, file_path, user_id, "xlsx")
 
-            # 更新 Question 的 current_version_id
-            if hasattr(q, "current_version_id"):
-                q.current_version_id = qv.id
-                db.add(q)
-
-            # 关联标签（标签已在验证阶段获取）
-            if subj_tag:
-                db.add(QuestionTag(question_id=q.id, tag_id=subj_tag.id))
-            if level_tag:
-                db.add(QuestionTag(question_id=q.id, tag_id=level_tag.id))
-
-            # 每行成功后提交
-            db.commit()
-            result.success += 1
-
-        except Exception as e:
-            # 本行失败回滚并记录
-            db.rollback()
-            result.failed += 1
-            result.errors.append(ImportErrorItem(row=r, reason=str(e)))
-
-    # 末尾不再统一 commit
-    return result
+def import_questions_from_file(db: Session, file_path: str, user_id: int, fmt: str) -> ImportQuestionsResult:
+    """导入 xlsx / csv / jsonl 文件（列定义同 Excel 模板，见 question_formats）"""
+    rows, _ = question_formats.open_rows(file_path, fmt)
+    return question_import.import_records(db, question_import.iter_validated(rows), user_id)
 
 def list_my_questions(
     db: Session,
@@ -214,9 +35,19 @@ def list_my_questions(
     active_only: bool = False,
     subject_id: int | None = None,
     level_id: int | None = None,
+    relevance: bool = False,
+    after: str | None = None,
+    with_total: bool = True,
 ):
+    """
+    返回 (total, rows, next_cursor)
+    - after：上一页返回的 next_cursor（按 Question.id 键集翻页，忽略 page）
+    - with_total=False 时不做 count()，total 为 None
+    """
     page = max(1, int(page or 1))
     size = max(1, min(int(size or 10), 100))
+    if after and relevance:
+        raise AppException("按相关度排序时不支持游标分页", code=400, status_code=400)
 
     q = (
         db.query(
@@ -233,9 +64,9 @@ def list_my_questions(
         .filter(QuestionVersion.created_by == user.id)
     )
 
-    if keyword:
-        kw = f"%{keyword.strip()}%"
-        q = q.filter(QuestionVersion.stem.like(kw))
+    if keyword and keyword.strip():
+        # 🚀 优化：全文索引缩小候选集后再 LIKE 复核（见 stem_search）
+        q = stem_search.apply(db, q, keyword, relevance=relevance)
     if qtype:
         q = q.filter(Question.type == qtype)
     if difficulty is not None:
@@ -257,19 +88,21 @@ def list_my_questions(
             )
         )
 
-    total = q.count()
-    rows = (
-        q.order_by(Question.id.asc())
-         .offset((page - 1) * size)
-         .limit(size)
-         .all()
-    )
-    return total, rows
+    total = q.count() if with_total else None
+    # 🚀 优化：游标分页从上一页最后一个 ID 之后直接取 size + 1 行，代价与页码无关
+    q = q.order_by(Question.id.asc())
+    if after:
+        (last_id,) = decode_cursor(after, (int,))
+        q = q.filter(Question.id > last_id)
+    else:
+        q = q.offset((page - 1) * size)
+    rows = q.limit(size + 1).all()
+    return total, rows, next_cursor(rows, size, lambda r: [r.question_id])
 
 def get_my_questions(
     db: Session, page: int, size: int,
     keyword: str|None, qtype: str|None, difficulty: int|None, active_only: bool,
-    subject_id: int | None = None, level_id: int | None = None
+    subject_id: int | None = None, level_id: int | None = None, relevance: bool = False
 ):
     q = (
         db.query(
@@ -284,8 +117,8 @@ def get_my_questions(
         .join(QuestionVersion, QuestionVersion.id == Question.current_version_id, isouter=False)
         .filter(Question.is_active == True)
     )
-    if keyword:
-        q = q.filter(QuestionVersion.stem.ilike(f"%{keyword}%"))
+    if keyword and keyword.strip():
+        q = stem_search.apply(db, q, keyword, relevance=relevance, ilike=True)
     if qtype:
         q = q.filter(Question.type == qtype)
     if difficulty:
@@ -410,7 +243,7 @@ def get_question_owner_id(q: Question, db: Session) -> int | None:
 
 def update_question(db: Session, qid: int, body, user_id: int, is_admin: bool):
     """更新题目信息"""
-    from app.core.exceptions import NotFoundException, ForbiddenException
+    from app.core.exceptions import NotFoundException, ForbiddenException, ConflictException
     
     q = db.query(Question).filter(Question.id == qid).first()
     if not q:
@@ -431,8 +264,11 @@ def update_question(db: Session, qid: int, body, user_id: int, is_admin: bool):
         raise NotFoundException("题目版本不存在")
     
     # 更新字段
+    old_hash = qv.stem_hash or question_import.stem_hash(qv.stem)
+    was_active = bool(q.is_active) and bool(getattr(qv, "is_active", True))
     if body.stem is not None:
         qv.stem = body.stem.strip()
+        qv.stem_hash = question_import.stem_hash(qv.stem)
     
     if body.options is not None:
         val_list = _options_to_db_list(body.options)
@@ -469,6 +305,17 @@ def update_question(db: Session, qid: int, body, user_id: int, is_admin: bool):
         else:
             raise HTTPException(status_code=400, detail=f"题目类型必须是以下之一: {allowed_types}")
     
+    # 🚀 题干查重：规范化后的题干确实变化或由停用改为启用时，按 (created_by, stem_hash) 索引查找题主的其它激活题目；
+    # 原样提交（或只改了空白）的题干不再查重，避免已有重复的旧题目无法编辑
+    if qv.stem_hash is None:
+        qv.stem_hash = old_hash
+    stem_changed = qv.stem_hash != old_hash
+    if (stem_changed or not was_active) and q.is_active and qv.is_active:
+        dup_id = question_import.find_duplicates(db, qv.created_by, [qv.stem_hash], exclude_question_id=q.id).get(qv.stem_hash)
+        if dup_id is not None:
+            db.rollback()
+            raise ConflictException(question_import.duplicate_reason(dup_id))
+
     # 保存时默认通过审核
     if hasattr(qv, "audit_status"):
         qv.audit_status = "APPROVED"
@@ -476,6 +323,7 @@ def update_question(db: Session, qid: int, body, user_id: int, is_admin: bool):
         q.audit_status = "APPROVED"
     
     db.commit()
+    question_pool.invalidate_question(db, qid)
     return {"ok": True}
 
 
@@ -610,6 +458,8 @@ def set_question_tags(db: Session, qid: int, body, user_id: int, is_admin: bool)
                 db.add(QuestionTag(question_id=qid, tag_id=tid))
     
     db.commit()
+    question_pool.invalidate_question(db, qid)
+    weakness_profile.refresh_question(db, qid)  # 学科标签变化，重建相关用户的薄弱知识点画像
     return {"ok": True}
 
 
@@ -623,18 +473,24 @@ def list_questions_page(
     subject_id: int | None = None,
     level_id: int | None = None,
     user_id: int | None = None,
-    is_admin: bool = False
+    is_admin: bool = False,
+    relevance: bool = False,
+    after: str | None = None,
+    with_total: bool = True,
 ):
     """
     通用题目分页查询
     - 管理员可以查看所有题目
     - 普通用户只能查看自己创建的题目
     - 支持多种筛选条件
+    - relevance：有关键字时按相关度排序
+    - after：上一页返回的 next_cursor（按 Question.id 键集翻页，忽略 page）；with_total=False 时不做 count()
+    返回 (total, rows, tags_data, next_cursor)
     """
-    from app.core.exceptions import AppException
-    
     page = max(1, int(page or 1))
     size = max(1, min(int(size or 10), 100))
+    if after and relevance:
+        raise AppException("按相关度排序时不支持游标分页", code=400, status_code=400)
     
     QV = QuestionVersion
     
@@ -658,10 +514,9 @@ def list_questions_page(
     if not is_admin and user_id:
         q = q.filter(QV.created_by == user_id)
     
-    # 关键字搜索
-    if keyword:
-        kw = f"%{keyword.strip()}%"
-        q = q.filter(QV.stem.like(kw))
+    # 关键字搜索（🚀 全文索引 + LIKE 复核，见 stem_search）
+    if keyword and keyword.strip():
+        q = stem_search.apply(db, q, keyword, relevance=relevance)
     
     # 题型筛选
     if qtype:
@@ -689,13 +544,15 @@ def list_questions_page(
             )
         )
     
-    total = q.count()
-    rows = (
-        q.order_by(Question.id.desc())
-         .offset((page - 1) * size)
-         .limit(size)
-         .all()
-    )
+    total = q.count() if with_total else None
+    q = q.order_by(Question.id.desc())
+    if after:
+        (last_id,) = decode_cursor(after, (int,))
+        q = q.filter(Question.id < last_id)
+    else:
+        q = q.offset((page - 1) * size)
+    rows = q.limit(size + 1).all()
+    cursor = next_cursor(rows, size, lambda r: [r.id])
     
     # 获取每道题的标签
     question_ids = [r.id for r in rows]
@@ -715,4 +572,4 @@ def list_questions_page(
             elif ttype == "LEVEL":
                 tags_data[qid]["level_id"] = tid
     
-    return total, rows, tags_data
\ No newline at end of file
+    return total, rows, tags_data, cursor
\ No newline at end of file
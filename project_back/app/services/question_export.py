@@ -0,0 +1,117 @@
+"""
+题库导出（流式）
+
+原先只能通过 GET /questions 每页 100 条翻页导出，每页都要重新 count() 并查一次标签。导出改为：
+- 主查询（当前版本的题干/选项/答案/解析）按题目 ID 键集分批读取（每批 EXPORT_YIELD_PER 行），
+  每批各查一次学科/学段标签与知识点，知识点路径走进程内知识点树
+- 导出在生成器内自建会话（SessionLocal），所有查询都在这一个会话的连接与同一事务中执行，结束时关闭；
+  不依赖请求的 get_db 会话（流式响应期间依赖项何时清理随 FastAPI 版本而变）。
+  不用服务端游标：MySQL 服务端游标未读完前同一连接上不能执行标签/知识点查询，只能再占一个连接
+- csv / jsonl 由生成器逐块产出，直接作为流式响应返回；xlsx 以 write_only 模式写入临时文件后分块发送
+- 列与导入模板一致（见 question_formats），末尾多一列知识点路径（导入时忽略），导出文件可直接再导入
+
+内存占用只与每批行数有关，与题库大小无关。
+"""
+import os
+import tempfile
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.question import Question
+from app.models.question_knowledge import QuestionKnowledge
+from app.models.question_version import QuestionVersion
+from app.models.tag import Tag, QuestionTag
+from app.services import knowledge_tree, question_formats
+from app.services.question_formats import HEADER_EXPECT, JSONL_KEYS
+
+EXPORT_HEADER = [*HEADER_EXPECT, "知识点（多个用;分隔，导入时忽略）"]
+EXPORT_JSONL_KEYS = [*JSONL_KEYS, "knowledge_points"]
+MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+
+_FILE_CHUNK = 256 * 1024
+
+
+def iter_rows(user_id: int, active_only: bool = True,
+              session_factory: Optional[Callable[[], Session]] = None) -> Iterator[List[str]]:
+    """按题目 ID 顺序产出用户题目的导出行（EXPORT_HEADER 顺序）；session_factory 缺省为 SessionLocal"""
+    if session_factory is None:
+        from app.db.session import SessionLocal
+        session_factory = SessionLocal
+    QV = QuestionVersion
+    stmt = (
+        select(Question.id, Question.type, QV.stem, QV.options, QV.correct_answer, QV.explanation)
+        .join(QV, QV.id == Question.current_version_id)
+        .where(QV.created_by == user_id)
+        .order_by(Question.id)
+        .limit(max(1, settings.EXPORT_YIELD_PER))
+    )
+    if active_only:
+        stmt = stmt.where(Question.is_active == True)
+
+    db = session_factory()
+    try:
+        tree = knowledge_tree.get_tree(db)
+        last_id = 0
+        while True:
+            part = db.execute(stmt.where(Question.id > last_id)).all()
+            if not part:
+                break
+            last_id = part[-1].id
+            ids = [r.id for r in part]
+            tags: Dict[int, Dict[str, str]] = defaultdict(dict)
+            for qid, ttype, name in db.execute(
+                select(QuestionTag.question_id, Tag.type, Tag.name)
+                .join(Tag, Tag.id == QuestionTag.tag_id)
+                .where(QuestionTag.question_id.in_(ids), Tag.type.in_(("SUBJECT", "LEVEL")))
+                .order_by(QuestionTag.question_id, Tag.id)
+            ):
+                tags[qid].setdefault(ttype, name)
+            kps: Dict[int, List[str]] = defaultdict(list)
+            for qid, kid in db.execute(
+                select(QuestionKnowledge.question_id, QuestionKnowledge.knowledge_id)
+                .where(QuestionKnowledge.question_id.in_(ids))
+                .order_by(QuestionKnowledge.question_id, QuestionKnowledge.knowledge_id)
+            ):
+                kps[qid].append(tree.path(kid) or f"#{kid}")
+            for r in part:
+                t = tags.get(r.id, {})
+                yield [
+                    *question_formats.export_values(
+                        r.type, r.stem, r.options, r.correct_answer, r.explanation, t.get("SUBJECT"), t.get("LEVEL"),
+                    ),
+                    ";".join(kps.get(r.id, ())),
+                ]
+    finally:
+        db.close()
+
+
+def iter_export(user_id: int, fmt: str, active_only: bool = True,
+                session_factory: Optional[Callable[[], Session]] = None) -> Iterator[bytes]:
+    """按格式产出导出文件的字节块（在生成器内自建会话，见 iter_rows）"""
+    rows = iter_rows(user_id, active_only, session_factory)
+    if fmt == "csv":
+        for chunk in question_formats.csv_chunks(rows, EXPORT_HEADER):
+            yield chunk.encode("utf-8")
+    elif fmt == "jsonl":
+        for chunk in question_formats.jsonl_chunks(rows, EXPORT_JSONL_KEYS):
+            yield chunk.encode("utf-8")
+    elif fmt == "xlsx":
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        try:
+            question_formats.write_xlsx(rows, path, EXPORT_HEADER)
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(_FILE_CHUNK), b""):
+                    yield chunk
+        finally:
+            os.remove(path)
+    else:
+        raise ValueError(f"unsupported export format: {fmt}")
@@ -0,0 +1,217 @@
+"""
+题目导入/导出的文件格式适配
+
+导入流水线（question_import：逐行校验 -> 批量写库 -> ImportQuestionsResult）与文件格式无关，
+这里把各格式读成同样的 (行号, 单元格值) 流，列的含义与顺序与 Excel 模板的 HEADER_EXPECT 一致：
+- xlsx：openpyxl 只读模式（question_import.open_excel），解析 XML 是导入中最慢的一步
+- csv：首行为 HEADER_EXPECT 表头（UTF-8，可带 BOM），标准库 csv 流式解析，行号与 Excel 一致（表头为第 1 行）
+- jsonl：每行一个 JSON 对象，键为 JSONL_KEYS（也接受 HEADER_EXPECT 中的列名），行号为文件行号
+文本格式在开始导入前整文件校验一遍 UTF-8（与估算行数同一遍读取），编码错误在写入任何一批之前就返回 400；
+单行的 CSV 解析错误、JSON 错误作为该行的错误上报，不中断导入。
+
+导出使用同一套列定义：export_values 把题目转成 HEADER_EXPECT 顺序的单元格值，
+csv_chunks / jsonl_chunks 把行流转成可直接流式返回的文本块，write_xlsx 以 write_only 模式写出工作簿，
+导出的文件可原样再导入（多出的列/键导入时忽略）。
+"""
+import codecs
+import csv
+import io
+import json
+import os
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from openpyxl import Workbook
+
+from app.services import question_import
+from app.services.question_import import HEADER_EXPECT, RawRow
+
+FORMATS = ("xlsx", "csv", "jsonl")
+# JSONL 的键，与 HEADER_EXPECT 逐列对应
+JSONL_KEYS = ["stem", "option_a", "option_b", "option_c", "option_d", "type", "answer", "analysis", "subject", "level"]
+TYPE_NAMES = {code: name for name, code in question_import.QUESTION_TYPES.items()}  # SC -> 单选
+
+_CHUNK_ROWS = 500
+_LINE_CHUNK = 1024 * 1024
+
+
+def detect_format(filename: str) -> str:
+    """按扩展名识别导入格式，不支持时抛出 400"""
+    fmt = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail="仅支持 .xlsx / .csv / .jsonl 文件")
+    return fmt
+
+
+def open_rows(file_path: str, fmt: str) -> Tuple[Iterator[RawRow], Optional[int]]:
+    """打开导入文件，返回 (逐行产出 (行号, 单元格值) 的生成器, 估计的数据行数)；表头不匹配、文件无法读取时立即抛出 400"""
+    if fmt == "xlsx":
+        return question_import.open_excel(file_path)
+    if fmt == "csv":
+        return _open_csv(file_path)
+    if fmt == "jsonl":
+        return _open_jsonl(file_path)
+    raise HTTPException(status_code=400, detail=f"不支持的导入格式：{fmt}")
+
+
+def _scan_text(file_path: str) -> int:
+    """整文件校验 UTF-8 并按块数换行符估算行数（引号内换行会多计，仅用于进度估算）
+
+    编码错误在这里（导入开始前）抛出 400；否则读到文件中部才出错时，前面的批次已经提交，只能部分导入。
+    """
+    n = 0
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(_LINE_CHUNK), b""):
+                n += chunk.count(b"\n")
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="文件编码必须是 UTF-8")
+    except OSError as e:
+        raise HTTPException(status_code=400, detail=f"无法读取文件: {e}")
+    return n
+
+
+def _open_text(file_path: str):
+    try:
+        return open(file_path, encoding="utf-8-sig", newline="")
+    except OSError as e:
+        raise HTTPException(status_code=400, detail=f"无法读取文件: {e}")
+
+
+def _closing(gen: Iterator[RawRow], f) -> Iterator[RawRow]:
+    try:
+        yield from gen
+    finally:
+        f.close()
+
+
+def _open_csv(file_path: str) -> Tuple[Iterator[RawRow], Optional[int]]:
+    estimated = max(_scan_text(file_path) - 1, 0)
+    f = _open_text(file_path)
+    reader = csv.reader(f)
+    try:
+        header = [question_import._cell_str(v) for v in next(reader, [])]
+    except csv.Error as e:
+        f.close()
+        raise HTTPException(status_code=400, detail=f"无法读取CSV表头: {e}")
+    header = (header + [""] * len(HEADER_EXPECT))[:len(HEADER_EXPECT)]
+    if header != HEADER_EXPECT:
+        f.close()
+        raise HTTPException(status_code=400, detail="模板表头不匹配，请下载最新模板")
+
+    def generate():
+        row_no = 1
+        while True:
+            row_no += 1
+            try:
+                values = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # 读取器出错后从下一行继续；错误以字符串交给 validate_row，作为该行的错误上报
+                yield row_no, f"CSV 格式错误: {e}"
+                continue
+            # 跳过纯空行（前 5 列都为空），与 Excel 一致
+            if any(v.strip() for v in values[:5]):
+                yield row_no, values
+
+    return _closing(generate(), f), estimated
+
+
+def _open_jsonl(file_path: str) -> Tuple[Iterator[RawRow], Optional[int]]:
+    estimated = _scan_text(file_path)
+    f = _open_text(file_path)
+
+    def generate():
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                obj = None
+            if not isinstance(obj, dict):
+                # 读取阶段的错误以字符串交给 validate_row，作为该行的错误上报
+                yield line_no, "不是合法的 JSON 对象"
+                continue
+            values = [obj.get(key, obj.get(name)) for key, name in zip(JSONL_KEYS, HEADER_EXPECT)]
+            if any(question_import._cell_str(v) for v in values[:5]):
+                yield line_no, values
+
+    return _closing(generate(), f), estimated
+
+
+# ---------- 导出 ----------
+
+def export_values(qtype: str, stem: str, options, correct: Optional[str], analysis: Optional[str],
+                  subject: Optional[str], level: Optional[str]) -> List[str]:
+    """把一道题转成 HEADER_EXPECT 顺序的单元格值（与导入互逆）
+
+    options 兼容导入写入的 [{key, text}] 与编辑接口写入的 [文本, ...]（按位置对应 A~D），以及 JSON 字符串。
+    """
+    if isinstance(options, str):
+        try:
+            options = json.loads(options)
+        except ValueError:
+            options = None
+    texts = {}
+    for i, opt in enumerate(options if isinstance(options, list) else []):
+        if isinstance(opt, dict):
+            key = str(opt.get("key") or "").upper()
+            text = opt.get("text") or opt.get("content") or ""
+        else:
+            key, text = "", "" if opt is None else str(opt)
+        if not key and i < len(question_import.ANSWER_KEYS):
+            key = question_import.ANSWER_KEYS[i]
+        texts.setdefault(key, text)
+    return [
+        stem or "",
+        *(texts.get(k, "") for k in question_import.ANSWER_KEYS),
+        TYPE_NAMES.get(qtype, qtype or ""),
+        correct or "",
+        analysis or "",
+        subject or "",
+        level or "",
+    ]
+
+
+def csv_chunks(rows: Iterable[Sequence], header: Sequence[str] = HEADER_EXPECT) -> Iterator[str]:
+    """CSV 文本块（带 BOM 以便 Excel 按 UTF-8 打开），每 _CHUNK_ROWS 行产出一次"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write("\ufeff")
+    writer.writerow(header)
+    n = 0
+    for row in rows:
+        writer.writerow(row)
+        n += 1
+        if n % _CHUNK_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def jsonl_chunks(rows: Iterable[Sequence], keys: Sequence[str] = JSONL_KEYS) -> Iterator[str]:
+    """JSON Lines 文本块，每 _CHUNK_ROWS 行产出一次"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(keys, row)), ensure_ascii=False))
+        if len(lines) >= _CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def write_xlsx(rows: Iterable[Sequence], path: str, header: Sequence[str] = HEADER_EXPECT) -> None:
+    """openpyxl write_only 模式写出工作簿：行逐条写入临时 XML，内存占用与行数无关（xlsx 是 zip，只能写完再发送）"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(list(header))
+    for row in rows:
+        ws.append(list(row))
+    wb.save(path)
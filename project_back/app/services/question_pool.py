@@ -0,0 +1,204 @@
+"""
+按用户缓存的抽题候选池
+
+create_session 每次都要重新执行 Question ⋈ QuestionVersion ⋈ QuestionTag 按创建者过滤的连接，
+SMART 模式一次建卷最多执行六次。本模块把用户的可用题目（已启用、任一版本由该用户创建）
+一次性载入为紧凑数组：
+- qids        升序题目 ID
+- types       题型编码（TYPE_CODES）
+- difficulty  难度（未设置为 0）
+- tag_row / tag_ids   题目-标签关联（行下标有序的稀疏表示）
+- kp_row / kp_ids     题目-知识点关联（行下标有序的稀疏表示）
+
+随机题、难题、薄弱知识点抽题都在内存中按掩码采样，建池固定 3 条 SQL。
+候选池放在 LRU + TTL 缓存中，题目导入/编辑/打标签/绑定知识点后由 question_bank_service、
+knowledge_service 调用 invalidate_user / invalidate_question 失效；
+题量超过 QUESTION_POOL_MAX_QUESTIONS 的用户不建池，调用方回退到 sampling 的流式抽样。
+"""
+import random
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.models.question import Question
+from app.models.question_knowledge import QuestionKnowledge
+from app.models.question_version import QuestionVersion
+from app.models.tag import QuestionTag
+
+TYPE_CODES: Dict[str, int] = {"SC": 0, "MC": 1, "FILL": 2}
+_UNKNOWN_TYPE = -1
+
+
+def owned_question_ids_select(user_id: int):
+    """用户的可用题目：已启用，且任一版本由该用户创建"""
+    return select(Question.id).join(
+        QuestionVersion, QuestionVersion.question_id == Question.id
+    ).where(
+        Question.is_active == True,
+        QuestionVersion.created_by == user_id
+    )
+
+
+class QuestionPool:
+    def __init__(self, qids, types, difficulty, tag_pairs, kp_pairs):
+        order = np.argsort(qids, kind="stable")
+        self.qids = np.asarray(qids, dtype=np.int64)[order]
+        self.types = np.asarray(types, dtype=np.int8)[order]
+        self.difficulty = np.asarray(difficulty, dtype=np.int16)[order]
+        self.tag_row, self.tag_ids = self._link(tag_pairs)
+        self.kp_row, self.kp_ids = self._link(kp_pairs)
+
+    def _link(self, pairs):
+        """(question_id, 关联 ID) 列表 → (行下标, 关联 ID)，丢弃不在池内的题目"""
+        if not pairs:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        arr = np.asarray(pairs, dtype=np.int64)
+        rows = self.rows_of(arr[:, 0])
+        keep = rows >= 0
+        order = np.argsort(rows[keep], kind="stable")
+        return rows[keep][order], arr[keep, 1][order]
+
+    @classmethod
+    def load(cls, db: Session, user_id: int, max_questions: Optional[int] = None) -> Optional["QuestionPool"]:
+        """载入用户候选池；题量超过 max_questions 时返回 None"""
+        owned = owned_question_ids_select(user_id)
+        q = db.query(Question.id, Question.type, Question.difficulty).filter(Question.id.in_(owned))
+        if max_questions:
+            q = q.limit(max_questions + 1)
+        rows = q.all()
+        if max_questions and len(rows) > max_questions:
+            return None
+
+        tag_pairs = db.query(QuestionTag.question_id, QuestionTag.tag_id).filter(
+            QuestionTag.question_id.in_(owned)
+        ).all()
+        kp_pairs = db.query(QuestionKnowledge.question_id, QuestionKnowledge.knowledge_id).filter(
+            QuestionKnowledge.question_id.in_(owned)
+        ).all()
+        return cls(
+            [r.id for r in rows],
+            [TYPE_CODES.get(r.type, _UNKNOWN_TYPE) for r in rows],
+            [r.difficulty or 0 for r in rows],
+            [tuple(p) for p in tag_pairs],
+            [tuple(p) for p in kp_pairs],
+        )
+
+    def __len__(self) -> int:
+        return len(self.qids)
+
+    def rows_of(self, qids) -> np.ndarray:
+        """题目 ID → 行下标，不在池内为 -1"""
+        qids = np.asarray(qids, dtype=np.int64)
+        if not len(self.qids):
+            return np.full(len(qids), -1, dtype=np.int64)
+        pos = np.clip(np.searchsorted(self.qids, qids), 0, len(self.qids) - 1)
+        return np.where(self.qids[pos] == qids, pos, -1)
+
+    def mask(
+        self,
+        subject_id: Optional[int] = None,
+        question_types: Optional[Iterable[str]] = None,
+        min_difficulty: Optional[int] = None,
+        exclude_ids: Optional[Iterable[int]] = None,
+        include_ids: Optional[Iterable[int]] = None,
+    ) -> np.ndarray:
+        """按学科标签、题型、最低难度、排除题目、限定题目范围（如知识点子树）生成候选掩码"""
+        m = np.ones(len(self.qids), dtype=bool)
+        if subject_id:
+            m &= self._rows_linked(self.tag_row, self.tag_ids, [subject_id])
+        if question_types:
+            codes = [TYPE_CODES[t] for t in question_types if t in TYPE_CODES]
+            m &= np.isin(self.types, codes)
+        if min_difficulty is not None:
+            m &= self.difficulty >= min_difficulty
+        if exclude_ids is not None:
+            rows = self.rows_of(list(exclude_ids))
+            m[rows[rows >= 0]] = False
+        if include_ids is not None:
+            rows = self.rows_of(include_ids)
+            scope = np.zeros(len(self.qids), dtype=bool)
+            scope[rows[rows >= 0]] = True
+            m &= scope
+        return m
+
+    def knowledge_mask(self, knowledge_ids: Iterable[int]) -> np.ndarray:
+        """绑定了任一指定知识点的题目"""
+        return self._rows_linked(self.kp_row, self.kp_ids, list(knowledge_ids))
+
+    def _rows_linked(self, link_row, link_ids, targets) -> np.ndarray:
+        m = np.zeros(len(self.qids), dtype=bool)
+        m[link_row[np.isin(link_ids, targets)]] = True
+        return m
+
+    def sample(self, mask: np.ndarray, k: int) -> List[int]:
+        """从掩码选中的题目中无放回随机抽取 k 个（随机数来自 random 模块）"""
+        rows = np.flatnonzero(mask)
+        if k <= 0 or not len(rows):
+            return []
+        picks = random.sample(range(len(rows)), min(k, len(rows)))
+        return [int(q) for q in self.qids[rows[picks]]]
+
+
+def _weigh(pool) -> int:
+    return len(pool) if isinstance(pool, QuestionPool) else 1
+
+
+_cache = LRUCache(
+    maxsize=settings.QUESTION_POOL_CACHE_SIZE,
+    ttl=settings.QUESTION_POOL_TTL_SECONDS,
+    max_weight=settings.QUESTION_POOL_MAX_TOTAL,
+    weigh=_weigh,
+)
+_OVERSIZED = object()  # 题量超限的用户也缓存该标记，避免每次建卷都重复探测
+_lock = threading.Lock()
+# 每次失效递增，避免失效前开始的重建覆盖掉失效结果；_epoch 对应 clear()
+_generations: Dict[int, int] = {}
+_epoch = 0
+
+
+def _generation(user_id: int):
+    return _epoch, _generations.get(user_id, 0)
+
+
+def get_pool(db: Session, user_id: int) -> Optional[QuestionPool]:
+    """获取用户候选池；题量超过上限时返回 None（调用方走流式抽样）"""
+    pool = _cache.get(user_id)
+    if pool is None:
+        generation = _generation(user_id)
+        pool = QuestionPool.load(db, user_id, settings.QUESTION_POOL_MAX_QUESTIONS)
+        if pool is None:
+            pool = _OVERSIZED
+        with _lock:
+            if generation == _generation(user_id):
+                _cache.set(user_id, pool)
+    return None if pool is _OVERSIZED else pool
+
+
+def invalidate_user(user_id: Optional[int]) -> None:
+    """用户题库变化后调用（导入、编辑、打标签、绑定知识点）"""
+    if user_id is None:
+        return
+    with _lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        _cache.pop(user_id)
+
+
+def invalidate_question(db: Session, question_id: int) -> None:
+    """按题目失效：该题所有版本的创建者的候选池"""
+    owners = db.query(QuestionVersion.created_by).filter(
+        QuestionVersion.question_id == question_id
+    ).distinct().all()
+    for (owner_id,) in owners:
+        invalidate_user(owner_id)
+
+
+def clear() -> None:
+    global _epoch
+    with _lock:
+        _epoch += 1
+        _cache.clear()
@@ -0,0 +1,103 @@
+"""
+随机抽题采样
+
+原实现使用 ORDER BY RAND() LIMIT n：MySQL 需要把用户的整个候选集物化到临时表
+并全量排序，题库越大越慢（10 万题级别每次建卷都要排序 10 万行）。
+
+本模块改为：
+1. 候选查询只选题目 ID，不排序，通过 yield_per 流式读取（服务端游标，按索引顺序扫描）
+2. 应用端做蓄水池抽样（Algorithm L），内存占用 O(k)，随机数调用次数约 O(k·log(n/k))
+
+筛选条件（创建者、学科标签、题型、难度）仍由调用方拼在查询里，语义不变。
+随机数来自 random 模块，random.seed() 即可复现抽样结果。
+"""
+import math
+import random
+from itertools import islice
+from typing import Generic, Iterable, Iterator, List, Optional, TypeVar
+
+from sqlalchemy.orm import Query
+
+T = TypeVar("T")
+
+# 流式读取每批行数
+STREAM_CHUNK = 2000
+
+_END = object()
+
+
+def _open_unit(rng) -> float:
+    """(0, 1) 区间的均匀随机数，避免 log(0)"""
+    u = rng.random()
+    while u <= 0.0:
+        u = rng.random()
+    return u
+
+
+def reservoir_sample(items: Iterable[T], k: int, rng: Optional[random.Random] = None) -> List[T]:
+    """从任意长度的可迭代对象中等概率抽取 k 个元素（顺序已打乱）
+
+    Args:
+        items: 数据流，只遍历一次
+        k: 抽样数量；数据不足 k 个时返回全部
+        rng: 随机数生成器，默认使用 random 模块的全局实例
+    """
+    rng = rng or random
+    if k <= 0:
+        return []
+    it = iter(items)
+    reservoir = list(islice(it, k))
+    if len(reservoir) == k:
+        # Algorithm L：按几何分布直接跳过不会被选中的元素
+        w = math.exp(math.log(_open_unit(rng)) / k)
+        while True:
+            denom = math.log1p(-w) if w < 1.0 else -math.inf
+            skip = int(math.log(_open_unit(rng)) / denom)
+            item = next(islice(it, skip, None), _END)
+            if item is _END:
+                break
+            reservoir[rng.randrange(k)] = item
+            w *= math.exp(math.log(_open_unit(rng)) / k)
+    rng.shuffle(reservoir)
+    return reservoir
+
+
+def stream_ids(query: Query, chunk: int = STREAM_CHUNK) -> Iterator[int]:
+    """流式读取单列查询的结果（如 db.query(Question.id)...）"""
+    for row in query.yield_per(chunk):
+        yield row[0]
+
+
+def sample_ids(query: Query, k: int, rng: Optional[random.Random] = None) -> List[int]:
+    """从候选 ID 查询中随机抽取 k 个，替代 query.order_by(func.rand()).limit(k)
+
+    query 需只选一列 ID；同一题目可能因多版本重复出现时请先 .distinct()。
+    """
+    if k <= 0:
+        return []
+    return reservoir_sample(stream_ids(query), k, rng)
+
+
+class Reservoir(Generic[T]):
+    """逐个喂入元素的蓄水池（Algorithm R），用于一次流式读取同时维护多个抽样桶"""
+
+    def __init__(self, k: int, rng: Optional[random.Random] = None):
+        self.k = max(0, k)
+        self.rng = rng or random
+        self.seen = 0
+        self.items: List[T] = []
+
+    def offer(self, item: T) -> None:
+        self.seen += 1
+        if len(self.items) < self.k:
+            self.items.append(item)
+        elif self.k:
+            j = self.rng.randrange(self.seen)
+            if j < self.k:
+                self.items[j] = item
+
+    def sample(self) -> List[T]:
+        """抽样结果（顺序已打乱）"""
+        out = list(self.items)
+        self.rng.shuffle(out)
+        return out
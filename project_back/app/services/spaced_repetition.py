@@ -0,0 +1,69 @@
+"""
+错题复习间隔调度（SM-2）
+
+每条错题记录维护 ease_factor（难易系数）、repetitions（连续答对次数）、review_interval（当前间隔天数），
+在练习中答对或答错时更新 next_review_time：
+- 答错（质量 1）：连续答对次数清零，间隔 1 天，难易系数 -0.54（不低于 1.3）
+- 答对（质量 4）：连续答对次数 +1，间隔依次为 1 天、6 天、上次间隔 × 难易系数，难易系数不变
+
+答错的更新不依赖旧间隔，可直接写进错题本的 upsert（wrong_update_values）；
+答对需要旧间隔，先读后写（schedule）。
+"""
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from sqlalchemy import case
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+QUALITY_CORRECT = 4
+QUALITY_WRONG = 1
+FIRST_INTERVAL_DAYS = 1
+SECOND_INTERVAL_DAYS = 6
+MAX_INTERVAL_DAYS = 365
+
+
+class ReviewState(NamedTuple):
+    ease_factor: float
+    repetitions: int
+    review_interval: int
+    next_review_time: Optional[datetime]
+
+
+def _ease_delta(quality: int) -> float:
+    return 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+
+
+def schedule(ease_factor: Optional[float], repetitions: Optional[int], interval: Optional[int],
+             correct: bool, now: datetime) -> ReviewState:
+    """按本次作答计算新的复习状态"""
+    ease = ease_factor or DEFAULT_EASE
+    reps = repetitions or 0
+    quality = QUALITY_CORRECT if correct else QUALITY_WRONG
+    if quality < 3:
+        reps, days = 0, FIRST_INTERVAL_DAYS
+    else:
+        reps += 1
+        if reps == 1:
+            days = FIRST_INTERVAL_DAYS
+        elif reps == 2:
+            days = SECOND_INTERVAL_DAYS
+        else:
+            days = min(MAX_INTERVAL_DAYS, round(max(interval or 1, 1) * ease))
+    ease = max(MIN_EASE, ease + _ease_delta(quality))
+    return ReviewState(ease, reps, days, now + timedelta(days=days))
+
+
+def wrong_update_values(ease_column) -> dict:
+    """答错时的 SQL 更新表达式（用于 upsert 的 SET 子句，next_review_time 由调用方按 now 给出）"""
+    lowered = ease_column + _ease_delta(QUALITY_WRONG)
+    return {
+        "ease_factor": case((lowered < MIN_EASE, MIN_EASE), else_=lowered),
+        "repetitions": 0,
+        "review_interval": FIRST_INTERVAL_DAYS,
+    }
+
+
+def first_wrong_state(now: datetime) -> ReviewState:
+    """首次答错（新建错题记录）时的复习状态"""
+    return schedule(None, 0, 0, False, now)
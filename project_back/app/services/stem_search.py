@@ -0,0 +1,107 @@
+"""
+题干关键字搜索
+
+原先各列表接口用 stem LIKE '%关键字%' 过滤，前导通配符用不上索引，每次都全表扫描 QUESTION_VERSION.stem。
+这里按方言先用全文索引缩小候选集，再用原来的 LIKE 在候选行上精确复核（结果与 LIKE 完全一致）：
+- MySQL：stem 上的 FULLTEXT 索引（WITH PARSER ngram，中文按字切分），MATCH ... AGAINST 短语查询（布尔模式）；
+  关键字短于 ngram_token_size（默认 2）时无法命中索引，退回 LIKE
+- SQLite：FTS5 外部内容表 QUESTION_VERSION_FTS（trigram 分词），由触发器在插入/改题干/删除时同步；
+  关键字少于 3 个字符时退回 LIKE
+- 其它方言或索引尚未创建（未执行迁移）：LIKE
+
+relevance=True 时按相关度排序（MySQL 为 MATCH 得分降序，SQLite 为 bm25 升序），调用方原有的排序作为次序。
+索引是否存在按引擎检测一次并缓存；迁移后需重启进程或调用 invalidate()。
+"""
+import threading
+import weakref
+
+from sqlalchemy import func, literal_column, select, table, column, text
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Query, Session
+
+from app.models.question_version import QuestionVersion
+
+FULLTEXT_INDEX = "ft_qv_stem"
+FTS_TABLE = "QUESTION_VERSION_FTS"
+MYSQL_MIN_CHARS = 2   # innodb ngram_token_size 默认值
+SQLITE_MIN_CHARS = 3  # trigram
+
+_fts = table(FTS_TABLE, column("rowid"), column("stem"))
+_available: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+# SQLite 建表与同步触发器（与迁移 b9d2f4a6c815 一致）
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"stem, content='QUESTION_VERSION', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS qv_fts_ai AFTER INSERT ON QUESTION_VERSION BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, stem) VALUES (new.id, new.stem); END",
+    f"CREATE TRIGGER IF NOT EXISTS qv_fts_ad AFTER DELETE ON QUESTION_VERSION BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, stem) VALUES ('delete', old.id, old.stem); END",
+    f"CREATE TRIGGER IF NOT EXISTS qv_fts_au AFTER UPDATE OF stem ON QUESTION_VERSION BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, stem) VALUES ('delete', old.id, old.stem); "
+    f"INSERT INTO {FTS_TABLE}(rowid, stem) VALUES (new.id, new.stem); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def create_sqlite_index(conn) -> None:
+    """在 SQLite 上创建 FTS5 表与同步触发器并重建索引（create_all 建库的开发/基准环境用；正式环境走迁移）"""
+    for stmt in SQLITE_DDL:
+        conn.execute(text(stmt))
+    invalidate()
+
+
+def invalidate() -> None:
+    with _lock:
+        _available.clear()
+
+
+def backend(db: Session) -> str:
+    """当前数据库可用的搜索方式：mysql / sqlite / like"""
+    engine = db.get_bind()
+    engine = getattr(engine, "engine", engine)
+    with _lock:
+        cached = _available.get(engine)
+    if cached is not None:
+        return cached
+    name = engine.dialect.name
+    if name in ("mysql", "mariadb"):
+        found = db.execute(text(
+            "SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() "
+            "AND TABLE_NAME = 'QUESTION_VERSION' AND INDEX_NAME = :name AND INDEX_TYPE = 'FULLTEXT' LIMIT 1"
+        ), {"name": FULLTEXT_INDEX}).first()
+        result = "mysql" if found else "like"
+    elif name == "sqlite":
+        found = db.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+        ), {"name": FTS_TABLE}).first()
+        result = "sqlite" if found else "like"
+    else:
+        result = "like"
+    with _lock:
+        _available[engine] = result
+    return result
+
+
+def apply(db: Session, q: Query, keyword: str, relevance: bool = False, ilike: bool = False) -> Query:
+    """给按 QuestionVersion 查询的 q 加上题干关键字过滤（可选按相关度排序）"""
+    kw = keyword.strip()
+    pattern = f"%{kw}%"
+    exact = QuestionVersion.stem.ilike(pattern) if ilike else QuestionVersion.stem.like(pattern)
+    mode = backend(db)
+
+    if mode == "mysql" and len(kw) >= MYSQL_MIN_CHARS:
+        score = match(QuestionVersion.stem, against='"' + kw.replace('"', " ") + '"').in_boolean_mode()
+        q = q.filter(score, exact)
+        return q.order_by(score.desc()) if relevance else q
+
+    if mode == "sqlite" and len(kw) >= SQLITE_MIN_CHARS:
+        phrase = '"' + kw.replace('"', '""') + '"'
+        fts_match = literal_column(FTS_TABLE).op("MATCH")(phrase)
+        if relevance:
+            q = q.join(_fts, _fts.c.rowid == QuestionVersion.id).filter(fts_match, exact)
+            return q.order_by(func.bm25(literal_column(FTS_TABLE)))
+        return q.filter(QuestionVersion.id.in_(select(_fts.c.rowid).where(fts_match)), exact)
+
+    return q.filter(exact)
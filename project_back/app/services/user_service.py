@@ -4,6 +4,7 @@ from datetime import datetime
 from sqlalchemy import or_, func
 from sqlalchemy.exc import IntegrityError
 from app.core.exceptions import AppException
+from app.db.pagination import decode_cursor, next_cursor
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.models.role import Role
@@ -108,6 +109,8 @@ def list_users_simple(
     limit: int = 20,
     account: str | None = None,
     email: str | None = None,
+    after: str | None = None,   # 🆕 游标：上一页返回的 next_cursor（传入时忽略 skip）
+    with_total: bool = True,    # 🆕 为 False 时不统计总数
 ):
     limit = max(1, min(int(limit), 100))
     skip = max(0, int(skip))
@@ -119,7 +122,7 @@ def list_users_simple(
         filters.append(User.email.like(f"%{email}%"))
 
     # 正确统计总数
-    total = db.query(func.count(User.id)).filter(*filters).scalar() or 0
+    total = (db.query(func.count(User.id)).filter(*filters).scalar() or 0) if with_total else None
 
     # 取每个用户的最小 role_id 作为主角色
     min_role_sq = (
@@ -139,13 +142,18 @@ def list_users_simple(
         .outerjoin(Role, Role.id == min_role_sq.c.role_id)
         .filter(*filters)
         .order_by(User.id.desc())
-        .offset(skip)
-        .limit(limit)
     )
-
-    rows = q.all()
+    # 🚀 优化：游标分页按 User.id 从上一页最后一个用户之后继续，不再 OFFSET 扫描
+    if after:
+        (last_id,) = decode_cursor(after, (int,))
+        q = q.filter(User.id < last_id)
+    else:
+        q = q.offset(skip)
+
+    rows = q.limit(limit + 1).all()
+    cursor = next_cursor(rows, limit, lambda r: [r.id])
     items = [UserSimple(id=r.id, account=r.account, status=r.status or "", role=r.role) for r in rows]
-    return {"total": total, "items": items}
+    return {"total": total, "items": items, "next_cursor": cursor}
 
 
 def update_user(db: Session, user_id: int, payload) -> User:
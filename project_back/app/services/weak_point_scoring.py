@@ -0,0 +1,175 @@
+"""
+薄弱知识点评分引擎（向量化版本）
+
+原实现对每个知识点及其每个祖先分别调用 get_direct_error_weight 并逐个查询
+KnowledgePoint，错题较多时一次建卷会产生上千条 SQL。
+
+本模块改为：
+1. 直接权重读取增量维护的用户画像 USER_KP_WEAKNESS（weakness_profile），一条按主键前缀的查询；
+   rank_weak_points_from_errors 保留按错题本逐行计算（ErrorBook × QuestionKnowledge）的版本
+2. 知识点层级取自进程内知识点树索引（knowledge_tree），无需查库
+3. 用 NumPy 批量计算 时间衰减 → 直接权重 → 祖先继承(0.6^距离) → 深度系数
+
+每次只需一条 SQL，读取的行数与知识点数相关，与错题本大小无关。
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import exists, literal
+from sqlalchemy.orm import Session
+
+from app.core.timezone import now as get_now
+from app.models.error_book import ErrorBook
+from app.models.question_knowledge import QuestionKnowledge
+from app.models.tag import QuestionTag
+from app.services import knowledge_tree, weakness_profile
+
+# 时间衰减：y = DECAY_MIN + DECAY_RANGE × e^(-DECAY_RATE × days)，1 小时内取最大值
+DECAY_MIN = 0.6
+DECAY_RANGE = 2.0
+DECAY_RATE = 0.12
+# 祖先继承：祖先直接权重 × INHERIT_BASE^距离，最多向上 MAX_ANCESTOR_DISTANCE 层
+INHERIT_BASE = 0.6
+MAX_ANCESTOR_DISTANCE = 10
+# 深度系数：1.0 + depth × DEPTH_STEP
+DEPTH_STEP = 0.3
+# 默认返回的薄弱知识点数量
+TOP_KP_LIMIT = 10
+
+
+def time_decay(last_wrong_times: List[Optional[datetime]], now: Optional[datetime] = None) -> np.ndarray:
+    """批量计算时间衰减系数，与 calculate_time_decay_smooth 逐元素等价"""
+    now = now or get_now()
+    ts = np.array(last_wrong_times, dtype="datetime64[us]")
+    seconds = (np.datetime64(now, "us") - ts) / np.timedelta64(1, "s")
+    days = np.floor(seconds / 86400.0)
+
+    coeff = DECAY_MIN + DECAY_RANGE * np.exp(-DECAY_RATE * np.nan_to_num(days))
+    coeff = np.where(seconds < 3600, DECAY_MIN + DECAY_RANGE, coeff)  # 1 小时内权重最高
+    return np.where(np.isnan(seconds), 1.0, coeff)                      # 无时间记录按 1.0
+
+
+def load_error_rows(db: Session, user_id: int, subject_id: Optional[int] = None):
+    """一次查询取出用户未掌握错题与知识点的关联行
+
+    Returns:
+        (knowledge_ids, contributions, in_subject)
+        contributions = 错误次数 × 时间衰减；in_subject 标记该错题是否属于指定学科
+    """
+    if subject_id:
+        in_subject = exists().where(
+            (QuestionTag.question_id == ErrorBook.question_id) &
+            (QuestionTag.tag_id == subject_id)
+        )
+    else:
+        in_subject = literal(True)
+
+    rows = db.query(
+        QuestionKnowledge.knowledge_id,
+        ErrorBook.wrong_count,
+        ErrorBook.last_wrong_time,
+        in_subject.label("in_subject"),
+    ).join(
+        QuestionKnowledge, QuestionKnowledge.question_id == ErrorBook.question_id
+    ).filter(
+        ErrorBook.user_id == user_id,
+        ErrorBook.mastered == False
+    ).all()
+
+    if not rows:
+        empty = np.zeros(0)
+        return empty.astype(np.int64), empty, empty.astype(bool)
+
+    kp_ids = np.fromiter((r.knowledge_id for r in rows), dtype=np.int64, count=len(rows))
+    counts = np.fromiter((r.wrong_count or 0 for r in rows), dtype=np.float64, count=len(rows))
+    decay = time_decay([r.last_wrong_time for r in rows])
+    flags = np.fromiter((bool(r.in_subject) for r in rows), dtype=bool, count=len(rows))
+    return kp_ids, counts * decay, flags
+
+
+def rank_weak_points(
+    db: Session,
+    user_id: int,
+    subject_id: Optional[int] = None,
+    limit: int = TOP_KP_LIMIT,
+) -> List[Dict]:
+    """计算用户薄弱知识点排名
+
+    综合权重 = (直接权重 + Σ 祖先直接权重 × 0.6^距离) × 深度系数
+
+    🚀 优化：直接权重读取物化的用户画像（weakness_profile，按主键前缀一次查询），
+    不再扫描整个错题本；衰减在读取时计算。
+
+    Returns:
+        List[Dict]: [{'kp_id', 'weight', 'level'}]，按权重降序，最多 limit 个
+    """
+    kp_ids, direct, seeds = weakness_profile.load_profile(db, user_id, subject_id)
+    return _rank(db, kp_ids, direct, seeds, limit)
+
+
+def rank_weak_points_from_errors(
+    db: Session,
+    user_id: int,
+    subject_id: Optional[int] = None,
+    limit: int = TOP_KP_LIMIT,
+) -> List[Dict]:
+    """按错题本逐行计算的排名（不使用画像），用于核对画像与基准对比"""
+    row_kps, contrib, in_subject = load_error_rows(db, user_id, subject_id)
+    return _rank(db, row_kps, contrib, row_kps[in_subject], limit)
+
+
+def _rank(db: Session, row_kps: np.ndarray, contrib: np.ndarray, seed_kps: np.ndarray, limit: int) -> List[Dict]:
+    """row_kps/contrib：知识点的直接权重贡献（同一知识点可出现多次）；seed_kps：候选知识点（与其祖先一起参与排名）"""
+    if not len(row_kps):
+        return []
+
+    tree = knowledge_tree.get_tree(db)
+    ids, parent, depth = tree.ids, tree.parent, tree.depth
+    if not len(ids):
+        return []
+
+    # 1. 直接权重：按知识点下标聚合（错题关联的知识点不存在时忽略）
+    pos = np.clip(np.searchsorted(ids, row_kps), 0, len(ids) - 1)
+    known = ids[pos] == row_kps
+    direct = np.bincount(pos[known], weights=contrib[known], minlength=len(ids))
+
+    # 2. 候选知识点：学科内错题关联的知识点 + 其祖先
+    seed_pos = np.clip(np.searchsorted(ids, seed_kps), 0, len(ids) - 1)
+    seeds = np.unique(seed_pos[ids[seed_pos] == seed_kps])
+    candidates = [seeds]
+    cur = seeds
+    for _ in range(MAX_ANCESTOR_DISTANCE):
+        cur = parent[cur]
+        cur = cur[cur >= 0]
+        if not len(cur):
+            break
+        candidates.append(cur)
+    candidates = np.unique(np.concatenate(candidates))
+
+    # 3. 继承权重：沿父指针逐层上移，整批累加祖先直接权重 × 0.6^距离
+    inherited = direct[candidates].copy()
+    cur = parent[candidates]
+    for distance in range(1, MAX_ANCESTOR_DISTANCE + 1):
+        alive = cur >= 0
+        if not alive.any():
+            break
+        inherited[alive] += direct[cur[alive]] * (INHERIT_BASE ** distance)
+        cur = np.where(alive, parent[np.where(alive, cur, 0)], -1)
+
+    # 4. 深度系数（未设置深度的知识点不参与）
+    cand_depth = depth[candidates]
+    has_depth = ~np.isnan(cand_depth)
+    final = inherited * (1.0 + np.nan_to_num(cand_depth) * DEPTH_STEP)
+    keep = has_depth & (final > 0)
+    if not keep.any():
+        return []
+
+    kept_idx = candidates[keep]
+    kept_weight = final[keep]
+    kept_depth = cand_depth[keep].astype(np.int64)
+    order = np.argsort(-kept_weight, kind="stable")[:limit]
+    return [
+        {"kp_id": int(ids[kept_idx[i]]), "weight": float(kept_weight[i]), "level": int(kept_depth[i])}
+        for i in order
+    ]
@@ -0,0 +1,259 @@
+"""
+用户薄弱知识点画像（USER_KP_WEAKNESS）
+
+weak_point_scoring 原先每次建卷都要扫描用户全部未掌握错题 × 题目-知识点关联，再逐行计算时间衰减，
+错题本越大越慢。本模块把“直接权重”物化为按 (用户, 学科, 知识点) 的一行，随错题本变化增量维护：
+- 答错（upsert_wrong）、标记掌握/未掌握（toggle_mastered）、删除错题（delete_record）时，
+  先取该错题的旧状态，再按 新贡献 - 旧贡献 原子累加到相关知识点行（一条多行 upsert）
+- 读取时只按主键前缀取用户的画像行，行数与知识点数相关，与错题历史长度无关
+
+时间衰减 y = DECAY_MIN + DECAY_RANGE × e^(-DECAY_RATE × 天数) 拆为两部分：
+- wrong_count：错误次数之和，对应不衰减的 DECAY_MIN 部分
+- direct_weight：Σ 错误次数 × e^(-DECAY_RATE × 天数)，数值按 last_update 所在周期（PERIOD_DAYS 天）的起点计，
+  读取时再乘以从周期起点到当前时间的衰减（惰性衰减）；写入跨周期时用 CASE 把旧值折算到当前周期，
+  CASE 各分支为绑定参数，不依赖数据库的指数/日期函数
+与原逐行计算相比，天数按连续值而非取整计算。
+
+题目的知识点绑定或学科标签变化时，由 refresh_question 重建相关用户的画像。
+"""
+import math
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, case, insert
+from sqlalchemy.orm import Session
+
+from app.core.timezone import now as get_now
+from app.db.upsert import build_upsert
+from app.models.error_book import ErrorBook
+from app.models.question_knowledge import QuestionKnowledge
+from app.models.tag import QuestionTag, Tag
+from app.models.user_kp_weakness import UserKpWeakness
+from app.services import weak_point_scoring as scoring
+
+ALL_SUBJECTS = 0
+PERIOD_DAYS = 30
+MAX_CARRY_PERIODS = 8  # 超过 8 个周期未更新的衰减部分已小于 e^-28，折算为 0
+_ANCHOR = datetime(2024, 1, 1)
+_PERIOD = timedelta(days=PERIOD_DAYS)
+_CHUNK = 1000
+
+ErrorState = namedtuple("ErrorState", "wrong_count last_wrong_time mastered")
+Links = Dict[int, Tuple[Tuple[int, ...], Tuple[int, ...]]]  # question_id -> (知识点 ID, 学科标签 ID)
+
+
+def period_start(t: datetime) -> datetime:
+    return _ANCHOR + _PERIOD * ((t - _ANCHOR) // _PERIOD)
+
+
+def _contribution(state: Optional[ErrorState], start: datetime) -> Tuple[int, float]:
+    """一条错题对画像的贡献 (错误次数, 衰减部分)；已掌握或不存在为 0。无时间记录按周期起点计"""
+    if state is None or state.mastered or not state.wrong_count:
+        return 0, 0.0
+    days = ((start - state.last_wrong_time).total_seconds() / 86400) if state.last_wrong_time else 0.0
+    return state.wrong_count, state.wrong_count * math.exp(-scoring.DECAY_RATE * days)
+
+
+def _carry_factor(last_update, start: datetime):
+    """把按旧周期起点计的 direct_weight 折算到当前周期起点"""
+    return case(
+        *[
+            (last_update >= start - _PERIOD * k, math.exp(-scoring.DECAY_RATE * PERIOD_DAYS * k))
+            for k in range(MAX_CARRY_PERIODS + 1)
+        ],
+        else_=0.0,
+    )
+
+
+def _chunks(ids: List[int]):
+    for i in range(0, len(ids), _CHUNK):
+        yield ids[i:i + _CHUNK]
+
+
+def load_states(db: Session, user_id: int, question_ids: Iterable[int], lock: bool = False) -> Dict[int, ErrorState]:
+    """错题的当前状态；lock=True 时对已存在的记录加行锁，与随后的写入串行
+
+    加锁时先普通读取已存在记录的主键，再按主键 SELECT ... FOR UPDATE：直接按 (user_id, question_id)
+    加锁读取时，不存在的组合在 MySQL（REPEATABLE READ）下会加间隙锁，两个事务并发首次答错同一间隙内的题目，
+    随后 upsert 的插入意向锁互相等待而死锁。不存在的记录不加锁，由调用方在写入后处理并发插入（见 upsert_wrong）。
+    """
+    cols = (ErrorBook.question_id, ErrorBook.wrong_count, ErrorBook.last_wrong_time, ErrorBook.mastered)
+    q = db.query(*cols).filter(
+        ErrorBook.user_id == user_id,
+        ErrorBook.question_id.in_(list(question_ids))
+    )
+    if lock:
+        ids = [i for (i,) in q.with_entities(ErrorBook.id).all()]
+        if not ids:
+            return {}
+        q = db.query(*cols).filter(ErrorBook.id.in_(ids)).with_for_update()
+    return {r.question_id: ErrorState(r.wrong_count or 0, r.last_wrong_time, bool(r.mastered)) for r in q.all()}
+
+
+def load_links(db: Session, question_ids: Iterable[int]) -> Links:
+    """题目绑定的知识点与学科标签（两条查询，ID 较多时分批）；未绑定的题目对应空元组"""
+    question_ids = list(question_ids)
+    kps, subjects = defaultdict(list), defaultdict(list)
+    for chunk in _chunks(question_ids):
+        for qid, kid in db.query(QuestionKnowledge.question_id, QuestionKnowledge.knowledge_id).filter(
+            QuestionKnowledge.question_id.in_(chunk)
+        ):
+            kps[qid].append(kid)
+        for qid, tid in db.query(QuestionTag.question_id, QuestionTag.tag_id).join(
+            Tag, Tag.id == QuestionTag.tag_id
+        ).filter(
+            QuestionTag.question_id.in_(chunk),
+            Tag.type == "SUBJECT"
+        ):
+            subjects[qid].append(tid)
+    return {qid: (tuple(kps.get(qid, ())), tuple(subjects.get(qid, ()))) for qid in question_ids}
+
+
+def apply_changes(
+    db: Session,
+    user_id: int,
+    changes: Dict[int, Tuple[Optional[ErrorState], Optional[ErrorState]]],
+    now: Optional[datetime] = None,
+    links: Optional[Links] = None,
+) -> None:
+    """按错题状态变化 {question_id: (旧状态, 新状态)} 累加画像；links 缺失的题目现查。不提交事务"""
+    now = now or get_now()
+    start = period_start(now)
+    missing = [qid for qid in changes if links is None or qid not in links]
+    if missing:
+        links = {**(links or {}), **load_links(db, missing)}
+
+    deltas: Dict[Tuple[int, int], List] = defaultdict(lambda: [0, 0.0])
+    for qid, (old, new) in changes.items():
+        w_old, x_old = _contribution(old, start)
+        w_new, x_new = _contribution(new, start)
+        if w_new == w_old and x_new == x_old:
+            continue
+        kps, subjects = links.get(qid, ((), ()))
+        for subject_id in (ALL_SUBJECTS, *subjects):
+            for kid in kps:
+                d = deltas[(subject_id, kid)]
+                d[0] += w_new - w_old
+                d[1] += x_new - x_old
+    if not deltas:
+        return
+
+    rows = [
+        {"user_id": user_id, "subject_id": sid, "knowledge_id": kid, "wrong_count": w, "direct_weight": x, "last_update": now}
+        for (sid, kid), (w, x) in deltas.items()
+    ]
+
+    def make_set(incoming):
+        return [
+            ("direct_weight", UserKpWeakness.direct_weight * _carry_factor(UserKpWeakness.last_update, start) + incoming.direct_weight),
+            ("wrong_count", UserKpWeakness.wrong_count + incoming.wrong_count),
+            ("last_update", incoming.last_update),  # 最后赋值：上面的折算需读取旧的 last_update
+        ]
+
+    stmt = build_upsert(db, UserKpWeakness, rows, ("user_id", "subject_id", "knowledge_id"), make_set)
+    if stmt is not None:
+        db.execute(stmt)
+        return
+
+    # 不支持 upsert 的方言：已有行原子累加，其余插入
+    existing = {
+        (r.subject_id, r.knowledge_id) for r in db.query(UserKpWeakness.subject_id, UserKpWeakness.knowledge_id).filter(
+            UserKpWeakness.user_id == user_id
+        ).all()
+    }
+    updates = [
+        dict(r, b_sid=r["subject_id"], b_kid=r["knowledge_id"])
+        for r in rows if (r["subject_id"], r["knowledge_id"]) in existing
+    ]
+    if updates:
+        t = UserKpWeakness.__table__
+        db.execute(
+            t.update().where(
+                t.c.user_id == user_id, t.c.subject_id == bindparam("b_sid"), t.c.knowledge_id == bindparam("b_kid")
+            ).values(
+                direct_weight=t.c.direct_weight * _carry_factor(t.c.last_update, start) + bindparam("direct_weight"),
+                wrong_count=t.c.wrong_count + bindparam("wrong_count"),
+                last_update=bindparam("last_update"),
+            ),
+            updates,
+        )
+    inserts = [r for r in rows if (r["subject_id"], r["knowledge_id"]) not in existing]
+    if inserts:
+        db.execute(insert(UserKpWeakness), inserts)
+
+
+def rebuild_users(db: Session, user_ids: Iterable[int], now: Optional[datetime] = None) -> None:
+    """按错题本重新计算用户画像（题目知识点/学科变化后、数据修复时使用）。不提交事务"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    now = now or get_now()
+    start = period_start(now)
+    db.query(UserKpWeakness).filter(UserKpWeakness.user_id.in_(user_ids)).delete(synchronize_session=False)
+
+    errors = db.query(
+        ErrorBook.user_id, ErrorBook.question_id, ErrorBook.wrong_count, ErrorBook.last_wrong_time
+    ).filter(
+        ErrorBook.user_id.in_(user_ids),
+        ErrorBook.mastered == False
+    ).all()
+    links = load_links(db, {r.question_id for r in errors})
+
+    totals: Dict[Tuple[int, int, int], List] = defaultdict(lambda: [0, 0.0])
+    for r in errors:
+        w, x = _contribution(ErrorState(r.wrong_count or 0, r.last_wrong_time, False), start)
+        kps, subjects = links.get(r.question_id, ((), ()))
+        for subject_id in (ALL_SUBJECTS, *subjects):
+            for kid in kps:
+                t = totals[(r.user_id, subject_id, kid)]
+                t[0] += w
+                t[1] += x
+    rows = [
+        {"user_id": uid, "subject_id": sid, "knowledge_id": kid, "wrong_count": w, "direct_weight": x, "last_update": now}
+        for (uid, sid, kid), (w, x) in totals.items() if w
+    ]
+    for i in range(0, len(rows), _CHUNK):
+        db.execute(insert(UserKpWeakness), rows[i:i + _CHUNK])
+
+
+def refresh_question(db: Session, question_id: int) -> None:
+    """题目的知识点绑定或学科标签变化后调用：重建错题本中有该题的用户画像并提交"""
+    user_ids = [uid for (uid,) in db.query(ErrorBook.user_id).filter(ErrorBook.question_id == question_id).distinct()]
+    if user_ids:
+        rebuild_users(db, user_ids)
+        db.commit()
+
+
+def load_profile(db: Session, user_id: int, subject_id: Optional[int] = None, now: Optional[datetime] = None):
+    """读取用户画像并计算当前直接权重（一条按主键前缀的查询）
+
+    Returns:
+        (knowledge_ids, direct_weights, seed_knowledge_ids)
+        seed_knowledge_ids 为指定学科内有未掌握错题的知识点；未指定学科时为全部有错题的知识点
+    """
+    now = now or get_now()
+    subjects = {ALL_SUBJECTS, int(subject_id)} if subject_id else {ALL_SUBJECTS}
+    rows = db.query(
+        UserKpWeakness.subject_id, UserKpWeakness.knowledge_id, UserKpWeakness.wrong_count,
+        UserKpWeakness.direct_weight, UserKpWeakness.last_update,
+    ).filter(
+        UserKpWeakness.user_id == user_id,
+        UserKpWeakness.subject_id.in_(subjects),
+        UserKpWeakness.wrong_count > 0
+    ).all()
+
+    everything = [r for r in rows if r.subject_id == ALL_SUBJECTS]
+    kp_ids = np.fromiter((r.knowledge_id for r in everything), dtype=np.int64, count=len(everything))
+    counts = np.fromiter((r.wrong_count for r in everything), dtype=np.float64, count=len(everything))
+    decaying = np.fromiter((r.direct_weight for r in everything), dtype=np.float64, count=len(everything))
+    age_days = np.fromiter(
+        ((now - period_start(r.last_update)).total_seconds() / 86400 for r in everything),
+        dtype=np.float64, count=len(everything),
+    )
+    direct = scoring.DECAY_MIN * counts + scoring.DECAY_RANGE * np.maximum(decaying, 0.0) * np.exp(-scoring.DECAY_RATE * age_days)
+
+    seed_subject = int(subject_id) if subject_id else ALL_SUBJECTS
+    seeds = np.fromiter((r.knowledge_id for r in rows if r.subject_id == seed_subject), dtype=np.int64)
+    return kp_ids, direct, seeds
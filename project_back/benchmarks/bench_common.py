@@ -0,0 +1,220 @@
+"""
+基准测试公共工具
+位置: benchmarks/bench_common.py
+
+- make_engine(): 内存 SQLite 引擎（BIGINT 主键按 INTEGER 建表以支持自增，注册 rand() 函数），建好全部表
+- seed_bank(): 生成一个用户的题库（题目/版本/学科标签/知识点树/题目-知识点绑定/错题本及薄弱知识点画像）
+- seed_answers(): 为用户生成已完成的练习会话及作答记录
+- QueryCounter: 统计一段代码执行的 SQL 条数
+- timed(): 多次运行取耗时统计
+- profile(): 多次运行，逐次统计耗时与 SQL 条数
+
+基准脚本统一从项目根目录运行，例如: python benchmarks/bench_paper_assembly.py
+"""
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import BigInteger, create_engine, event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_bigint(type_, compiler, **kw):
+    # SQLite 只有 INTEGER PRIMARY KEY 才会自增
+    return "INTEGER"
+
+
+from app.db.base import Base
+from app.core.timezone import now as get_now
+from app.models.user import User
+from app.models.tag import Tag, QuestionTag
+from app.models.question import Question
+from app.models.question_version import QuestionVersion
+from app.models.knowledge_point import KnowledgePoint
+from app.models.knowledge_closure import KnowledgeClosure
+from app.models.question_knowledge import QuestionKnowledge
+from app.models.error_book import ErrorBook
+from app.models.paper import Paper
+from app.models.paper_question import PaperQuestion
+from app.models.exam_attempt import ExamAttempt
+from app.models.user_answer import UserAnswer
+from app.models.user_kp_weakness import UserKpWeakness  # noqa: F401
+from app.services import question_import, weakness_profile
+
+
+def make_engine(url: str = "sqlite://"):
+    """创建引擎并建表；内存库使用 StaticPool 以便多个会话共享同一连接"""
+    kwargs = {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}} if url == "sqlite://" else {}
+    engine = create_engine(url, **kwargs)
+
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _register_functions(dbapi_conn, _record):
+            dbapi_conn.create_function("rand", 0, random.random)
+
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def make_session(engine):
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def seed_bank(db, n_questions: int = 1000, n_kps: int = 100, n_errors: int = 200, seed: int = 42):
+    """为一个新用户生成题库，返回 (user, subject_tag)"""
+    rnd = random.Random(seed)
+    user = User(account=f"bench_{seed}_{rnd.random():.8f}", nickname="bench")
+    db.add(user)
+    db.flush()
+    subjects = [Tag(name=name, type="SUBJECT") for name in ("数学", "英语", "物理")]
+    db.add_all(subjects)
+    db.flush()
+
+    kps = []
+    for i in range(n_kps):
+        parent = rnd.choice(kps) if kps and rnd.random() < 0.85 else None
+        kp = KnowledgePoint(
+            name=f"kp{i}", parent_id=parent.id if parent else None,
+            depth=(parent.depth + 1) if parent else 0, created_by=user.id,
+        )
+        db.add(kp)
+        db.flush()
+        db.add(KnowledgeClosure(ancestor_id=kp.id, descendant_id=kp.id, distance=0))
+        if parent:
+            for row in db.query(KnowledgeClosure).filter(KnowledgeClosure.descendant_id == parent.id).all():
+                db.add(KnowledgeClosure(ancestor_id=row.ancestor_id, descendant_id=kp.id, distance=row.distance + 1))
+        kps.append(kp)
+
+    options = [{"key": k, "text": f"选项{k}"} for k in "ABCD"]
+    questions = []
+    for i in range(n_questions):
+        qtype = rnd.choice(["SC", "MC", "FILL"])
+        q = Question(type=qtype, difficulty=rnd.randint(1, 5), is_active=True)
+        db.add(q)
+        db.flush()
+        answer = {"SC": rnd.choice("ABCD"), "MC": "".join(sorted(rnd.sample("ABCD", 2))), "FILL": "北京;beijing"}[qtype]
+        qv = QuestionVersion(
+            question_id=q.id, stem=f"基准题目 {i}", stem_hash=question_import.stem_hash(f"基准题目 {i}"),
+            options=None if qtype == "FILL" else options,
+            correct_answer=answer, explanation="解析", created_by=user.id, is_active=True,
+        )
+        db.add(qv)
+        db.flush()
+        q.current_version_id = qv.id
+        db.add(QuestionTag(question_id=q.id, tag_id=rnd.choice(subjects).id))
+        for kp in rnd.sample(kps, min(len(kps), rnd.randint(1, 2))):
+            db.add(QuestionKnowledge(question_id=q.id, knowledge_id=kp.id))
+        questions.append(q)
+
+    now = get_now()
+    for q in rnd.sample(questions, min(n_errors, len(questions))):
+        t = now - timedelta(seconds=rnd.randint(0, 30 * 86400))
+        db.add(ErrorBook(
+            user_id=user.id, question_id=q.id, wrong_count=rnd.randint(1, 5),
+            first_wrong_time=t, last_wrong_time=t, next_review_time=t, mastered=rnd.random() < 0.2,
+        ))
+    db.flush()
+    weakness_profile.rebuild_users(db, [user.id])
+    db.commit()
+    return user, subjects[0]
+
+
+def seed_answers(db, user, n_answers: int, per_attempt: int = 20, seed: int = 42) -> int:
+    """为用户生成约 n_answers 条历史作答（每 per_attempt 题一个已完成的练习会话），返回会话数"""
+    rnd = random.Random(seed)
+    qids = [qid for (qid,) in db.query(QuestionVersion.question_id).filter(QuestionVersion.created_by == user.id).all()]
+    if not qids or n_answers <= 0:
+        return 0
+    now = get_now()
+    n_attempts = 0
+    for start in range(0, n_answers, per_attempt):
+        picked = rnd.sample(qids, min(per_attempt, n_answers - start, len(qids)))
+        t = now - timedelta(seconds=rnd.randint(0, 30 * 86400))
+        paper = Paper(title=f"bench-{seed}-{start}", is_public=False, status="PRACTICE", created_by=user.id)
+        db.add(paper)
+        db.flush()
+        answers = [(qid, rnd.random() < 0.6) for qid in picked]
+        attempt = ExamAttempt(
+            user_id=user.id, paper_id=paper.id, status="FINISHED", start_time=t, submit_time=t,
+            question_count=len(picked), answered_count=len(picked), correct_count=sum(ok for _, ok in answers),
+        )
+        db.add(attempt)
+        db.flush()
+        db.bulk_insert_mappings(PaperQuestion, [
+            {"paper_id": paper.id, "question_id": qid, "seq": i} for i, qid in enumerate(picked, start=1)
+        ])
+        db.bulk_insert_mappings(UserAnswer, [
+            {"attempt_id": attempt.id, "user_id": user.id, "question_id": qid, "paper_id": paper.id,
+             "user_answer": "A" if ok else "Z", "is_correct": ok, "first_flag": True, "answer_time": t}
+            for qid, ok in answers
+        ])
+        n_attempts += 1
+    db.commit()
+    return n_attempts
+
+
+class QueryCounter:
+    """with QueryCounter(engine) as qc: ...  → qc.count 为期间执行的 SQL 条数"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def timed(fn, repeat: int = 20, warmup: int = 2) -> dict:
+    """运行 fn 多次，返回耗时统计（毫秒）"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+    }
+
+
+def profile(engine, fn, repeat: int = 20, warmup: int = 2) -> dict:
+    """运行 fn 多次，返回耗时（毫秒）与每次调用 SQL 条数的统计；fn 可接收调用序号"""
+    for i in range(warmup):
+        fn(i)
+    samples, queries = [], []
+    for i in range(warmup, warmup + repeat):
+        with QueryCounter(engine) as qc:
+            t0 = time.perf_counter()
+            fn(i)
+            samples.append((time.perf_counter() - t0) * 1000)
+        queries.append(qc.count)
+    samples.sort()
+    return {
+        "n": repeat,
+        "queries_mean": round(statistics.mean(queries), 2),
+        "queries_max": max(queries),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "max_ms": round(samples[-1], 3),
+    }
@@ -0,0 +1,207 @@
+"""
+Excel 导入基准
+位置: benchmarks/bench_excel_import.py
+用法: python benchmarks/bench_excel_import.py [--rows 1000 10000 100000] [--workers 4] [--legacy-max 200]
+          [--write-rows 1000 10000] [--url sqlite:///bench.db]
+
+按行数生成导入模板格式的工作簿（固定随机种子，约 5% 的行故意不合法）：
+1. 读取 + 校验的吞吐（行/秒，不含写库）：只读模式下逐格 ws.cell 随机访问（旧实现） vs iter_rows 流式读取
+   （可选进程池并行校验）。旧实现随行数平方增长（1000 行已需十几分钟），超过 --legacy-max 行时跳过。
+   两种实现的校验结果必须逐行一致。同样的数据另以导出适配器写成 csv / jsonl，对比标准库流式解析的吞吐，
+   校验结果同样须与工作簿一致。
+2. 写库（--write-rows）：逐行查重 + 插入 + 提交（旧实现） vs ImportWriter 按批 stem_hash 索引查重 + 多行写入，
+   对比 SQL 条数与行/秒，并校验两者的导入结果一致。
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from bench_common import QueryCounter, make_engine, make_session
+
+from openpyxl import Workbook, load_workbook
+
+from app.models.question import Question
+from app.models.question_version import QuestionVersion
+from app.models.tag import Tag, QuestionTag
+from app.models.user import User
+from app.schemas.question_bank import ImportQuestionsResult, ImportErrorItem
+from app.services import question_formats, question_import
+
+
+def make_rows(n_rows: int, seed: int = 42, bad_ratio: float = 0.05):
+    """按导入模板列顺序生成数据行（约 bad_ratio 的行不合法，约 1% 的空行）"""
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n_rows):
+        qtype = rnd.choice(["单选", "多选", "填空"])
+        options = [f"选项{k}-{i}" for k in "ABCD"] if qtype != "填空" else ["", "", "", ""]
+        answer = {"单选": rnd.choice("ABCD"), "多选": "".join(rnd.sample("ABCD", 2)), "填空": "北京;beijing"}[qtype]
+        if rnd.random() < bad_ratio:
+            answer = "E"  # 不合法的答案（填空题除外）
+            qtype = rnd.choice(["单选", "多选"])
+        rows.append([f"基准导入题目 {i}：下列说法正确的是？", *options, qtype, answer, "解析", "数学", "高中"])
+        if rnd.random() < 0.01:
+            rows.append([""] * len(question_import.HEADER_EXPECT))  # 空行
+    return rows
+
+
+def write_workbook(path: str, n_rows: int, seed: int = 42, bad_ratio: float = 0.05) -> None:
+    wb = Workbook()  # 非 write_only：保存时写入 dimension，旧实现依赖 ws.max_row
+    ws = wb.active
+    ws.append(question_import.HEADER_EXPECT)
+    for row in make_rows(n_rows, seed, bad_ratio):
+        ws.append([v or None for v in row])
+    wb.save(path)
+
+
+def write_text(path: str, fmt: str, n_rows: int, seed: int = 42) -> None:
+    """用导出适配器写出同样的数据（csv 行号与工作簿一致；jsonl 行号为文件行号，比工作簿小 1）"""
+    chunks = question_formats.csv_chunks if fmt == "csv" else question_formats.jsonl_chunks
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for chunk in chunks(make_rows(n_rows, seed)):
+            f.write(chunk)
+
+
+def legacy_parse(path: str):
+    """旧实现的读取方式：只读模式下 ws.cell(row, col) 逐格取值"""
+    wb = load_workbook(path, read_only=True, data_only=True)
+    ws = wb.active
+
+    def cell_str(row: int, col: int) -> str:
+        return str(ws.cell(row=row, column=col).value or "").strip()
+
+    out = []
+    for r in range(2, ws.max_row + 1):
+        if all(cell_str(r, c) == "" for c in range(1, 6)):
+            continue
+        out.append(question_import.validate_row(r, [cell_str(r, c) for c in range(1, len(question_import.HEADER_EXPECT) + 1)]))
+    wb.close()
+    return out
+
+
+def streaming_parse(path: str, workers: int, fmt: str = "xlsx"):
+    rows, _ = question_formats.open_rows(path, fmt)
+    records = question_import.iter_validated(rows, workers=workers)
+    if fmt == "jsonl":
+        return [r._replace(row=r.row + 1) for r in records]  # 对齐到工作簿行号以便比对
+    return list(records)
+
+
+def legacy_write(db, records, user_id):
+    """旧实现的写库方式：每行查重、插入题目/版本、回填当前版本、插入标签并提交"""
+    tag_map = {t.name.strip(): t for t in db.query(Tag).filter(Tag.type.in_(["SUBJECT", "LEVEL"])).all()}
+    result = ImportQuestionsResult(total_rows=0, success=0, failed=0, errors=[])
+    for rec in records:
+        result.total_rows += 1
+        if isinstance(rec, question_import.RowError):
+            result.failed += 1
+            result.errors.append(ImportErrorItem(row=rec.row, reason=rec.reason))
+            continue
+        existing = db.query(QuestionVersion).join(Question, QuestionVersion.question_id == Question.id).filter(
+            QuestionVersion.stem == rec.stem, QuestionVersion.created_by == user_id,
+            Question.is_active == True, QuestionVersion.is_active == 1,
+        ).first()
+        if existing:
+            result.failed += 1
+            result.errors.append(ImportErrorItem(row=rec.row, reason=f"题目重复：您已创建过相同题干的题目（题目ID: {existing.question_id}）"))
+            continue
+        q = Question(type=rec.qtype, is_active=True)
+        db.add(q); db.flush()
+        qv = QuestionVersion(question_id=q.id, version_no=1, is_active=1, stem=rec.stem, options=rec.options,
+                             explanation=rec.analysis, correct_answer=rec.correct, created_by=user_id)
+        db.add(qv); db.flush()
+        q.current_version_id = qv.id
+        for name in (rec.subject_name, rec.level_name):
+            tag = tag_map.get(name.strip()) if name else None
+            if tag:
+                db.add(QuestionTag(question_id=q.id, tag_id=tag.id))
+        db.commit()
+        result.success += 1
+    return result
+
+
+def batch_write(db, records, user_id):
+    return question_import.import_records(db, records, user_id)
+
+
+def bench_write(url: str, n: int) -> None:
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        write_workbook(path, n)
+        records = list(question_import.iter_validated(question_import.iter_excel_rows(path)))
+        baseline = None
+        for name, fn in (("legacy", legacy_write), ("batch", batch_write)):
+            engine = make_engine(url)
+            db = make_session(engine)
+            user = User(account=f"import_{name}_{n}", nickname="bench")
+            db.add(user)
+            db.add_all([Tag(name="数学", type="SUBJECT"), Tag(name="高中", type="LEVEL")])
+            db.commit()
+            # 第二遍导入同一文件：全部命中查重
+            with QueryCounter(engine) as qc:
+                t0 = time.perf_counter()
+                result = fn(db, records, user.id)
+                again = fn(db, records, user.id)
+                secs = time.perf_counter() - t0
+            print(f"{n:>8} {name:>12} {secs:>8.2f} {2 * len(records) / secs:>10.0f} {qc.count:>9} {result.success:>8} {again.failed:>12}")
+            summary = (result.success, [e.reason[:4] for e in result.errors], again.success, again.failed)
+            if baseline is None:
+                baseline = summary
+            elif summary != baseline:
+                raise SystemExit(f"{name}: 导入结果与 legacy 不一致")
+            engine.dispose()
+    finally:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--legacy-max", type=int, default=200)
+    parser.add_argument("--write-rows", type=int, nargs="*", default=[1000, 10000])
+    parser.add_argument("--url", default="sqlite://", help="写库基准使用的数据库（每种实现各建一次表）")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'impl':>12} {'secs':>8} {'rows/s':>10} {'errors':>7}")
+    for n in args.rows:
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        text_paths = {fmt: path[:-len(".xlsx")] + f".{fmt}" for fmt in ("csv", "jsonl")}
+        try:
+            write_workbook(path, n)
+            for fmt, p in text_paths.items():
+                write_text(p, fmt, n)
+            impls = [("stream", lambda: streaming_parse(path, 0)),
+                     (f"stream x{args.workers}", lambda: streaming_parse(path, args.workers)),
+                     ("csv", lambda: streaming_parse(text_paths["csv"], 0, "csv")),
+                     ("jsonl", lambda: streaming_parse(text_paths["jsonl"], 0, "jsonl"))]
+            if n <= args.legacy_max:
+                impls.insert(0, ("legacy", lambda: legacy_parse(path)))
+            baseline = None
+            for name, fn in impls:
+                t0 = time.perf_counter()
+                records = fn()
+                secs = time.perf_counter() - t0
+                n_err = sum(isinstance(r, question_import.RowError) for r in records)
+                print(f"{n:>8} {name:>12} {secs:>8.2f} {len(records) / secs:>10.0f} {n_err:>7}")
+                if baseline is None:
+                    baseline = records
+                elif records != baseline:
+                    raise SystemExit(f"{name}: 校验结果与 {impls[0][0]} 不一致")
+        finally:
+            for p in (path, *text_paths.values()):
+                if os.path.exists(p):
+                    os.remove(p)
+
+    if args.write_rows:
+        print(f"\n{'rows':>8} {'writer':>12} {'secs':>8} {'rows/s':>10} {'queries':>9} {'success':>8} {'rerun_failed':>12}")
+        for n in args.write_rows:
+            bench_write(args.url, n)
+
+
+if __name__ == "__main__":
+    main()
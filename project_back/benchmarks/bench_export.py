@@ -0,0 +1,82 @@
+"""
+题库导出基准：按 GET /questions 逐页翻取（每页 100 条，每页 count() + 标签查询） vs 流式导出（question_export）
+位置: benchmarks/bench_export.py
+用法: python benchmarks/bench_export.py [--url sqlite:///bench.db] [--questions 2000 10000 50000] [--formats csv jsonl xlsx]
+
+翻页方式与原接口一致（按 ID 倒序、offset 分页），取到的行同样序列化为 CSV（但没有知识点路径）。
+统计耗时、SQL 条数与 Python 内存峰值（tracemalloc 单独再跑一遍测得）。
+"""
+import argparse
+import time
+import tracemalloc
+
+from bench_common import QueryCounter, make_engine, make_session, seed_bank
+
+from sqlalchemy import select
+
+from app.models.tag import Tag
+from app.services import knowledge_tree, question_bank_service, question_export, question_formats
+
+PAGE_SIZE = 100
+
+
+def paged(db, user_id):
+    """逐页取数并序列化为 CSV（不含知识点路径：原接口不返回）"""
+    names = dict(db.execute(select(Tag.id, Tag.name)).all())
+
+    def rows():
+        page, n = 1, 0
+        while True:
+            total, items, tags, _ = question_bank_service.list_questions_page(db, page=page, size=PAGE_SIZE, user_id=user_id)
+            for r in items:
+                t = tags.get(r.id, {})
+                yield question_formats.export_values(
+                    r.type, r.stem, r.options, r.correct_answer, r.analysis,
+                    names.get(t.get("subject_id")), names.get(t.get("level_id")),
+                )
+            n += len(items)
+            if not items or n >= total:
+                return
+            page += 1
+
+    return sum(len(chunk) for chunk in question_formats.csv_chunks(rows()))
+
+
+def streamed(db, user_id, fmt):
+    size = 0
+    for chunk in question_export.iter_export(user_id, fmt, session_factory=lambda: make_session(db.get_bind())):
+        size += len(chunk)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="sqlite://")
+    parser.add_argument("--questions", type=int, nargs="+", default=[2000, 10000, 50000])
+    parser.add_argument("--formats", nargs="+", default=["csv", "jsonl", "xlsx"])
+    args = parser.parse_args()
+
+    engine = make_engine(args.url)
+    db = make_session(engine)
+
+    print(f"{'questions':>9} {'impl':>10} {'secs':>8} {'queries':>8} {'peak_mb':>8}")
+    for seed, n in enumerate(args.questions, start=1):
+        user, _ = seed_bank(db, n_questions=n, n_kps=100, n_errors=0, seed=seed)
+        knowledge_tree.invalidate()
+        knowledge_tree.get_tree(db)  # 预热知识点树
+        impls = [("paged", lambda: paged(db, user.id))]
+        impls += [(fmt, lambda fmt=fmt: streamed(db, user.id, fmt)) for fmt in args.formats]
+        for name, fn in impls:
+            with QueryCounter(engine) as qc:
+                t0 = time.perf_counter()
+                fn()
+                secs = time.perf_counter() - t0
+            tracemalloc.start()  # 内存峰值单独再跑一遍，避免 tracemalloc 拖慢计时
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{n:>9} {name:>10} {secs:>8.2f} {qc.count:>8} {peak / 2 ** 20:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+判分基准：每次规范化标准答案（旧实现） vs 预编译匹配器（grading.get_matcher）
+位置: benchmarks/bench_grading.py
+用法: python benchmarks/bench_grading.py [--n 200000]
+
+同时校验两种实现在随机答案上的判分结果完全一致。
+"""
+import argparse
+import random
+import time
+
+import bench_common  # noqa: F401  添加项目根目录到 Python 路径
+
+from app.services import grading
+
+
+def _legacy_norm_sc(ans):
+    return (ans or "").strip().upper()
+
+
+def _legacy_norm_mc(ans):
+    return "".join(sorted(set((ans or "").strip().upper())))
+
+
+def _legacy_norm_fill(ans):
+    return (ans or "").strip().lower()
+
+
+def legacy_grade(qtype, correct_answer, user_answer):
+    """旧 submit_answer 中的判分逻辑"""
+    if qtype == "MC":
+        return _legacy_norm_mc(user_answer) == _legacy_norm_mc(correct_answer)
+    if qtype == "FILL":
+        return _legacy_norm_fill(user_answer) in [_legacy_norm_fill(a) for a in correct_answer.split(";")]
+    return _legacy_norm_sc(user_answer) == _legacy_norm_sc(correct_answer)
+
+
+def make_cases(n, seed=7):
+    rnd = random.Random(seed)
+    versions = []
+    for vid in range(1, 501):
+        qtype = rnd.choice(["SC", "MC", "FILL"])
+        correct = {
+            "SC": rnd.choice("ABCD"),
+            "MC": "".join(rnd.sample("ABCD", rnd.randint(2, 4))),
+            "FILL": ";".join(rnd.sample(["北京", "beijing", " Peking ", "BJ", "京"], rnd.randint(1, 3))),
+        }[qtype]
+        versions.append((vid, qtype, correct))
+    cases = []
+    for _ in range(n):
+        vid, qtype, correct = rnd.choice(versions)
+        if qtype == "FILL":
+            answer = rnd.choice(["北京", " BEIJING ", "peking", "上海", "", "bj"])
+        else:
+            answer = "".join(rnd.sample("ABCDabcd ,", rnd.randint(0, 4)))
+            if rnd.random() < 0.4:
+                answer = correct[::-1].lower()
+        cases.append((vid, qtype, correct, answer))
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=200000)
+    args = parser.parse_args()
+
+    cases = make_cases(args.n)
+
+    t0 = time.perf_counter()
+    expected = [legacy_grade(qtype, correct, ans) for _, qtype, correct, ans in cases]
+    legacy_s = time.perf_counter() - t0
+
+    grading.regrade(cases[:1000])  # 预热：编译全部版本的匹配器
+    t0 = time.perf_counter()
+    got = grading.regrade(cases)
+    compiled_s = time.perf_counter() - t0
+
+    matchers = [grading.get_matcher(vid, qtype, correct) for vid, qtype, correct, _ in cases]
+    t0 = time.perf_counter()
+    for m, (_, _, _, ans) in zip(matchers, cases):
+        m.match(ans)
+    match_only_s = time.perf_counter() - t0
+
+    assert got == expected, "判分结果与旧实现不一致"
+    per = lambda s: f"{s / len(cases) * 1e9:,.0f} ns/answer"
+    print(f"answers: {len(cases)}, correct: {sum(got)}")
+    print(f"legacy normalize-per-call : {per(legacy_s)}")
+    print(f"compiled (regrade batch)  : {per(compiled_s)}")
+    print(f"compiled (matcher only)   : {per(match_only_s)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+列表分页基准：OFFSET 翻到第 N 页（含 count） vs 游标分页（after=next_cursor，with_total=false）
+位置: benchmarks/bench_pagination.py
+用法: python benchmarks/bench_pagination.py [--url sqlite:///bench.db] [--rows 100000] [--size 20] [--depths 1 100 1000 4000]
+
+同一用户下批量造题（导入流水线）与等量错题记录，分别取 GET /questions 与 GET /error-book 第 depth 页：
+offset 方式即原接口（page/size），游标方式以上一页最后一行的排序键为 after（与连续翻页拿到的 next_cursor 相同）。
+两种方式取到的 ID 必须一致。
+"""
+import argparse
+import random
+from datetime import timedelta
+
+from bench_common import make_engine, make_session, timed
+
+from sqlalchemy import insert
+
+from app.core.timezone import now as get_now
+from app.db.pagination import encode_cursor
+from app.models.error_book import ErrorBook
+from app.models.question import Question
+from app.models.user import User
+from app.services import error_book_service, question_bank_service, question_import
+
+
+def seed(db, n: int, seed_: int = 42):
+    rnd = random.Random(seed_)
+    user = User(account=f"page_{n}_{seed_}", nickname="bench")
+    db.add(user)
+    db.commit()
+    records = (question_import.ImportRow(i + 2, f"分页基准题目 {i}", "FILL", None, "答案", "", "", "") for i in range(n))
+    question_import.import_records(db, records, user.id)
+
+    now = get_now().replace(microsecond=0)
+    qids = [qid for (qid,) in db.query(Question.id).order_by(Question.id)]
+    for lo in range(0, len(qids), 5000):
+        rows = []
+        for qid in qids[lo:lo + 5000]:
+            t = now - timedelta(seconds=rnd.randint(0, 30 * 86400)) if rnd.random() < 0.95 else None
+            rows.append(dict(
+                user_id=user.id, question_id=qid, wrong_count=1, first_wrong_time=t, last_wrong_time=t,
+                next_review_time=t or now, mastered=False,
+            ))
+        db.execute(insert(ErrorBook), rows)
+    db.commit()
+    return user
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="sqlite://")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--size", type=int, default=20)
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 100, 1000, 4000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = make_engine(args.url)
+    db = make_session(engine)
+    user = seed(db, args.rows)
+    size = args.size
+
+    def questions(page=1, after=None, with_total=True):
+        _, rows, _, _ = question_bank_service.list_questions_page(
+            db, page=page, size=size, user_id=user.id, after=after, with_total=with_total,
+        )
+        return [r.id for r in rows]
+
+    def errors(page=1, after=None, with_total=True):
+        _, rows, _ = error_book_service.list_error_book(db, user, page=page, size=size, after=after, with_total=with_total)
+        return [r.id for r in rows]
+
+    def cursor_before(fn, key, depth):
+        """第 depth 页的 after：即第 depth - 1 页最后一行的排序键"""
+        if depth == 1:
+            return None
+        _, rows, *_ = fn(depth - 1)
+        return encode_cursor(key(rows[-1]))
+
+    listings = [
+        ("questions", questions, lambda p: question_bank_service.list_questions_page(db, page=p, size=size, user_id=user.id),
+         lambda r: [r.id]),
+        ("error_book", errors, lambda p: error_book_service.list_error_book(db, user, page=p, size=size),
+         lambda r: [r.last_wrong_time, r.id]),
+    ]
+    print(f"{'rows':>7} {'listing':>10} {'depth':>6} {'impl':>7} {'mean_ms':>9} {'p95_ms':>8}")
+    for name, fn, raw, key in listings:
+        for depth in args.depths:
+            after = cursor_before(raw, key, depth)
+            if fn(page=depth) != fn(after=after, with_total=False):
+                raise SystemExit(f"{name} 第 {depth} 页：游标分页与 offset 结果不一致")
+            for impl, call in (
+                ("offset", lambda: fn(page=depth)),
+                ("cursor", lambda: fn(after=after, with_total=False)),
+            ):
+                stats = timed(call, repeat=args.repeat)
+                print(f"{args.rows:>7} {name:>10} {depth:>6} {impl:>7} {stats['mean_ms']:>9} {stats['p95_ms']:>8}")
+
+
+if __name__ == "__main__":
+    main()
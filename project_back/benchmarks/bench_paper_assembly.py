@@ -0,0 +1,52 @@
+"""
+组卷写入基准：逐题 ORM add（旧实现） vs 批量 assemble_paper（多行 INSERT，单事务）
+位置: benchmarks/bench_paper_assembly.py
+用法: python benchmarks/bench_paper_assembly.py [--url sqlite:///bench.db] [--repeat 30]
+"""
+import argparse
+
+from bench_common import QueryCounter, make_engine, make_session, seed_bank, timed
+
+from app.core.timezone import now as get_now
+from app.models.exam_attempt import ExamAttempt
+from app.models.paper import Paper
+from app.models.paper_question import PaperQuestion
+from app.models.question import Question
+from app.services import practice_service
+
+
+def legacy_assemble(db, user_id, question_ids):
+    """旧实现：Paper / 逐题 PaperQuestion / ExamAttempt 分别经工作单元刷新"""
+    paper = Paper(title=practice_service._new_title(), is_public=False, status="PRACTICE", created_by=user_id)
+    db.add(paper); db.flush()
+    for i, qid in enumerate(question_ids, start=1):
+        db.add(PaperQuestion(paper_id=paper.id, question_id=qid, seq=i))
+    db.flush()
+    attempt = ExamAttempt(user_id=user_id, paper_id=paper.id, status="IN_PROGRESS", start_time=get_now())
+    db.add(attempt); db.commit()
+    return attempt.id, paper.id
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="sqlite://")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    engine = make_engine(args.url)
+    db = make_session(engine)
+    user, _ = seed_bank(db, n_questions=200, n_kps=20, n_errors=0)
+    qids = [qid for (qid,) in db.query(Question.id).limit(100).all()]
+
+    print(f"{'size':>6} {'impl':>8} {'queries':>8} {'mean_ms':>9} {'p50_ms':>8} {'p95_ms':>8}")
+    for size in (10, 50, 100):
+        ids = qids[:size]
+        for name, fn in (("legacy", legacy_assemble), ("bulk", practice_service.assemble_paper)):
+            with QueryCounter(engine) as qc:
+                fn(db, user.id, ids)
+            stats = timed(lambda: fn(db, user.id, ids), repeat=args.repeat)
+            print(f"{size:>6} {name:>8} {qc.count:>8} {stats['mean_ms']:>9} {stats['p50_ms']:>8} {stats['p95_ms']:>8}")
+
+
+if __name__ == "__main__":
+    main()
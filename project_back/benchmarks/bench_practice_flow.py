@@ -0,0 +1,174 @@
+"""
+练习流程基准：各练习模式的 create_session，以及 get_question / submit_answer / finish 的 SQL 条数与耗时
+位置: benchmarks/bench_practice_flow.py
+用法: python benchmarks/bench_practice_flow.py [--url sqlite:///bench.db] [--users 3] [--questions 2000]
+          [--kps 150] [--errors 400] [--answers 1000] [--size 20] [--repeat 30] [--seed 42]
+          [--out practice_flow.json] [--compare baseline.json]
+
+造数与抽题的随机数全部由 --seed 决定（seed_bank / seed_answers 使用独立的 Random，
+practice_service 的 random.shuffle、候选池与蓄水池抽样使用 random 模块，每项测量前重新 random.seed），
+同一参数在不同提交上运行得到相同的数据与抽题序列，结果可直接对比。
+
+每项操作先预热（加载候选池、知识点树等进程内缓存），再逐次统计耗时与 SQL 条数：
+- create_session.<模式>：按用户轮流建卷（含组卷写入）
+- get_question.cold：丢弃会话快照后取题（快照载入）；get_question：命中快照
+- submit_answer：快照已载入的会话中逐题作答，约 60% 答对
+- finish：全部作答后的交卷
+
+结果写入 --out（JSON：meta 记录提交号、参数与环境，results 为各操作的统计）；
+指定 --compare 时与之前的结果文件逐项对比 SQL 条数与 p50 耗时。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+from datetime import datetime
+
+import sqlalchemy
+from bench_common import make_engine, make_session, profile, seed_answers, seed_bank
+
+from app.services import attempt_snapshot, practice_service
+
+MODES = ("RANDOM", "SMART", "WEAK_POINT", "REVIEW")
+CORRECT_RATE = 0.6
+
+
+def _git_commit() -> dict:
+    def git(*cmd):
+        return subprocess.run(["git", *cmd], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+
+    try:
+        commit = git("rev-parse", "--short", "HEAD")
+        dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def _new_sessions(db, users, n, size, rnd):
+    """建 n 个会话（不计时）并载入快照，返回 [(user, attempt_id, [(seq, 答案)...])]"""
+    sessions = []
+    for i in range(n):
+        user = users[i % len(users)]
+        attempt_id, _, _, _ = practice_service.create_session(db, user, size)
+        snap = practice_service._load_snapshot(db, user, attempt_id)
+        answers = [(it.seq, it.correct_answer if rnd.random() < CORRECT_RATE else "Z") for it in snap.items]
+        sessions.append((user, attempt_id, answers))
+    return sessions
+
+
+def run(db, engine, users, args) -> dict:
+    results = {}
+    calls = args.warmup + args.repeat
+
+    def measure(name, fn):
+        random.seed(args.seed)
+        results[name] = profile(engine, fn, repeat=args.repeat, warmup=args.warmup)
+
+    for mode in MODES:
+        measure(f"create_session.{mode}", lambda i, mode=mode: practice_service.create_session(
+            db, users[i % len(users)], args.size, practice_mode=mode
+        ))
+
+    rnd = random.Random(args.seed)
+    random.seed(args.seed)
+    sessions = _new_sessions(db, users, len(users), args.size, rnd)
+
+    def get_cold(i):
+        user, attempt_id, _ = sessions[i % len(sessions)]
+        attempt_snapshot.drop(attempt_id)
+        practice_service.get_question(db, user, attempt_id, 1)
+
+    def get_warm(i):
+        user, attempt_id, answers = sessions[i % len(sessions)]
+        practice_service.get_question(db, user, attempt_id, answers[i % len(answers)][0])
+
+    measure("get_question.cold", get_cold)
+    measure("get_question", get_warm)
+
+    random.seed(args.seed)
+    pending = [
+        (user, attempt_id, seq, answer)
+        for user, attempt_id, answers in _new_sessions(db, users, calls // args.size + 1, args.size, rnd)
+        for seq, answer in answers
+    ]
+    measure("submit_answer", lambda i: practice_service.submit_answer(db, *pending[i], time_spent_ms=1000))
+
+    random.seed(args.seed)
+    done = _new_sessions(db, users, calls, args.size, rnd)
+    for user, attempt_id, answers in done:
+        for seq, answer in answers:
+            practice_service.submit_answer(db, user, attempt_id, seq, answer, time_spent_ms=1000)
+    measure("finish", lambda i: practice_service.finish(db, done[i][0], done[i][1]))
+    return results
+
+
+def compare(results: dict, baseline_path: str) -> None:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    base = baseline["results"]
+    print(f"\n对比 {baseline_path}（提交 {baseline['meta'].get('commit')}）")
+    print(f"{'operation':>26} {'queries':>16} {'p50_ms':>22}")
+    for name, cur in results.items():
+        old = base.get(name)
+        if old is None:
+            print(f"{name:>26} {'(新增)':>16}")
+            continue
+        ratio = cur["p50_ms"] / old["p50_ms"] if old["p50_ms"] else float("inf")
+        print(f"{name:>26} {old['queries_mean']:>7} -> {cur['queries_mean']:<6} "
+              f"{old['p50_ms']:>8} -> {cur['p50_ms']:<8} x{ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="sqlite://")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--questions", type=int, default=2000, help="每个用户的题目数")
+    parser.add_argument("--kps", type=int, default=150, help="每个用户的知识点数")
+    parser.add_argument("--errors", type=int, default=400, help="每个用户的错题数")
+    parser.add_argument("--answers", type=int, default=1000, help="每个用户的历史作答数")
+    parser.add_argument("--size", type=int, default=20, help="每次建卷的题目数")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="practice_flow.json")
+    parser.add_argument("--compare", default=None, help="之前的结果文件")
+    args = parser.parse_args()
+
+    engine = make_engine(args.url)
+    db = make_session(engine)
+    users = []
+    for i in range(args.users):
+        user, _ = seed_bank(db, n_questions=args.questions, n_kps=args.kps, n_errors=args.errors, seed=args.seed + i)
+        seed_answers(db, user, args.answers, seed=args.seed + i)
+        users.append(user)
+
+    results = run(db, engine, users, args)
+
+    print(f"{'operation':>26} {'queries':>8} {'max_q':>6} {'mean_ms':>9} {'p50_ms':>8} {'p95_ms':>8}")
+    for name, r in results.items():
+        print(f"{name:>26} {r['queries_mean']:>8} {r['queries_max']:>6} {r['mean_ms']:>9} {r['p50_ms']:>8} {r['p95_ms']:>8}")
+
+    payload = {
+        "meta": {
+            **_git_commit(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "dialect": engine.dialect.name,
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        },
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {args.out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
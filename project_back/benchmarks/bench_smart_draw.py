@@ -0,0 +1,79 @@
+"""
+SMART 模式抽题基准：三个抽题函数 + 最多三轮随机补题（旧实现） vs draw_smart_questions（一次抽取）
+位置: benchmarks/bench_smart_draw.py
+用法: python benchmarks/bench_smart_draw.py [--url sqlite:///bench.db] [--questions 5000] [--repeat 30]
+
+分别在“候选池”与“回退路径”（题库超过候选池上限时的数据库流式抽样）下比较每次建卷的 SQL 条数与耗时，
+并校验结果无重复、题量足够、难题占比接近。
+"""
+import argparse
+import random
+
+from bench_common import QueryCounter, make_engine, make_session, seed_bank, timed
+
+from app.models.question import Question
+from app.services import practice_service, question_pool
+
+
+def legacy_smart(db, user_id, size, subject_id=None, question_types=None):
+    """旧 create_session 中的 SMART 分支"""
+    weak_size = int(size * 0.6)
+    hard_size = int(size * 0.3)
+    rand_size = size - weak_size - hard_size
+    weak_ids = practice_service.get_weak_point_questions_smart(db, user_id, weak_size, subject_id, question_types)
+    hard_ids = practice_service.get_hard_questions(db, user_id, hard_size, subject_id, question_types)
+    rand_ids = practice_service.get_random_questions(db, user_id, rand_size, subject_id, question_types)
+    question_ids = list(dict.fromkeys(weak_ids + hard_ids + rand_ids))
+    if len(question_ids) < size:
+        need_count = size - len(question_ids)
+        existing_ids = set(question_ids)
+        for attempt in range(3):
+            if len(question_ids) >= size:
+                break
+            extra = practice_service.get_random_questions(db, user_id, need_count * (2 + attempt), subject_id, question_types)
+            new_questions = [qid for qid in extra if qid not in existing_ids]
+            add_count = min(len(new_questions), size - len(question_ids))
+            question_ids.extend(new_questions[:add_count])
+            existing_ids.update(new_questions[:add_count])
+            if add_count == 0:
+                break
+    random.shuffle(question_ids)
+    return question_ids[:size]
+
+
+def single_pass(db, user_id, size, subject_id=None, question_types=None):
+    return practice_service.draw_smart_questions(db, user_id, size, subject_id, question_types)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="sqlite://")
+    parser.add_argument("--questions", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    engine = make_engine(args.url)
+    db = make_session(engine)
+    user, subject = seed_bank(db, n_questions=args.questions, n_kps=200, n_errors=args.questions // 5)
+    hard = {qid for (qid,) in db.query(Question.id).filter(Question.difficulty >= 4).all()}
+    get_pool = question_pool.get_pool
+
+    print(f"{'path':>9} {'size':>5} {'impl':>8} {'queries':>8} {'mean_ms':>9} {'p95_ms':>8} {'hard%':>6}")
+    for path in ("pool", "fallback"):
+        question_pool.get_pool = get_pool if path == "pool" else (lambda _db, _uid: None)
+        for size in (20, 100):
+            for name, fn in (("legacy", legacy_smart), ("single", single_pass)):
+                kwargs = {"subject_id": subject.id, "question_types": ["SC", "MC", "FILL"]}
+                fn(db, user.id, size, **kwargs)  # 预热候选池 / 知识点树
+                with QueryCounter(engine) as qc:
+                    ids = fn(db, user.id, size, **kwargs)
+                assert len(ids) == len(set(ids)), f"{name}: 结果有重复"
+                draws = [fn(db, user.id, size, **kwargs) for _ in range(20)]
+                hard_pct = 100 * sum(len(hard.intersection(d)) for d in draws) / max(1, sum(map(len, draws)))
+                stats = timed(lambda: fn(db, user.id, size, **kwargs), repeat=args.repeat)
+                print(f"{path:>9} {size:>5} {name:>8} {qc.count:>8} {stats['mean_ms']:>9} {stats['p95_ms']:>8} {hard_pct:>6.1f}")
+    question_pool.get_pool = get_pool
+
+
+if __name__ == "__main__":
+    main()
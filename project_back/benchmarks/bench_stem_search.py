@@ -0,0 +1,74 @@
+"""
+题干关键字搜索基准：LIKE '%关键字%' 全表扫描 vs FTS5 trigram 索引缩小候选集 + LIKE 复核（stem_search）
+位置: benchmarks/bench_stem_search.py
+用法: python benchmarks/bench_stem_search.py [--questions 10000 100000] [--repeat 20] [--keywords 二次函数 光合作用 ...]
+
+按词表随机拼出中文题干，通过导入流水线批量写入；先在未建索引时测 LIKE，再建 FTS5 表（与迁移相同的 DDL）后测索引路径。
+每个关键字调用 list_my_questions 第一页（含 count），两种方式返回的总数与题目 ID 必须一致。
+MySQL 的 ngram FULLTEXT 路径需在 MySQL 上运行（--url mysql+pymysql://...，库中需已执行迁移）。
+"""
+import argparse
+import random
+
+from bench_common import make_engine, make_session, timed
+
+from app.models.user import User
+from app.services import question_bank_service, question_import, stem_search
+
+WORDS = [
+    "函数", "二次函数", "导数", "极值", "集合", "数列", "等比数列", "向量", "概率", "三角形", "圆的方程", "不等式",
+    "光合作用", "细胞", "遗传", "生态系统", "牛顿第二定律", "加速度", "电场强度", "欧姆定律", "化学反应", "氧化还原",
+    "离子方程式", "原子结构", "阅读理解", "完形填空", "语法填空", "古诗词", "文言文", "修辞手法",
+]
+TEMPLATES = ["下列关于{a}的说法正确的是？", "已知{a}与{b}的关系，求解以下问题", "{a}在{b}中的应用是什么？", "简述{a}的基本概念"]
+
+
+def seed(db, n: int, seed_: int = 42):
+    rnd = random.Random(seed_)
+    user = User(account=f"search_{n}_{seed_}", nickname="bench")
+    db.add(user)
+    db.commit()
+    records = (
+        question_import.ImportRow(
+            i + 2, rnd.choice(TEMPLATES).format(a=rnd.choice(WORDS), b=rnd.choice(WORDS)) + f"（第{i}题）",
+            "FILL", None, "答案", "", "", "",
+        )
+        for i in range(n)
+    )
+    question_import.import_records(db, records, user.id)
+    return user
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="sqlite://")
+    parser.add_argument("--questions", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--keywords", nargs="+", default=["二次函数", "光合作用", "牛顿第二定律", "第123题", "说法正确"])
+    args = parser.parse_args()
+
+    print(f"{'questions':>9} {'keyword':>12} {'impl':>7} {'total':>7} {'mean_ms':>9} {'p95_ms':>8}")
+    for n in args.questions:
+        engine = make_engine(args.url)
+        db = make_session(engine)
+        user = seed(db, n)
+        results = {}
+        for impl in ("like", "index"):
+            if impl == "index" and engine.dialect.name == "sqlite":
+                with engine.begin() as conn:
+                    stem_search.create_sqlite_index(conn)
+            stem_search.invalidate()
+            for kw in args.keywords:
+                fn = lambda: question_bank_service.list_my_questions(db, user, page=1, size=20, keyword=kw)
+                total, rows, _ = fn()
+                results.setdefault(kw, []).append((total, [r.question_id for r in rows]))
+                stats = timed(fn, repeat=args.repeat)
+                print(f"{n:>9} {kw:>12} {stem_search.backend(db):>7} {total:>7} {stats['mean_ms']:>9} {stats['p95_ms']:>8}")
+        for kw, (like, index) in results.items():
+            if like != index:
+                raise SystemExit(f"{kw}: 索引路径与 LIKE 结果不一致")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
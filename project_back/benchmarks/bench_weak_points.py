@@ -0,0 +1,40 @@
+"""
+薄弱知识点排名基准：逐行扫描错题本（rank_weak_points_from_errors） vs 读取物化画像（rank_weak_points）
+位置: benchmarks/bench_weak_points.py
+用法: python benchmarks/bench_weak_points.py [--url sqlite:///bench.db] [--repeat 30]
+
+错题本逐步增大时比较两种方式的 SQL 条数与耗时，并给出两者前 10 个知识点的重合数
+（画像按连续天数衰减，原实现按整天取整，权重有细微差异）。
+"""
+import argparse
+
+from bench_common import QueryCounter, make_engine, make_session, seed_bank, timed
+
+from app.services import knowledge_tree, weak_point_scoring
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="sqlite://")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    engine = make_engine(args.url)
+    db = make_session(engine)
+
+    print(f"{'errors':>7} {'impl':>8} {'queries':>8} {'mean_ms':>9} {'p95_ms':>8} {'top10_overlap':>14}")
+    for seed, n_errors in enumerate((200, 1000, 4000), start=1):
+        user, subject = seed_bank(db, n_questions=n_errors, n_kps=300, n_errors=n_errors, seed=seed)
+        knowledge_tree.invalidate()
+        knowledge_tree.get_tree(db)  # 预热知识点树
+        tops = {}
+        for name, fn in (("errors", weak_point_scoring.rank_weak_points_from_errors), ("profile", weak_point_scoring.rank_weak_points)):
+            with QueryCounter(engine) as qc:
+                tops[name] = {kp["kp_id"] for kp in fn(db, user.id, subject.id)}
+            stats = timed(lambda: fn(db, user.id, subject.id), repeat=args.repeat)
+            overlap = len(tops[name] & tops["errors"])
+            print(f"{n_errors:>7} {name:>8} {qc.count:>8} {stats['mean_ms']:>9} {stats['p95_ms']:>8} {overlap:>14}")
+
+
+if __name__ == "__main__":
+    main()
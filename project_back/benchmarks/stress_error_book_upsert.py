@@ -0,0 +1,138 @@
+"""
+错题本并发压测：多线程同时答错同一用户/同一题目
+位置: benchmarks/stress_error_book_upsert.py
+用法: python benchmarks/stress_error_book_upsert.py [--url mysql+pymysql://...] [--threads 16] [--per-thread 50]
+
+对比旧实现（先查后写）与 error_book_service.upsert_wrong（单条原子 upsert）：
+统计异常次数（唯一键冲突 / 锁等待失败）与丢失的累加次数。upsert 必须零异常且 wrong_count 精确等于总提交次数。
+first 场景为各线程交错地首次答错相邻的不同题目（同一索引间隙内的插入），必须零异常（MySQL 下检验无间隙锁死锁）。
+默认使用临时文件 SQLite（内存库无法跨连接并发）。
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from bench_common import make_engine
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.timezone import now as get_now
+from app.models.error_book import ErrorBook
+from app.services import error_book_service, spaced_repetition
+
+USER_ID, QUESTION_ID = 1, 1
+
+
+def legacy_record(db, now, seq):
+    """旧实现：先查询记录，存在则累加，否则插入"""
+    record = db.query(ErrorBook).filter(
+        ErrorBook.user_id == USER_ID, ErrorBook.question_id == QUESTION_ID
+    ).first()
+    if record:
+        record.wrong_count = (record.wrong_count or 0) + 1
+        record.last_wrong_time = now
+    else:
+        db.add(ErrorBook(
+            user_id=USER_ID, question_id=QUESTION_ID, first_wrong_time=now,
+            last_wrong_time=now, wrong_count=1, next_review_time=now, mastered=False,
+        ))
+
+
+def upsert_record(db, now, seq):
+    error_book_service.upsert_wrong(db, USER_ID, {QUESTION_ID: 1}, now)
+
+
+def first_wrong(db, now, seq):
+    """每次提交都是一道此前不存在的题目，相邻线程的题目 ID 相邻"""
+    error_book_service.upsert_wrong(db, USER_ID, {QUESTION_ID + 1 + seq: 1}, now)
+
+
+def run(Session, fn, threads, per_thread):
+    errors = Counter()
+    barrier = threading.Barrier(threads)
+
+    def worker(k):
+        db = Session()
+        barrier.wait()
+        for i in range(per_thread):
+            try:
+                fn(db, get_now(), i * threads + k)
+                db.commit()
+            except Exception as e:  # noqa: BLE001  压测需统计所有失败类型
+                db.rollback()
+                errors[type(getattr(e, "orig", e)).__name__] += 1
+        db.close()
+
+    pool = [threading.Thread(target=worker, args=(k,)) for k in range(threads)]
+    t0 = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    db = Session()
+    if fn is first_wrong:
+        row = None
+        count = db.query(ErrorBook).filter(ErrorBook.user_id == USER_ID, ErrorBook.question_id > QUESTION_ID).count()
+    else:
+        row = db.query(ErrorBook).filter(ErrorBook.user_id == USER_ID, ErrorBook.question_id == QUESTION_ID).first()
+        count = row.wrong_count if row else 0
+    db.close()
+    return count, row, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="默认临时文件 SQLite")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--per-thread", type=int, default=50)
+    args = parser.parse_args()
+
+    tmp = None
+    url = args.url
+    if url is None:
+        fd, tmp = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        url = f"sqlite:///{tmp}"
+    make_engine(url).dispose()  # 建表
+    kwargs = {"connect_args": {"timeout": 30, "check_same_thread": False}} if url.startswith("sqlite") else {}
+    engine = create_engine(url, pool_size=args.threads, **kwargs)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    total = args.threads * args.per_thread
+    failed = False
+    print(f"dialect: {engine.dialect.name}, threads: {args.threads}, submits: {total}")
+    print(f"{'impl':>8} {'wrong_count':>12} {'lost':>6} {'errors':>8} {'secs':>7}  error types")
+    try:
+        for name, fn in (("legacy", legacy_record), ("upsert", upsert_record), ("first", first_wrong)):
+            with engine.begin() as conn:
+                conn.execute(ErrorBook.__table__.delete().where(ErrorBook.user_id == USER_ID))
+            count, row, errors, elapsed = run(Session, fn, args.threads, args.per_thread)
+            n_err = sum(errors.values())
+            lost = total - n_err - count
+            print(f"{name:>8} {count:>12} {lost:>6} {n_err:>8} {elapsed:>7.2f}  {dict(errors)}")
+            if name == "first" and (n_err or count != total):
+                failed = True
+                print(f"FAILED: 期望 {total} 条新错题记录且无异常")
+            if name == "upsert":
+                expected_days = spaced_repetition.FIRST_INTERVAL_DAYS
+                gap = (row.next_review_time - row.last_wrong_time).days if row else None
+                ease = row.ease_factor if row else None
+                if n_err or count != total or gap != expected_days or ease != spaced_repetition.MIN_EASE:
+                    failed = True
+                    print(f"FAILED: 期望 wrong_count={total}, 复习间隔 {expected_days} 天，难易系数 {spaced_repetition.MIN_EASE}；"
+                          f"实际间隔 {gap} 天，难易系数 {ease}")
+    finally:
+        engine.dispose()
+        if tmp:
+            os.remove(tmp)
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
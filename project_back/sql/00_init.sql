@@ -80,6 +80,7 @@ CREATE TABLE `QUESTION_VERSION` (
     `question_id`   BIGINT UNSIGNED NOT NULL,
     `version_no`    INT NOT NULL,
     `stem`          TEXT NOT NULL,
+    `stem_hash`     CHAR(40) NULL COMMENT '空白折叠后题干的 SHA-1，用于查重',
     `options`       JSON NULL,
     `correct_answer` VARCHAR(255) NULL,
     `explanation`   TEXT NULL,
@@ -91,6 +92,8 @@ CREATE TABLE `QUESTION_VERSION` (
     UNIQUE KEY uk_question_version (`question_id`,`version_no`),
     KEY idx_qv_question (`question_id`),
     KEY idx_qv_created_by (`created_by`),
+    KEY idx_qv_creator_stem_hash (`created_by`,`stem_hash`),
+    FULLTEXT KEY ft_qv_stem (`stem`) WITH PARSER ngram,
     CONSTRAINT fk_qv_creator FOREIGN KEY (`created_by`) REFERENCES `USER`(`id`) ON DELETE SET NULL ON UPDATE CASCADE,
     CONSTRAINT fk_qv_question FOREIGN KEY (`question_id`) REFERENCES `QUESTION`(`id`) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -142,6 +145,9 @@ CREATE TABLE `EXAM_ATTEMPT` (
     `calculated_accuracy` DECIMAL(6,4) NULL,
     `status`             VARCHAR(32) NOT NULL DEFAULT 'IN_PROGRESS',
     `duration_seconds`   INT NULL,
+    `question_count`     INT NOT NULL DEFAULT '0' COMMENT '试卷题目数',
+    `answered_count`     INT NOT NULL DEFAULT '0' COMMENT '已作答题数（增量维护）',
+    `correct_count`      INT NOT NULL DEFAULT '0' COMMENT '答对题数（增量维护）',
     `created_at`         DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (`id`),
     UNIQUE KEY uk_attempt_user_paper_idx (`user_id`,`paper_id`,`attempt_index`),
@@ -240,19 +246,71 @@ CREATE TABLE `ERROR_BOOK` (
     `last_wrong_time`  DATETIME NULL,
     `wrong_count`      INT NOT NULL DEFAULT '0',
     `next_review_time` DATETIME NULL,
+    `ease_factor`      DOUBLE NOT NULL DEFAULT '2.5' COMMENT 'SM-2 难易系数',
+    `review_interval`  INT NOT NULL DEFAULT '0' COMMENT '当前复习间隔（天）',
+    `repetitions`      INT NOT NULL DEFAULT '0' COMMENT '连续答对次数',
     `mastered`         TINYINT(1) NOT NULL DEFAULT '0',
     `updated_at`       DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     `created_at`       DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (`id`),
     UNIQUE KEY uk_error_user_question (`user_id`,`question_id`),
     KEY idx_error_question (`question_id`),
-    KEY idx_error_book_user_mastered (`user_id`,`mastered`),
+    KEY idx_error_book_due (`user_id`,`mastered`,`next_review_time`),
+    KEY idx_error_book_recent (`user_id`,`mastered`,`last_wrong_time`),
     KEY idx_error_book_last_wrong (`user_id`,`last_wrong_time`),
     CONSTRAINT fk_error_question FOREIGN KEY (`question_id`) REFERENCES `QUESTION`(`id`) ON DELETE CASCADE ON UPDATE CASCADE,
     CONSTRAINT fk_error_user FOREIGN KEY (`user_id`) REFERENCES `USER`(`id`) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
--- 15. Alembic 版本管理
+-- 15. 知识点闭包表（祖先-子孙路径，含自身 distance=0）
+CREATE TABLE `KNOWLEDGE_CLOSURE` (
+    `ancestor_id`   BIGINT UNSIGNED NOT NULL,
+    `descendant_id` BIGINT UNSIGNED NOT NULL,
+    `distance`      INT NOT NULL,
+    PRIMARY KEY (`ancestor_id`,`descendant_id`),
+    KEY idx_kc_descendant_ancestor (`descendant_id`,`ancestor_id`),
+    CONSTRAINT fk_kc_ancestor FOREIGN KEY (`ancestor_id`) REFERENCES `KNOWLEDGE_POINT`(`id`) ON DELETE CASCADE ON UPDATE CASCADE,
+    CONSTRAINT fk_kc_descendant FOREIGN KEY (`descendant_id`) REFERENCES `KNOWLEDGE_POINT`(`id`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- 16. 用户薄弱知识点画像（subject_id = 0 汇总全部学科；衰减部分在读取时计算）
+CREATE TABLE `USER_KP_WEAKNESS` (
+    `user_id`       BIGINT UNSIGNED NOT NULL,
+    `subject_id`    BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    `knowledge_id`  BIGINT UNSIGNED NOT NULL,
+    `wrong_count`   INT NOT NULL DEFAULT 0,
+    `direct_weight` DOUBLE NOT NULL DEFAULT 0,
+    `last_update`   DATETIME NOT NULL,
+    PRIMARY KEY (`user_id`,`subject_id`,`knowledge_id`),
+    CONSTRAINT fk_ukw_user FOREIGN KEY (`user_id`) REFERENCES `USER`(`id`) ON DELETE CASCADE ON UPDATE CASCADE,
+    CONSTRAINT fk_ukw_knowledge FOREIGN KEY (`knowledge_id`) REFERENCES `KNOWLEDGE_POINT`(`id`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- 17. 题目导入任务（上传文件落盘后由后台线程导入，客户端轮询进度）
+CREATE TABLE `IMPORT_JOB` (
+    `id`               BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    `user_id`          BIGINT UNSIGNED NOT NULL,
+    `filename`         VARCHAR(255) NOT NULL,
+    `file_path`        VARCHAR(500) NULL,
+    `status`           VARCHAR(16) NOT NULL DEFAULT 'PENDING' COMMENT 'PENDING/RUNNING/SUCCEEDED/FAILED/CANCELLED',
+    `cancel_requested` TINYINT(1) NOT NULL DEFAULT 0,
+    `estimated_rows`   INT NULL,
+    `processed_rows`   INT NOT NULL DEFAULT 0,
+    `success_rows`     INT NOT NULL DEFAULT 0,
+    `failed_rows`      INT NOT NULL DEFAULT 0,
+    `errors`           JSON NULL,
+    `message`          VARCHAR(500) NULL,
+    `created_at`       DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    `started_at`       DATETIME NULL,
+    `finished_at`      DATETIME NULL,
+    `updated_at`       DATETIME NULL,
+    PRIMARY KEY (`id`),
+    KEY idx_import_job_user (`user_id`,`id`),
+    KEY idx_import_job_status (`status`),
+    CONSTRAINT fk_import_job_user FOREIGN KEY (`user_id`) REFERENCES `USER`(`id`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- 18. Alembic 版本管理
 CREATE TABLE `alembic_version` (
     `version_num` VARCHAR(32) NOT NULL,
     PRIMARY KEY (`version_num`)